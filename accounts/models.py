@@ -3,13 +3,17 @@ from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from standblog.images import ImageDerivativesMixin, track_image_derivatives
+
 # ==================================
 # مدل پروفایل کاربر
 # ==================================
-class Profile(models.Model):
+class Profile(ImageDerivativesMixin, models.Model):
     """
     این مدل، اطلاعات اضافی را به مدل User پیش‌فرض جنگو اضافه می‌کند.
     """
+    # عرض نسخه‌های کوچک‌شده تصویر پروفایل (آواتار هدر و صفحه ویرایش پروفایل، با چگالی ۲x)
+    image_derivative_widths = (50, 150, 300)
     # نکته: نام کلاس به Profile تغییر کرد (حرف اول بزرگ)
     
     # رابطه یک به یک: هر کاربر فقط یک پروفایل دارد.
@@ -46,3 +50,6 @@ def save_user_profile(sender, instance, **kwargs):
     پروفایل مربوط به آن هم ذخیره شود.
     """
     instance.profile.save()
+
+# ساخت نسخه‌های کوچک‌شده تصویر پروفایل بعد از آپلود
+track_image_derivatives(Profile)
@@ -1,3 +1,46 @@
-from django.test import TestCase
+import re
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blog.tests import TEST_CACHES, TEST_STORAGES
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class PasswordResetTests(TestCase):
+    """
+    مسیرهای بازیابی رمز عبور از ارسال ایمیل تا تعیین رمز جدید.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', email='reader@example.com', password='old-pass-123')
+
+    def test_pages_render(self):
+        for name in ('accounts:password_reset', 'accounts:password_reset_done', 'accounts:password_reset_complete'):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    def test_reset_flow(self):
+        response = self.client.post(reverse('accounts:password_reset'), {'email': 'reader@example.com'})
+        self.assertRedirects(response, reverse('accounts:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 1)
+
+        link = re.search(r'https?://[^/\s]+(/\S+)', mail.outbox[0].body).group(1)
+        # لینک ایمیل به آدرسی بدون توکن (که در نشست نگه داشته می‌شود) هدایت می‌کند
+        response = self.client.get(link, follow=True)
+        self.assertTrue(response.context['validlink'])
+        response = self.client.post(response.redirect_chain[-1][0], {
+            'new_password1': 'new-pass-456!', 'new_password2': 'new-pass-456!',
+        })
+        self.assertRedirects(response, reverse('accounts:password_reset_complete'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass-456!'))
+
+    def test_invalid_link(self):
+        url = reverse('accounts:password_reset_confirm', kwargs={'uidb64': 'MQ', 'token': 'invalid'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['validlink'])
@@ -23,7 +23,7 @@ class CommentInline(admin.TabularInline):
 # ==================================
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'status', 'created', 'show_image')
+    list_display = ('title', 'author', 'status', 'created', 'like_count', 'comment_count', 'show_image')
     list_filter = ('status', 'category', 'author')
     search_fields = ('title', 'body')
     prepopulated_fields = {'slug': ('title',)} 
@@ -64,6 +64,9 @@ class CommentAdmin(admin.ModelAdmin):
 
     def approve_comments(self, request, queryset):
         queryset.update(is_active=True)
+        # تعداد نظرات فعال مقالات مربوطه تغییر کرده است
+        for article in Article.objects.filter(comments__in=queryset).distinct():
+            article.recount()
     approve_comments.short_description = "تایید نظرات انتخاب شده"
 
 # ==================================
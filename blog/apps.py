@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
-    verbose_name = 'بخش بلاگ'
\ No newline at end of file
+    verbose_name = 'بخش بلاگ'
+
+    def ready(self):
+        # ثبت سیگنال‌های بی‌اعتبارسازی کش
+        from . import signals  # noqa: F401
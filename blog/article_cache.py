@@ -0,0 +1,149 @@
+import hashlib
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import Http404
+
+from standblog.routers import primary_reads
+
+from .cache import afind_version, aget_versions, bump_version, changed_since, find_version, get_versions
+from .models import Article, Category
+
+# ==================================
+# کش مقالات منتشر شده بر اساس اسلاگ (cache-aside)
+# ==================================
+# صفحه مقاله، ارسال نظر و لایک هر کدام مقاله را با اسلاگ پیدا می‌کنند. مقاله منتشر شده به همراه
+# نام نویسنده و دسته‌بندی‌هایش یک بار از دیتابیس خوانده و زیر کلید اسلاگ کش می‌شود. برای اسلاگی
+# که مقاله منتشر شده ندارد هم «پیدا نشد» کش می‌شود تا درخواست‌های 404 (مثلا اسکن آدرس‌ها)
+# به دیتابیس نرسند. سیگنال‌ها با ذخیره (از جمله تغییر وضعیت) و حذف مقاله کلید را پاک می‌کنند؛
+# شمارنده‌های نظر و لایک و دسته‌بندی‌ها با نسخه‌های article:<pk> و categories بررسی می‌شوند.
+#
+# ردیفی که قبل از یک ویرایش خوانده شده نباید بعد از آن کش شود: زمان قبل از کوئری نگه داشته
+# می‌شود و اگر نسخه‌های مقاله (یا برای «پیدا نشد»، نسخه اسلاگ) در این فاصله بالا رفته باشند،
+# نتیجه فقط برگردانده می‌شود و کش نمی‌شود (مثل کش صفحات، blog.cache.changed_since).
+
+ARTICLE_KEY_PREFIX = 'standblog:article:'
+ARTICLE_CACHE_TIMEOUT = 60 * 60
+NOT_FOUND_TIMEOUT = 60 * 5
+NOT_FOUND = 'not-found'
+
+# متن خام (body) لازم نیست؛ صفحات body_html را نمایش می‌دهند
+ARTICLE_FIELDS = [field.attname for field in Article._meta.concrete_fields if field.attname != 'body']
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+CATEGORY_FIELDS = ('id', 'title')
+PK_INDEX = ARTICLE_FIELDS.index('id')
+
+
+def _slug_hash(slug):
+    # اسلاگ‌ها یونیکد هستند؛ کلید کش فقط حروف ASCII دارد
+    return hashlib.md5(slug.encode(), usedforsecurity=False).hexdigest()
+
+
+def slug_key(slug):
+    return ARTICLE_KEY_PREFIX + _slug_hash(slug)
+
+
+def slug_version(slug):
+    # فقط delete_articles آن را می‌سازد؛ اسکن آدرس‌های ناموجود کلید نسخه‌ای نمی‌سازد
+    return f'slug:{_slug_hash(slug)}'
+
+
+def delete_articles(*slugs):
+    """
+    مقالات کش‌شده (یا «پیدا نشد» کش‌شده) این اسلاگ‌ها را پاک می‌کند؛ داخل تراکنش بعد از commit
+    (مثل bump_version)، تا درخواست همزمان نسخه قبل از commit را دوباره در کش نگذارد.
+    نسخه اسلاگ‌ها قبل از پاک کردن بالا می‌رود تا درخواستی که «پیدا نشد» را قبل از commit
+    خوانده و بعد از پاک شدن کلید می‌نویسد، آن را کش نکند.
+    """
+    slugs = [slug for slug in slugs if slug]
+    bump_version(*map(slug_version, slugs))
+    keys = [slug_key(slug) for slug in slugs]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _version_names(pk):
+    return [f'article:{pk}', 'categories']
+
+
+def _queryset(slug):
+    return Article.objects.published().cards(content='body_html').filter(slug=slug)
+
+
+def _serialize(article, versions):
+    return {
+        'fields': [getattr(article, name) for name in ARTICLE_FIELDS],
+        'author': [getattr(article.author, name) for name in AUTHOR_FIELDS],
+        'categories': [[getattr(category, name) for name in CATEGORY_FIELDS] for category in article.category.all()],
+        'versions': versions,
+    }
+
+
+def _deserialize(entry):
+    """
+    مقاله را مثل خروجی cards() می‌سازد: نویسنده بارگذاری شده و دسته‌بندی‌ها prefetch شده،
+    پس تمپلیت‌ها و ویوها برای آن کوئری اجرا نمی‌کنند. فیلدهای ذخیره نشده deferred هستند.
+    """
+    db = router.db_for_read(Article)
+    article = Article.from_db(db, ARTICLE_FIELDS, entry['fields'])
+    article.author = User.from_db(db, AUTHOR_FIELDS, entry['author'])
+    # همان کاری که prefetch_related با نتیجه کوئری دسته‌بندی‌ها انجام می‌دهد
+    categories = article.category.all()
+    categories._result_cache = [Category.from_db(db, CATEGORY_FIELDS, row) for row in entry['categories']]
+    categories._prefetch_done = True
+    article._prefetched_objects_cache = {'category': categories}
+    return article
+
+
+def _is_fresh(entry, versions):
+    return entry['versions'] == list(versions.values())
+
+
+def get_article(slug):
+    """
+    مقاله منتشر شده با این اسلاگ، از کش یا دیتابیس؛ اگر نبود Http404.
+    """
+    key = slug_key(slug)
+    entry = cache.get(key)
+    if entry == NOT_FOUND:
+        raise Http404('مقاله پیدا نشد.')
+    if entry is not None and _is_fresh(entry, get_versions(_version_names(entry['fields'][PK_INDEX]))):
+        return _deserialize(entry)
+
+    # کش مشترک فقط از دیتابیس اصلی پر می‌شود (standblog/routers.py)
+    started = time.time_ns()
+    with primary_reads():
+        article = _queryset(slug).first()
+    if article is None:
+        if not changed_since(filter(None, [find_version(slug_version(slug))]), started):
+            cache.set(key, NOT_FOUND, NOT_FOUND_TIMEOUT)
+        raise Http404('مقاله پیدا نشد.')
+    versions = get_versions(_version_names(article.pk))
+    if not changed_since(versions.values(), started):
+        cache.set(key, _serialize(article, list(versions.values())), ARTICLE_CACHE_TIMEOUT)
+    return article
+
+
+async def aget_article(slug):
+    """
+    نسخه async برای get_article (برای ویوهای async).
+    """
+    key = slug_key(slug)
+    entry = await cache.aget(key)
+    if entry == NOT_FOUND:
+        raise Http404('مقاله پیدا نشد.')
+    if entry is not None and _is_fresh(entry, await aget_versions(_version_names(entry['fields'][PK_INDEX]))):
+        return _deserialize(entry)
+
+    started = time.time_ns()
+    with primary_reads():
+        article = await _queryset(slug).afirst()
+    if article is None:
+        if not changed_since(filter(None, [await afind_version(slug_version(slug))]), started):
+            await cache.aset(key, NOT_FOUND, NOT_FOUND_TIMEOUT)
+        raise Http404('مقاله پیدا نشد.')
+    versions = await aget_versions(_version_names(article.pk))
+    if not changed_since(versions.values(), started):
+        await cache.aset(key, _serialize(article, list(versions.values())), ARTICLE_CACHE_TIMEOUT)
+    return article
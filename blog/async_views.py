@@ -0,0 +1,173 @@
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.utils.functional import SimpleLazyObject
+from django.views import View
+
+from . import likes
+from .article_cache import aget_article
+from .cache import aget_versions
+from .conditional import AsyncConditionalGetMixin, alisting_validators, request_user
+from .forms import CommentForm
+from .models import Article, Category
+from .page_cache import SurrogateKeysMixin, add_surrogate_keys, article_key, category_key
+from .pagination import apaginate, get_page, page_links
+from .search import SearchResults, asearch
+
+# ==================================
+# ویوهای async خواندن (برای اجرا با ASGI)
+# ==================================
+# همان ویوهای لیست، جزئیات و جستجوی views.py با همان تمپلیت‌ها و متغیرها، ولی با ORM
+# async (aget، acount، aaggregate و async for). در ASGI درخواست منتظر دیتابیس، یک thread را
+# اشغال نمی‌کند و کلاینت‌های کند فقط یک coroutine نگه می‌دارند.
+# رندر TemplateResponse را خود جنگو در یک thread همزمان (sync) انجام می‌دهد؛ پس context
+# processor ها (مقادیر تنبل سایدبار) و قطعه‌های کش‌شده تمپلیت مثل قبل در زمان رندر اجرا می‌شوند.
+# با ASYNC_VIEWS = True (پیش‌فرض در asgi.py) این ویوها در urls.py جایگزین ویوهای همزمان می‌شوند.
+
+
+class ReadView(View):
+    """
+    پایه ویوهای async خواندن: context ساخته شده در aget_context_data را با TemplateResponse رندر می‌کند.
+    """
+    template_name = None
+    # ReplicaRoutingMiddleware خواندن‌های این ویوها را مثل ListView و DetailView به replica می‌فرستد
+    replica_reads = True
+
+    async def aget_context_data(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        context = await self.aget_context_data()
+        context.setdefault('view', self)
+        return TemplateResponse(request, self.template_name, context)
+
+
+class ArticleListView(AsyncConditionalGetMixin, SurrogateKeysMixin, ReadView):
+    """
+    لیست مقالات منتشر شده با صفحه‌بندی ترکیبی (شماره صفحه و کرسر).
+    """
+    template_name = 'blog/articles_list.html'
+    paginate_by = 3
+    offset_pages = 5
+    page_kwarg = 'page'
+    cursor_kwarg = 'cursor'
+    surrogate_keys = ('articles', 'sidebar')
+
+    async def get_queryset(self):
+        return Article.objects.published().cards()
+
+    async def get_validators(self):
+        return await alisting_validators(Article.objects.published(), 'articles', 'sidebar', 'categories')
+
+    async def get_extra_context(self):
+        return {}
+
+    async def aget_context_data(self):
+        queryset = await self.get_queryset()
+        paginator, page, articles, is_paginated = await apaginate(
+            queryset, self.request, self.paginate_by, self.offset_pages, self.page_kwarg, self.cursor_kwarg,
+        )
+        context = {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': is_paginated,
+            'object_list': articles,
+            'articles': articles,
+            **page_links(page, self.page_kwarg, self.cursor_kwarg),
+            **await self.get_extra_context(),
+        }
+        add_surrogate_keys(self.request, *self.get_surrogate_keys(context))
+        return context
+
+
+class CategoryArticleListView(ArticleListView):
+    """
+    لیست مقالات منتشر شده یک دسته‌بندی.
+    """
+    surrogate_keys = ('sidebar',)
+
+    async def get_queryset(self):
+        try:
+            self.category = await Category.objects.aget(pk=self.kwargs['pk'])
+        except Category.DoesNotExist:
+            raise Http404('دسته‌بندی پیدا نشد.')
+        return Article.objects.published().filter(category=self.category).cards()
+
+    async def get_validators(self):
+        pk = self.kwargs['pk']
+        return await alisting_validators(
+            Article.objects.published().filter(category=pk),
+            category_key(pk), 'articles', 'sidebar', 'categories',
+        )
+
+    def get_surrogate_keys(self, context):
+        return super().get_surrogate_keys(context) + [category_key(self.category)]
+
+    async def get_extra_context(self):
+        return {'category': self.category}
+
+
+class ArticleDetailView(AsyncConditionalGetMixin, SurrogateKeysMixin, ReadView):
+    """
+    جزئیات یک مقاله، نظرات آن و فرم ارسال نظر.
+    """
+    template_name = 'blog/article_details.html'
+
+    article = None
+
+    async def get_object(self):
+        # مقاله از کش مقالات (article_cache)؛ اسلاگ ناموجود هم کش شده است
+        if self.article is None:
+            self.article = await aget_article(self.kwargs['slug'])
+        return self.article
+
+    async def get_validators(self):
+        article = await self.get_object()
+        return [article.updated, *(await aget_versions([article_key(article), 'sidebar', 'categories'])).values()]
+
+    async def aget_context_data(self):
+        article = await self.get_object()
+        user = await request_user(self.request)
+        context = {
+            'object': article,
+            'article': article,
+            'comment_form': CommentForm(),
+            # درخت نظرات فقط اگر قطعه نظرات در کش نباشد، در thread رندر ساخته می‌شود
+            'comment_tree': SimpleLazyObject(article.comments.tree),
+            'comment_version': (await aget_versions([article_key(article)]))[article_key(article)],
+            'is_liked': await likes.ais_liked(user, article),
+            'total_likes': await likes.alike_count(article),
+        }
+        add_surrogate_keys(self.request, *self.get_surrogate_keys(context))
+        return context
+
+
+class SearchListView(AsyncConditionalGetMixin, SurrogateKeysMixin, ReadView):
+    """
+    نتایج جستجو به ترتیب امتیاز BM25؛ فقط مقالات صفحه جاری از دیتابیس خوانده می‌شوند.
+    """
+    template_name = 'blog/articles_list.html'
+    paginate_by = 3
+    page_kwarg = 'page'
+    surrogate_keys = ('search', 'sidebar')
+
+    async def get_validators(self):
+        return await alisting_validators(Article.objects.published(), 'search', 'sidebar', 'categories')
+
+    async def aget_context_data(self):
+        query = self.request.GET.get('q')
+        results = await asearch(query) if query else SearchResults([], set())
+        paginator = Paginator(results.ranked, self.paginate_by)
+        page = get_page(paginator, self.request.GET.get(self.page_kwarg) or 1)
+        page.object_list = await results.aload(page.object_list)
+        context = {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            'articles': page.object_list,
+            'search_query': self.request.GET.get('q', ''),
+            **page_links(page, self.page_kwarg),
+        }
+        add_surrogate_keys(self.request, *self.get_surrogate_keys(context))
+        return context
@@ -0,0 +1,150 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+# ==================================
+# کلیدهای نسخه‌دار کش
+# ==================================
+# به جای پاک کردن تک‌تک کلیدهای کش، برای هر بخش یک «شماره نسخه» نگه می‌داریم.
+# داده‌ها زیر کلیدی ذخیره می‌شوند که شماره نسخه در آن است؛ با بالا بردن نسخه،
+# همه کلیدهای قبلی خودبه‌خود بی‌اعتبار می‌شوند و به مرور از کش حذف می‌شوند.
+# همین نسخه‌ها به عنوان surrogate key برای کش کامل صفحات هم استفاده می‌شوند.
+#
+# نسخه‌ها در کش state نگه داشته می‌شوند (نه default) تا با پر شدن کش صفحات حذف نشوند.
+# نسخه‌ها فقط با هم مقایسه می‌شوند (برابر یا نابرابر)، پس بالا بردن نسخه یعنی گذاشتن یک مقدار
+# جدید (زمان فعلی)؛ برخلاف incr (که در کش فایلی خواندن و نوشتن جداست) با درخواست‌های همزمان گم
+# نمی‌شود. چون نسخه زمان آخرین تغییر بخش است، Last-Modified صفحات هم از روی آن ساخته می‌شود.
+
+VERSION_KEY_PREFIX = 'standblog:version:'
+STATE_CACHE_ALIAS = 'state'
+
+# مثل django.core.cache.cache: هر thread نمونه خودش را از کش state می‌گیرد
+state_cache = ConnectionProxy(caches, STATE_CACHE_ALIAS)
+
+
+class Version(int):
+    """
+    شماره نسخه یک بخش: زمان آخرین تغییر آن به نانوثانیه.
+    """
+
+    def timestamp(self):
+        # مثل datetime.timestamp (ثانیه)، تا در Last-Modified کنار زمان‌های ویرایش استفاده شود
+        return self / 1_000_000_000
+
+
+def _new_version():
+    # از روی زمان ساخته می‌شود تا اگر کلید نسخه از کش حذف شد،
+    # نسخه جدید با نسخه‌های قدیمی ذخیره‌شده در داده‌ها اشتباه گرفته نشود.
+    return time.time_ns()
+
+
+def get_version(name):
+    """
+    شماره نسخه فعلی یک بخش را برمی‌گرداند (اگر وجود نداشت، ساخته می‌شود).
+    """
+    key = VERSION_KEY_PREFIX + name
+    version = state_cache.get(key)
+    if version is None:
+        # add فقط در صورتی مقدار می‌گذارد که کلید وجود نداشته باشد
+        state_cache.add(key, _new_version(), timeout=None)
+        version = state_cache.get(key)
+    return Version(version)
+
+
+def find_version(name):
+    """
+    نسخه بخش اگر تا حالا ساخته یا بالا برده شده باشد، وگرنه None (برخلاف get_version نسخه‌ای نمی‌سازد).
+    """
+    version = state_cache.get(VERSION_KEY_PREFIX + name)
+    return Version(version) if version is not None else None
+
+
+async def afind_version(name):
+    """
+    نسخه async برای find_version.
+    """
+    version = await state_cache.aget(VERSION_KEY_PREFIX + name)
+    return Version(version) if version is not None else None
+
+
+def get_versions(names):
+    """
+    نسخه چند بخش را با یک درخواست به کش برمی‌گرداند: {نام: نسخه}.
+    بخش‌هایی که هنوز نسخه ندارند ساخته می‌شوند.
+    """
+    found = state_cache.get_many([VERSION_KEY_PREFIX + name for name in names])
+    versions = {}
+    for name in names:
+        version = found.get(VERSION_KEY_PREFIX + name)
+        versions[name] = Version(version) if version is not None else get_version(name)
+    return versions
+
+
+async def aget_versions(names):
+    """
+    نسخه async برای get_versions (برای ویوهای async).
+    """
+    found = await state_cache.aget_many([VERSION_KEY_PREFIX + name for name in names])
+    versions = {}
+    for name in names:
+        key = VERSION_KEY_PREFIX + name
+        version = found.get(key)
+        if version is None:
+            await state_cache.aadd(key, _new_version(), timeout=None)
+            version = await state_cache.aget(key)
+        versions[name] = Version(version)
+    return versions
+
+
+def bump_version(*names):
+    """
+    نسخه یک یا چند بخش را بالا می‌برد تا کش‌های قبلی آن‌ها بی‌اعتبار شوند.
+    داخل تراکنش، این کار بعد از commit انجام می‌شود؛ وگرنه درخواست همزمان ممکن است
+    داده قبل از commit را با نسخه جدید کش کند.
+    """
+    keys = [VERSION_KEY_PREFIX + name for name in names]
+    transaction.on_commit(lambda: state_cache.set_many(dict.fromkeys(keys, _new_version()), timeout=None))
+
+
+def changed_since(versions, started, lag=0):
+    """
+    آیا یکی از نسخه‌ها (مقادیر get_versions) از زمان started بالا رفته است؟ started زمان
+    (time.time_ns) قبل از خواندن داده از دیتابیس است. داده‌ای که کلیدهایش در این فاصله بالا
+    رفته‌اند ممکن است مقدار قبل از تغییر را داشته باشد و نباید زیر نسخه‌های جدید کش شود.
+    lag (ثانیه) برای داده خوانده شده از replica است که از دیتابیس اصلی عقب‌تر است.
+    VERSION_CLOCK_SKEW اختلاف ساعت سرورهایی است که نسخه‌ها را می‌سازند. نسخه‌ای که برای اولین
+    بار ساخته می‌شود هم جدید حساب می‌شود؛ داده آن درخواست فقط یک بار کش نمی‌شود.
+    """
+    margin = lag + getattr(settings, 'VERSION_CLOCK_SKEW', 0)
+    newest = started - int(margin * 1_000_000_000)
+    return any(version >= newest for version in versions)
+
+
+def versioned_key(name, *parts):
+    """
+    یک کلید کش می‌سازد که نسخه فعلی بخش در آن قرار دارد.
+    """
+    return ':'.join(['standblog', name, str(get_version(name)), *map(str, parts)])
+
+
+# ==================================
+# کلید کش قطعه‌های تمپلیت
+# ==================================
+# قطعه‌های مربوط به یک مقاله (متن، دسته‌بندی‌ها، درخت نظرات، کارت‌ها) با کلیدی کش می‌شوند
+# که زمان آخرین ویرایش مقاله (updated) و نسخه دسته‌بندی‌ها در آن است. هر چیز دیگری که
+# قطعه به آن وابسته است (مثلا تعداد نظرات یا نسخه نظرات و لایک‌ها) از تمپلیت فرستاده می‌شود.
+FRAGMENT_KEY_PREFIX = 'standblog:fragment:'
+
+
+def fragment_key(name, article, *vary_on):
+    """
+    کلید کش قطعه name از مقاله article. با ویرایش مقاله، تغییر دسته‌بندی‌ها
+    یا تغییر یکی از مقادیر vary_on، کلید عوض می‌شود.
+    """
+    vary = hashlib.md5(':'.join(map(str, vary_on)).encode(), usedforsecurity=False).hexdigest()
+    updated = int(article.updated.timestamp() * 1_000_000)
+    return f'{FRAGMENT_KEY_PREFIX}{name}:{article.pk}:{updated}:{get_version("categories")}:{vary}'
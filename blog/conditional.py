@@ -0,0 +1,147 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import aget_versions, get_versions
+from .page_cache import user_key
+
+# ==================================
+# درخواست‌های شرطی (ETag و Last-Modified)
+# ==================================
+# قبل از رندر صفحه، از روی چند مقدار ارزان (زمان ویرایش مقاله، نسخه‌های کش در blog/cache.py
+# و در لیست‌ها یک کوئری aggregate) یک ETag ساخته می‌شود. اگر مرورگر، فیدخوان یا خزنده همین
+# ETag را در If-None-Match بفرستد، بدون رندر تمپلیت 304 برمی‌گردد.
+# برای کاربر واردشده نسخه user:<pk> هم در ETag است، چون هدر صفحه نام و تصویر پروفایل او را دارد.
+# Last-Modified جدیدترین زمان بین همین مقادیر است (زمان‌های ویرایش و نسخه‌ها که زمان تغییرشان هستند).
+
+
+def make_etag(request, parts, user=None):
+    """
+    ETag ضعیف صفحه از روی مقادیری که محتوای آن به آن‌ها وابسته است. کاربر و کوکی CSRF هم
+    در آن هستند، چون صفحه برای هر کاربر (دکمه لایک، فرم‌ها و توکن CSRF) متفاوت است.
+    ویوهای async کاربر را (از request_user) خودشان می‌فرستند.
+    """
+    user = request.user if user is None else user
+    raw = ':'.join(map(str, [
+        *parts,
+        user.pk or 0,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]))
+    return f'W/"{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def last_modified_of(parts):
+    """
+    جدیدترین زمان (timestamp) بین مقادیر ETag: datetime ها و نسخه‌های blog.cache.
+    """
+    timestamps = [part.timestamp() for part in parts if hasattr(part, 'timestamp')]
+    return int(max(timestamps)) if timestamps else None
+
+
+def user_versions(user):
+    return list(get_versions([user_key(user)]).values()) if user.is_authenticated else []
+
+
+async def auser_versions(user):
+    return list((await aget_versions([user_key(user)])).values()) if user.is_authenticated else []
+
+
+def listing_validators(queryset, *version_names):
+    """
+    مقادیر ETag یک لیست مقالات با یک کوئری: تعداد مقالات، آخرین زمان ویرایش و مجموع نظرات
+    (تعداد نظرات در کارت‌ها نمایش داده می‌شود) به اضافه نسخه‌های کش داده شده.
+    """
+    stats = queryset.order_by().aggregate(
+        count=Count('pk'), updated=Max('updated'), comments=Sum('comment_count'),
+    )
+    return [*stats.values(), *get_versions(list(version_names)).values()]
+
+
+async def alisting_validators(queryset, *version_names):
+    """
+    نسخه async برای listing_validators.
+    """
+    stats = await queryset.order_by().aaggregate(
+        count=Count('pk'), updated=Max('updated'), comments=Sum('comment_count'),
+    )
+    return [*stats.values(), *(await aget_versions(list(version_names))).values()]
+
+
+async def request_user(request):
+    """
+    کاربر درخواست در ویوهای async. request.user همان شیئی است که تمپلیت‌ها و context processor ها
+    در thread رندر می‌خوانند؛ request.auser() کش جداگانه دارد و کاربر را دوباره از دیتابیس می‌خواند.
+    """
+    await sync_to_async(lambda: request.user.pk)()
+    return request.user
+
+
+def has_pending_messages(request):
+    # پیام‌های در انتظار فقط با رندر صفحه نمایش داده (و مصرف) می‌شوند
+    return bool(len(get_messages(request)))
+
+
+def add_validator_headers(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # مرورگر هر بار (با همین هدرها) اعتبار صفحه را بررسی کند، نه اینکه نسخه قدیمی را نشان دهد
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    برای ویوهایی که get_validators را پیاده‌سازی می‌کنند: اگر ETag یا Last-Modified درخواست
+    با صفحه فعلی یکی باشد، 304 برمی‌گرداند؛ وگرنه صفحه را رندر و این هدرها را اضافه می‌کند.
+    """
+
+    def get_validators(self):
+        """
+        لیست مقادیری که محتوای صفحه به آن‌ها وابسته است؛ None یعنی درخواست شرطی بررسی نشود.
+        """
+        return None
+
+    def get(self, request, *args, **kwargs):
+        validators = None if has_pending_messages(request) else self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        validators = [*validators, *user_versions(request.user)]
+        etag = make_etag(request, validators)
+        last_modified = last_modified_of(validators)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return add_validator_headers(response, etag, last_modified)
+
+
+class AsyncConditionalGetMixin:
+    """
+    همان ConditionalGetMixin برای ویوهای async: get_validators و get ویو هر دو async هستند.
+    """
+
+    async def get_validators(self):
+        return None
+
+    async def get(self, request, *args, **kwargs):
+        # پیام‌ها در نشست هستند و نشست با ORM همزمان (sync) خوانده می‌شود
+        pending = await sync_to_async(has_pending_messages)(request)
+        validators = None if pending else await self.get_validators()
+        if validators is None:
+            return await super().get(request, *args, **kwargs)
+
+        user = await request_user(request)
+        validators = [*validators, *await auser_versions(user)]
+        etag = make_etag(request, validators, user=user)
+        last_modified = last_modified_of(validators)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().get(request, *args, **kwargs)
+        return add_validator_headers(response, etag, last_modified)
@@ -1,27 +1,55 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.functional import SimpleLazyObject
+
+from standblog.routers import primary_reads
+
+from .cache import versioned_key
 from .models import Article, Category
-from django.db.models import Count
+
+# مدت نگهداری داده‌های سایدبار در کش (ثانیه).
+# چون کلید نسخه‌دار است، با هر تغییر در مقالات یا دسته‌بندی‌ها خودبه‌خود بی‌اعتبار می‌شود.
+SIDEBAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_sidebar_payload():
+    """
+    داده‌های سایدبار را از کش می‌خواند و در صورت نبودن، با دو کوئری می‌سازد.
+    """
+    key = versioned_key('sidebar')
+    payload = cache.get(key)
+    if payload is None:
+        # داده کش مشترک از دیتابیس اصلی خوانده می‌شود (standblog/routers.py)
+        with primary_reads():
+            # دریافت 5 مقاله آخر که "منتشر شده" هستند
+            recent_posts = list(
+                Article.objects.filter(status='p').order_by('-created').only('title', 'slug', 'created')[:5]
+            )
+            # دسته‌بندی‌هایی که حداقل یک مقاله منتشر شده دارند، همراه با تعداد همان مقالات
+            all_categories = list(
+                Category.objects.annotate(num_articles=Count('articles', filter=Q(articles__status='p')))
+                .filter(num_articles__gt=0)
+            )
+            payload = {
+                'recent_posts': recent_posts,
+                'all_categories': all_categories,
+            }
+        cache.set(key, payload, SIDEBAR_CACHE_TIMEOUT)
+    return payload
+
 
 def sidebar_data(request):
     """
     این تابع داده‌هایی که در سایدبار تمام صفحات لازم است را فراهم می‌کند.
+    مقادیر تنبل (lazy) هستند: تا وقتی تمپلیتی واقعا از آن‌ها استفاده نکند،
+    نه کش خوانده می‌شود و نه کوئری اجرا می‌شود (مثلا در صفحات ادمین و حساب کاربری).
+    در ویوهای async هم امن است: جنگو تمپلیت را در یک thread همزمان رندر می‌کند و
+    مقادیر تنبل همان‌جا (نه در event loop) ساخته می‌شوند.
     """
-    
-    # دریافت 5 مقاله آخر که "منتشر شده" هستند
-    recent_posts = Article.objects.filter(status='p').order_by('-created')[:5]
-    
-    # دریافت تمام دسته‌بندی‌ها همراه با تعداد مقالات هر کدام
-    # annotate یک فیلد جدید (num_articles) به هر دسته‌بندی اضافه می‌کند
-    all_categories = Category.objects.annotate(num_articles=Count('articles')).filter(articles__status='p').distinct()
-
-    # برگرداندن داده‌ها در قالب یک دیکشنری
+    payload = SimpleLazyObject(get_sidebar_payload)
+
     # کلیدهای این دیکشنری به عنوان متغیر در تمام تمپلیت‌ها در دسترس خواهند بود.
     return {
-        'recent_posts': recent_posts,
-        'all_categories': all_categories,
+        'recent_posts': SimpleLazyObject(lambda: payload['recent_posts']),
+        'all_categories': SimpleLazyObject(lambda: payload['all_categories']),
     }
-
-
-def all_categories(request):
-   # این کد با یک کوئری تمام دسته‌بندی‌هایی که حداقل یک مقاله دارند را پیدا می‌کند
-    categories = Category.objects.annotate(num_articles=Count('articles')).filter(num_articles__gt=0)
-    return {'all_categories': categories}
\ No newline at end of file
@@ -0,0 +1,206 @@
+import hashlib
+from io import StringIO
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.xmlutils import SimplerXMLGenerator
+from django.views import View
+
+from .cache import get_versions
+from .conditional import ConditionalGetMixin
+from .models import Article, Category
+
+# ==================================
+# فیدهای RSS و Atom
+# ==================================
+# فید کل سایت و فید هر دسته‌بندی از خلاصه ذخیره‌شده مقالات (excerpt) ساخته می‌شود، نه متن کامل.
+# فید تکه‌تکه (سربرگ، هر مقاله، پایان) با یک generator فرستاده می‌شود و همان تکه‌ها در پایان
+# زیر کلیدی که نسخه «feeds» در آن است کش می‌شوند؛ سیگنال‌ها با هر ذخیره یا حذف مقاله و
+# تغییر دسته‌بندی‌ها این نسخه را بالا می‌برند. فیدخوانی که ETag قبلی را بفرستد و چیزی
+# عوض نشده باشد، با یک کوئری aggregate پاسخ 304 می‌گیرد.
+
+FEED_ITEMS = 20
+FEED_TITLE = 'وبلاگ من'
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_KEY_PREFIX = 'standblog:feed:'
+FEED_VERSION = 'feeds'
+
+
+class StreamingFeedMixin:
+    """
+    به جای write (که کل فید را یکجا در حافظه می‌نویسد)، stream فید را تکه‌تکه برمی‌گرداند.
+    آیتم‌ها یکی‌یکی از generator خوانده می‌شوند و در self.items جمع نمی‌شوند.
+    """
+    item_element = None
+
+    def __init__(self, *args, last_updated=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_updated = last_updated
+
+    def latest_post_date(self):
+        # سربرگ فید قبل از خواندن آیتم‌ها نوشته می‌شود؛ آخرین زمان ویرایش از قبل معلوم است
+        return self.last_updated or super().latest_post_date()
+
+    def start_document(self, handler):
+        raise NotImplementedError
+
+    def end_document(self, handler):
+        raise NotImplementedError
+
+    def stream(self, items, encoding='utf-8'):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, encoding, short_empty_elements=True)
+
+        def drain():
+            chunk = buffer.getvalue().encode(encoding)
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        handler.startDocument()
+        self.start_document(handler)
+        self.add_root_elements(handler)
+        yield drain()
+        for kwargs in items:
+            self.add_item(**kwargs)
+            item = self.items.pop()
+            handler.startElement(self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield drain()
+        self.end_document(handler)
+        yield drain()
+
+
+class RssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+    def start_document(self, handler):
+        self.add_stylesheets(handler)
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+
+    def end_document(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+class AtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+    def start_document(self, handler):
+        handler.startElement('feed', self.root_attributes())
+
+    def end_document(self, handler):
+        handler.endElement('feed')
+
+
+def cache_stream(chunks, key, timeout=FEED_CACHE_TIMEOUT):
+    """
+    تکه‌ها را همان‌طور که ساخته می‌شوند برمی‌گرداند و بعد از آخرین تکه کل سند را کش می‌کند.
+    اگر کلاینت وسط کار قطع شود، سند ناقص کش نمی‌شود.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(parts), timeout)
+
+
+class FeedView(View):
+    """
+    پایه ویوهای فید: فید کش‌شده را برمی‌گرداند یا آن را تکه‌تکه می‌سازد و همزمان کش می‌کند.
+    نوع فید (RssFeed یا AtomFeed) در urls.py مشخص می‌شود.
+    """
+    feed_type = RssFeed
+    last_updated = None
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get_feed_info(self):
+        raise NotImplementedError
+
+    def get_cache_key(self):
+        # آدرس کامل (دامنه و نوع فید) در کلید است چون لینک‌های داخل فید مطلق هستند
+        raw = f'{self.request.build_absolute_uri()}:{get_versions([FEED_VERSION])[FEED_VERSION]}'
+        return FEED_KEY_PREFIX + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+    def iter_items(self):
+        articles = self.get_queryset().cards().order_by('-created', '-pk')[:FEED_ITEMS]
+        for article in articles.iterator(chunk_size=FEED_ITEMS):
+            link = self.request.build_absolute_uri(article.get_absolute_url())
+            yield {
+                'title': article.title,
+                'link': link,
+                'description': article.excerpt,
+                'unique_id': link,
+                'unique_id_is_permalink': True,
+                'pubdate': article.created,
+                'updateddate': article.updated,
+                'author_name': article.author.get_full_name() or article.author.get_username(),
+                'categories': [category.title for category in article.category.all()],
+            }
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cache_key()
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content, content_type=self.feed_type.content_type)
+
+        info = self.get_feed_info()
+        feed = self.feed_type(
+            title=info['title'],
+            link=request.build_absolute_uri(info['link']),
+            description=info['description'],
+            feed_url=request.build_absolute_uri(),
+            language='fa',
+            last_updated=self.last_updated,
+        )
+        return StreamingHttpResponse(
+            cache_stream(feed.stream(self.iter_items()), key), content_type=feed.content_type,
+        )
+
+
+class ArticleFeedView(ConditionalGetMixin, FeedView):
+    """
+    فید آخرین مقالات منتشر شده.
+    """
+
+    def get_queryset(self):
+        return Article.objects.published()
+
+    def get_validators(self):
+        # تعداد و آخرین زمان ویرایش مقالات با یک کوئری؛ فیدخوانی که چیز تازه‌ای ندارد 304 می‌گیرد
+        stats = self.get_queryset().order_by().aggregate(count=Count('pk'), updated=Max('updated'))
+        self.last_updated = stats['updated']
+        return [*stats.values(), get_versions([FEED_VERSION])[FEED_VERSION]]
+
+    def get_feed_info(self):
+        return {
+            'title': FEED_TITLE,
+            'link': reverse('blog:articles_list'),
+            'description': f'آخرین مقالات {FEED_TITLE}',
+        }
+
+
+class CategoryFeedView(ArticleFeedView):
+    """
+    فید آخرین مقالات منتشر شده یک دسته‌بندی.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(category=self.kwargs['pk'])
+
+    def get_feed_info(self):
+        # فقط وقتی فید در کش نیست اجرا می‌شود؛ حذف دسته‌بندی نسخه فیدها را بالا می‌برد
+        category = get_object_or_404(Category, pk=self.kwargs['pk'])
+        return {
+            'title': f'{FEED_TITLE} - {category.title}',
+            'link': reverse('blog:category_list', kwargs={'pk': category.pk}),
+            'description': f'آخرین مقالات دسته‌بندی {category.title}',
+        }
@@ -0,0 +1,251 @@
+import os
+import secrets
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .cache import bump_version, state_cache
+from .models import Article, Like
+
+try:
+    import fcntl
+except ImportError:  # ویندوز؛ فقط برای توسعه تک‌پردازشی
+    fcntl = None
+
+# ==================================
+# لایک‌ها با حالت اختیاری write-behind
+# ==================================
+# در حالت عادی هر کلیک مستقیما در جدول Like نوشته می‌شود (Like.toggle).
+# با LIKE_WRITE_BEHIND = True کلیک‌ها ابتدا در یک فایل ژورنال (append-only) ثبت می‌شوند.
+# دستور flush_likes ژورنال را می‌خواند، برای هر (کاربر، مقاله) فقط آخرین وضعیت را نگه می‌دارد
+# و آن را دسته‌ای با bulk_create و یک DELETE در دیتابیس اعمال می‌کند.
+#
+# ژورنال تنها منبع وضعیت‌های در انتظار است. برای اینکه خواندن‌ها (is_liked و تعداد لایک) فورا
+# وضعیت جدید را ببینند، خلاصه ژورنال (وضعیت در انتظار هر کاربر و تغییر تعداد هر مقاله) در کش
+# state نگه داشته می‌شود. این خلاصه یک «نسل» دارد: هر flush نسل را کنار می‌گذارد و اگر نسل از کش
+# حذف شده باشد، خلاصه دوباره از روی ژورنال ساخته می‌شود. همه تغییرات خلاصه زیر قفل انحصاری
+# ژورنال انجام می‌شود، پس کلیک‌های همزمان و flush هیچ تغییری را گم نمی‌کنند.
+
+GENERATION_KEY = 'standblog:likes:generation'
+STATE_KEY = 'standblog:likes:{generation}:state:{article}:{user}'
+DELTA_KEY = 'standblog:likes:{generation}:delta:{article}'
+
+
+def write_behind_enabled():
+    return getattr(settings, 'LIKE_WRITE_BEHIND', False)
+
+
+def toggle(user, article):
+    """
+    لایک کاربر را برعکس می‌کند و (لایک شده؟, تعداد لایک‌ها) را برمی‌گرداند.
+    """
+    if write_behind_enabled():
+        return LikeBuffer().toggle(user, article)
+    return Like.toggle(user, article)
+
+
+def _pending(key, **kwargs):
+    generation = state_cache.get(GENERATION_KEY) or LikeBuffer().load()
+    return state_cache.get(key.format(generation=generation, **kwargs))
+
+
+async def _apending(key, **kwargs):
+    generation = await state_cache.aget(GENERATION_KEY) or await sync_to_async(LikeBuffer().load)()
+    return await state_cache.aget(key.format(generation=generation, **kwargs))
+
+
+def is_liked(user, article):
+    """
+    آیا کاربر این مقاله را لایک کرده است؟ (با در نظر گرفتن لایک‌های در انتظار)
+    """
+    if not user.is_authenticated:
+        return False
+    if write_behind_enabled():
+        pending = _pending(STATE_KEY, article=article.pk, user=user.pk)
+        if pending is not None:
+            return pending
+    return Like.objects.filter(article=article, user=user).exists()
+
+
+def like_count(article):
+    """
+    تعداد لایک‌های مقاله (شمارنده ذخیره‌شده به اضافه تغییرات در انتظار).
+    """
+    if write_behind_enabled():
+        return max(0, article.like_count + (_pending(DELTA_KEY, article=article.pk) or 0))
+    return article.like_count
+
+
+async def ais_liked(user, article):
+    """
+    نسخه async برای is_liked (برای ویوهای async).
+    """
+    if not user.is_authenticated:
+        return False
+    if write_behind_enabled():
+        pending = await _apending(STATE_KEY, article=article.pk, user=user.pk)
+        if pending is not None:
+            return pending
+    return await Like.objects.filter(article=article, user=user).aexists()
+
+
+async def alike_count(article):
+    """
+    نسخه async برای like_count.
+    """
+    if write_behind_enabled():
+        return max(0, article.like_count + (await _apending(DELTA_KEY, article=article.pk) or 0))
+    return article.like_count
+
+
+class LikeBuffer:
+    """
+    ژورنال لایک‌های در انتظار. هر خط: «شناسه مقاله، شناسه کاربر، وضعیت جدید (1 یا 0)».
+    هر کلیک (خواندن وضعیت فعلی، نوشتن خط و به‌روز کردن خلاصه در کش) و جابه‌جا کردن ژورنال
+    در flush زیر یک قفل انحصاری روی فایل انجام می‌شوند.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.LIKE_JOURNAL_PATH
+        self.flushing_path = self.path + '.flushing'
+        self.lock_path = self.path + '.lock'
+
+    @contextmanager
+    def _lock(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _entries(self, *paths):
+        """
+        خط‌های ژورنال(ها) به ترتیب: (شناسه مقاله، شناسه کاربر، لایک شده؟)
+        """
+        for path in paths:
+            try:
+                journal = open(path)
+            except FileNotFoundError:
+                continue
+            with journal:
+                for line in journal:
+                    try:
+                        article_id, user_id, state = map(int, line.split())
+                    except ValueError:
+                        continue  # خط ناقص (مثلا بعد از قطع برق)
+                    yield article_id, user_id, bool(state)
+
+    def _summary(self, generation, *paths):
+        """
+        خلاصه ژورنال(ها) به صورت کلیدهای کش نسل generation: آخرین وضعیت هر (مقاله، کاربر)
+        و مجموع تغییرات تعداد لایک هر مقاله.
+        """
+        values = defaultdict(int)
+        for article_id, user_id, liked in self._entries(*paths):
+            values[STATE_KEY.format(generation=generation, article=article_id, user=user_id)] = liked
+            values[DELTA_KEY.format(generation=generation, article=article_id)] += 1 if liked else -1
+        return values
+
+    def _generation(self):
+        # فقط زیر قفل صدا زده می‌شود
+        generation = state_cache.get(GENERATION_KEY)
+        if generation is None:
+            # خلاصه از کش رفته (یا flush آن را کنار گذاشته)؛ از روی ژورنال‌ها ساخته می‌شود.
+            # ژورنال در حال flush هم حساب می‌شود، چون تا پایان flush در دیتابیس نیامده است.
+            generation = secrets.token_hex(8)
+            state_cache.set_many(self._summary(generation, self.flushing_path, self.path), timeout=None)
+            state_cache.set(GENERATION_KEY, generation, timeout=None)
+        return generation
+
+    def load(self):
+        """
+        نسل فعلی خلاصه ژورنال در کش (اگر نبود، ساخته می‌شود).
+        """
+        with self._lock():
+            return self._generation()
+
+    def toggle(self, user, article):
+        with self._lock():
+            generation = self._generation()
+            state_key = STATE_KEY.format(generation=generation, article=article.pk, user=user.pk)
+            delta_key = DELTA_KEY.format(generation=generation, article=article.pk)
+            pending = state_cache.get_many([state_key, delta_key])
+            if state_key in pending:
+                liked = not pending[state_key]
+            else:
+                liked = not Like.objects.filter(article=article, user=user).exists()
+
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, f'{article.pk} {user.pk} {int(liked)}\n'.encode())
+            finally:
+                os.close(fd)
+            delta = pending.get(delta_key, 0) + (1 if liked else -1)
+            state_cache.set_many({state_key: liked, delta_key: delta}, timeout=None)
+
+        # صفحه مقاله در کش صفحات باید تعداد جدید را نشان دهد
+        bump_version(f'article:{article.pk}')
+        return liked, max(0, article.like_count + delta)
+
+    def flush(self, batch_size=1000):
+        """
+        لایک‌های در انتظار را در دیتابیس اعمال می‌کند و تعداد جفت‌های اعمال شده را برمی‌گرداند.
+        اگر flush قبلی نیمه‌کاره مانده باشد، ابتدا همان فایل پردازش می‌شود.
+        """
+        if not os.path.exists(self.flushing_path):
+            with self._lock():
+                if not os.path.exists(self.path):
+                    return 0
+                os.replace(self.path, self.flushing_path)
+
+        final = {}
+        for article_id, user_id, liked in self._entries(self.flushing_path):
+            final[(article_id, user_id)] = liked
+        pairs = list(final.items())
+
+        # خلاصه قبلی لایک‌های همین فایل را هم شامل می‌شود. اگر بعد از commit باقی بماند، تا کنار
+        # گذاشته شدنش هر لایک دو بار شمرده می‌شود (یک بار در like_count مقاله و یک بار در انتظار).
+        # پس همه دسته‌ها در یک تراکنش اعمال می‌شوند و خلاصه قبل از commit، زیر قفل، کنار گذاشته
+        # می‌شود. قفل تا بعد از commit و حذف فایل نگه داشته می‌شود تا کلیکی در این فاصله خلاصه را
+        # دوباره از روی فایل در حال flush نسازد؛ خواننده‌ای که نسلی پیدا نکند (load) تا پایان صبر می‌کند.
+        with ExitStack() as locked:
+            with transaction.atomic():
+                for start in range(0, len(pairs), batch_size):
+                    self._apply(pairs[start:start + batch_size])
+                locked.enter_context(self._lock())
+                generation = state_cache.get(GENERATION_KEY)
+                state_cache.delete(GENERATION_KEY)
+                if generation is not None:
+                    state_cache.delete_many(list(self._summary(generation, self.flushing_path, self.path)))
+            os.remove(self.flushing_path)
+        bump_version(*{f'article:{article_id}' for article_id, _ in final})
+        return len(pairs)
+
+    @staticmethod
+    def _apply(pairs):
+        likes = [Like(article_id=article_id, user_id=user_id) for (article_id, user_id), liked in pairs if liked]
+        unlikes = defaultdict(list)
+        for (article_id, user_id), liked in pairs:
+            if not liked:
+                unlikes[article_id].append(user_id)
+        article_ids = {article_id for (article_id, _), _ in pairs}
+
+        # داخل تراکنش flush اجرا می‌شود
+        Like.objects.bulk_create(likes, ignore_conflicts=True)
+        for article_id, user_ids in unlikes.items():
+            Like.objects.filter(article_id=article_id, user_id__in=user_ids).delete()
+        # شمارنده‌ها از روی جدول Like دقیق محاسبه می‌شوند
+        counted = (
+            Like.objects.filter(article=OuterRef('pk'))
+            .order_by().values('article').annotate(c=Count('pk')).values('c')
+        )
+        Article.objects.filter(pk__in=article_ids).update(like_count=Coalesce(Subquery(counted), 0))
@@ -0,0 +1,214 @@
+import json
+import math
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+from blog.models import Article, Category
+
+# مبنای commit شده فقط مسیرها، کد وضعیت و تعداد کوئری‌ها را دارد که به سخت‌افزار بستگی ندارند.
+# زمان‌ها روی هر دستگاه متفاوت‌اند؛ در فایل محلی جداگانه (خارج از git) ذخیره و مقایسه می‌شوند.
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+DEFAULT_TIMINGS = os.path.join(settings.BASE_DIR, 'benchmarks', 'timings.local.json')
+BASELINE_FIELDS = ('url', 'status', 'queries', 'cold_queries')
+TIMING_FIELDS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+# مسیرهایی که وضعیت را تغییر می‌دهند یا فقط POST می‌پذیرند اندازه‌گیری نمی‌شوند
+SKIPPED_ROUTES = {
+    'blog:add_comment',
+    'blog:like_article',
+    'blog:toggle_like',
+    'accounts:logout',
+}
+SKIPPED_NAMESPACES = {'admin'}
+
+# پارامترهای کوئری برای مسیرهایی که بدون آن‌ها صفحه خالی نشان می‌دهند
+ROUTE_QUERY = {
+    'blog:search': lambda article: {'q': article.title.split()[0]},
+}
+
+
+def iter_named_routes(resolver=None, namespace=None):
+    """
+    تمام مسیرهای نام‌دار پروژه را به صورت (نام کامل، الگو) برمی‌گرداند.
+    """
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            inner = ':'.join(filter(None, [namespace, pattern.namespace])) or None
+            yield from iter_named_routes(pattern, inner)
+        elif pattern.name:
+            yield (f'{namespace}:{pattern.name}' if namespace else pattern.name), pattern
+
+
+def select(result, fields):
+    return {field: result[field] for field in fields}
+
+
+def percentile(values, percent):
+    """
+    صدک به روش nearest-rank: کوچک‌ترین مقداری که percent درصد مقادیر از آن کوچک‌تر یا برابرند.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(percent * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """
+    همه مسیرهای نام‌دار را با test client چند بار فراخوانی می‌کند، صدک‌های زمان پاسخ
+    (p50/p95/p99) و تعداد کوئری‌ها را گزارش می‌دهد؛ کد وضعیت و تعداد کوئری‌ها را با فایل baseline
+    و زمان‌ها را با فایل محلی timings (ساخته شده روی همین دستگاه) مقایسه می‌کند.
+    اگر تعداد کوئری یا کد وضعیت تغییر کند یا p95 بیش از حد مجاز کندتر شود، با خطا خارج می‌شود.
+    قبل از اجرا با seed_blog داده آزمایشی بسازید.
+    """
+    help = 'اندازه‌گیری زمان پاسخ و تعداد کوئری همه مسیرها و مقایسه با baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='تعداد درخواست برای هر مسیر')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='مسیر فایل JSON مبنا (کد وضعیت و تعداد کوئری)')
+        parser.add_argument('--timings', default=DEFAULT_TIMINGS, help='مسیر فایل JSON محلی زمان‌های مبنا')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='نتایج فعلی را به عنوان مبنا (و زمان‌ها را در فایل محلی) ذخیره کن')
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help='حداکثر کندی مجاز p95 نسبت به زمان‌های محلی (0.5 یعنی ۵۰٪)')
+        parser.add_argument('--username', help='اندازه‌گیری به عنوان این کاربر (پیش‌فرض: ناشناس)')
+        parser.add_argument('--cold', action='store_true', help='قبل از هر درخواست کش خالی شود')
+
+    def handle(self, *args, **options):
+        article = Article.objects.published().order_by('-created').first()
+        category = Category.objects.filter(articles__status='p').first()
+        if article is None or category is None:
+            raise CommandError('داده‌ای برای اندازه‌گیری نیست؛ ابتدا seed_blog را اجرا کنید.')
+        sample_kwargs = {'slug': article.slug, 'pk': category.pk, 'section': 'articles', 'page': 1}
+
+        # خطای یک مسیر نباید کل اندازه‌گیری را متوقف کند؛ کد وضعیت ۵۰۰ در نتایج ثبت می‌شود
+        client = Client(
+            SERVER_NAME=settings.ALLOWED_HOSTS[-1] if settings.ALLOWED_HOSTS else 'localhost',
+            raise_request_exception=False,
+        )
+        if options['username']:
+            client.force_login(User.objects.get(username=options['username']))
+
+        results = {}
+        for name, pattern in iter_named_routes():
+            if name in SKIPPED_ROUTES or name.split(':')[0] in SKIPPED_NAMESPACES:
+                continue
+            params = set(pattern.pattern.regex.groupindex)
+            if not params <= sample_kwargs.keys():
+                continue  # مثلا لینک‌های بازیابی رمز که توکن لازم دارند
+            url = reverse(name, kwargs={key: sample_kwargs[key] for key in params})
+            query = ROUTE_QUERY.get(name, lambda a: {})(article)
+            results[name] = self.measure(client, url, query, options['iterations'], options['cold'])
+
+        self.report(results)
+
+        # مبنای کاربر ناشناس و کاربر واردشده جدا نگه داشته می‌شود چون کش صفحه فقط برای ناشناس‌هاست
+        profile = 'authenticated' if options['username'] else 'anonymous'
+        baseline = self.load(options['baseline'])
+        timings = self.load(options['timings'])
+
+        if options['update_baseline']:
+            baseline[profile] = {name: select(result, BASELINE_FIELDS) for name, result in results.items()}
+            timings[profile] = {name: select(result, TIMING_FIELDS) for name, result in results.items()}
+            self.save(options['baseline'], baseline)
+            self.save(options['timings'], timings)
+            self.stdout.write(self.style.SUCCESS(
+                f'مبنا در {options["baseline"]} و زمان‌ها در {options["timings"]} ذخیره شد.'
+            ))
+            return
+
+        if profile not in baseline:
+            self.stdout.write(self.style.WARNING('مبنایی برای این حالت وجود ندارد؛ با --update-baseline بسازید.'))
+            return
+        if profile not in timings:
+            self.stdout.write(self.style.WARNING(
+                'زمان‌های محلی برای این حالت وجود ندارد؛ فقط کد وضعیت و تعداد کوئری‌ها مقایسه می‌شوند. '
+                'برای ساختن آن، دستور را روی نسخه مبنا با --update-baseline اجرا کنید.'
+            ))
+        regressions = self.compare(results, baseline[profile], timings.get(profile, {}), options['tolerance'])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} پسرفت نسبت به مبنا پیدا شد.')
+        self.stdout.write(self.style.SUCCESS('نسبت به مبنا پسرفتی وجود ندارد.'))
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as input_file:
+            return json.load(input_file)
+
+    @staticmethod
+    def save(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as output_file:
+            json.dump(data, output_file, indent=2, ensure_ascii=False, sort_keys=True)
+            output_file.write('\n')
+
+    def measure(self, client, url, query, iterations, cold):
+        from django.core.cache import cache
+
+        # درخواست اول با کش خالی: تعداد کوئری‌ها در حالت cold و گرم کردن کش‌ها
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            client.get(url, query)
+        cold_queries = len(captured)
+
+        timings, queries, status = [], [], None
+        for _ in range(iterations):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, query)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        return {
+            'url': url,
+            'status': status,
+            'queries': max(queries),
+            'cold_queries': cold_queries,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+        }
+
+    def report(self, results):
+        self.stdout.write(f'{"route":32} {"status":>6} {"queries":>7} {"cold":>5} {"p50":>8} {"p95":>8} {"p99":>8}')
+        for name, result in sorted(results.items()):
+            self.stdout.write(
+                f'{name:32} {result["status"]:>6} {result["queries"]:>7} {result["cold_queries"]:>5} '
+                f'{result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f}'
+            )
+
+    @staticmethod
+    def compare(results, baseline, timings, tolerance):
+        regressions = []
+        for name, result in sorted(results.items()):
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['status'] != expected['status']:
+                regressions.append(f'{name}: کد وضعیت {expected["status"]} -> {result["status"]}')
+            for field in ('queries', 'cold_queries'):
+                if result[field] > expected.get(field, result[field]):
+                    regressions.append(f'{name}: {field} {expected[field]} -> {result[field]}')
+            local = timings.get(name)
+            if local is None:
+                continue
+            # یک میلی‌ثانیه حاشیه برای صفحات خیلی سریع که نوسان نسبی زیادی دارند
+            allowed = local['p95_ms'] * (1 + tolerance) + 1
+            if result['p95_ms'] > allowed:
+                regressions.append(f'{name}: p95 از {local["p95_ms"]} به {result["p95_ms"]} میلی‌ثانیه رسید')
+        return regressions
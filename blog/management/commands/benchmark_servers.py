@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from itertools import cycle
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils.encoding import iri_to_uri
+
+from blog.models import Article, Category
+from .benchmark_routes import percentile
+
+SERVERS = ('wsgi', 'asgi')
+
+
+def server_command(kind, port, workers, threads):
+    """
+    دستور اجرای سرور: gunicorn با worker های thread دار برای WSGI و uvicorn برای ASGI.
+    """
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'standblog.wsgi:application',
+            '--config', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'),
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+            '--max-requests', '0', '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'standblog.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+        '--no-access-log', '--log-level', 'warning',
+    ]
+
+
+async def slow_request(port, path, options):
+    """
+    یک درخواست با رفتار کلاینت کند: درخواست در دو تکه با فاصله فرستاده می‌شود و پاسخ
+    در تکه‌های read_bytes با مکث read_delay خوانده می‌شود. بافر دریافت سوکت و StreamReader
+    کوچک است تا سرور واقعا منتظر کلاینت بماند. خروجی: (کد وضعیت، زمان تا آخرین بایت)
+    """
+    started = time.perf_counter()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, options['rcvbuf'])
+    sock.setblocking(False)
+    writer = None
+    try:
+        await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=options['read_bytes'])
+        request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode()
+        half = len(request) // 2
+        writer.write(request[:half])
+        await writer.drain()
+        await asyncio.sleep(options['send_delay'])
+        writer.write(request[half:])
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1]) if status_line else 0
+        while await reader.read(options['read_bytes']):
+            await asyncio.sleep(options['read_delay'])
+        return status, time.perf_counter() - started
+    finally:
+        if writer is not None:
+            writer.close()
+        else:
+            sock.close()
+
+
+async def run_load(port, paths, options):
+    """
+    concurrency کلاینت کند تا پایان duration پشت سر هم درخواست می‌فرستند.
+    """
+    deadline = time.perf_counter() + options['duration']
+    results = []
+    errors = 0
+    next_path = cycle(paths)
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            try:
+                results.append(await asyncio.wait_for(
+                    slow_request(port, next(next_path), options), options['timeout'],
+                ))
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+    return results, errors, time.perf_counter() - started
+
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'سرور با کد {process.returncode} متوقف شد.')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                sock.sendall(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n')
+                if sock.recv(16).startswith(b'HTTP/'):
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'سرور روی پورت {port} آماده نشد.')
+
+
+class Command(BaseCommand):
+    """
+    توان عملیاتی و تاخیر p99 صفحات خواندنی را زیر WSGI (gunicorn) و ASGI (uvicorn با ویوهای
+    async) با تعداد زیادی کلاینت کند همزمان مقایسه می‌کند. هر دو سرور با همان تعداد پردازش
+    روی همین دیتابیس اجرا می‌شوند. قبل از اجرا seed_blog را اجرا کنید؛ بدون collectstatic
+    سرور باید با DEBUG=True اجرا شود. کلاینت‌ها در همین پردازش (asyncio) اجرا می‌شوند، پس
+    در همزمانی‌های خیلی بالا خود کلاینت هم می‌تواند گلوگاه باشد.
+    """
+    help = 'مقایسه throughput و p99 بین WSGI/gunicorn و ASGI/uvicorn با کلاینت‌های کند'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default=','.join(SERVERS), help='سرورها (wsgi,asgi)')
+        parser.add_argument('--concurrency', type=int, default=200, help='تعداد کلاینت همزمان')
+        parser.add_argument('--duration', type=float, default=20, help='مدت اندازه‌گیری هر سرور (ثانیه)')
+        parser.add_argument('--workers', type=int, default=settings.WEB_CONCURRENCY, help='تعداد پردازش سرور')
+        parser.add_argument('--threads', type=int, default=max(settings.GUNICORN_THREADS, 4),
+                            help='تعداد thread هر پردازش gunicorn')
+        parser.add_argument('--send-delay', type=float, default=0.1, help='مکث وسط فرستادن درخواست (ثانیه)')
+        parser.add_argument('--read-delay', type=float, default=0.02, help='مکث بین خواندن تکه‌های پاسخ (ثانیه)')
+        parser.add_argument('--read-bytes', type=int, default=4096, help='اندازه هر تکه خواندن پاسخ (بایت)')
+        parser.add_argument('--rcvbuf', type=int, default=4096, help='اندازه بافر دریافت سوکت کلاینت (بایت)')
+        parser.add_argument('--timeout', type=float, default=60, help='حداکثر زمان هر درخواست (ثانیه)')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help='ذخیره نتایج در این فایل JSON')
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f'سرور ناشناخته: {", ".join(sorted(unknown))}')
+
+        article = Article.objects.published().order_by('-created').first()
+        category = Category.objects.filter(articles__status='p').first()
+        if article is None or category is None:
+            raise CommandError('داده‌ای برای اندازه‌گیری نیست؛ ابتدا seed_blog را اجرا کنید.')
+        paths = [iri_to_uri(path) for path in (
+            reverse('home_app:home'),
+            reverse('blog:articles_list'),
+            article.get_absolute_url(),
+            reverse('blog:category_list', kwargs={'pk': category.pk}),
+            reverse('blog:search') + '?q=' + article.title.split()[0],
+        )]
+
+        report = {}
+        for kind in servers:
+            env = {**os.environ, 'ASYNC_VIEWS': str(kind == 'asgi')}
+            command = server_command(kind, options['port'], options['workers'], options['threads'])
+            # لاگ هر درخواست فقط با --verbosity 2 نمایش داده می‌شود
+            output = None if options['verbosity'] > 1 else subprocess.DEVNULL
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=output, stderr=output)
+            try:
+                wait_until_ready(options['port'], process)
+                results, errors, elapsed = asyncio.run(run_load(options['port'], paths, options))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+            latencies = [latency for status, latency in results]
+            report[kind] = {
+                'requests': len(results),
+                'errors': errors,
+                'non_2xx': sum(1 for status, _ in results if not 200 <= status < 300),
+                'throughput': round(len(results) / elapsed, 1),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+            }
+
+        self.stdout.write(f'{"server":<8}{"requests":>10}{"errors":>8}{"non-2xx":>9}{"req/s":>9}{"p50 ms":>10}{"p99 ms":>10}')
+        for kind, row in report.items():
+            self.stdout.write(
+                f'{kind:<8}{row["requests"]:>10}{row["errors"]:>8}{row["non_2xx"]:>9}'
+                f'{row["throughput"]:>9}{row["p50_ms"] or "-":>10}{row["p99_ms"] or "-":>10}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'options': {
+                    key: options[key] for key in (
+                        'concurrency', 'duration', 'workers', 'threads',
+                        'send_delay', 'read_delay', 'read_bytes', 'rcvbuf',
+                    )
+                }, 'results': report}, output, indent=2)
@@ -0,0 +1,39 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from standblog.assets import build_bundles, bundle_path
+
+
+class Command(BaseCommand):
+    """
+    bundle های CSS و JS (ASSET_BUNDLES) را می‌سازد: فایل‌ها به هم چسبانده و فشرده می‌شوند،
+    فونت‌های آیکون به آیکون‌های استفاده شده و فونت‌های متنی به حروف لاتین محدود می‌شوند.
+    سپس collectstatic اجرا می‌شود تا CompressedManifestStaticFilesStorage نام هش‌دار
+    و نسخه‌های gzip و brotli را بسازد. در مراحل deploy به جای collectstatic اجرا شود.
+    """
+    help = 'ساخت bundle های CSS/JS، subset فونت‌ها و اجرای collectstatic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-collect', action='store_true', help='فقط bundle ها را بساز، collectstatic اجرا نشود.')
+
+    def handle(self, *args, **options):
+        sizes = build_bundles(log=self.stdout.write)
+        for name, (source_size, bundle_size) in sizes.items():
+            self.stdout.write(f'{name}: {source_size} -> {bundle_size} bytes')
+        if options['no_collect']:
+            return
+
+        call_command('collectstatic', interactive=False, verbosity=0)
+        for name in sizes:
+            # نام هش‌دار فقط در storage های manifest وجود دارد
+            stored = getattr(staticfiles_storage, 'stored_name', lambda path: path)(bundle_path(name))
+            path = os.path.join(settings.STATIC_ROOT, stored)
+            compressed = [
+                f'{ext}: {os.path.getsize(path + ext)}' for ext in ('.gz', '.br') if os.path.exists(path + ext)
+            ]
+            self.stdout.write(f'{stored} ({", ".join(compressed) or "بدون نسخه فشرده"})')
+        self.stdout.write(self.style.SUCCESS('bundle ها ساخته و منتشر شدند.'))
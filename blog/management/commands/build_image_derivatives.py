@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from accounts.models import Profile
+from blog.models import Article
+from standblog.images import generate_derivatives, has_derivatives
+
+MODELS = {'articles': Article, 'profiles': Profile}
+
+
+class Command(BaseCommand):
+    """
+    نسخه‌های کوچک‌شده و WebP تصاویری را می‌سازد که قبل از اضافه شدن این قابلیت آپلود شده‌اند.
+    تصاویر جدید هنگام آپلود پردازش می‌شوند. با --force همه تصاویر دوباره ساخته می‌شوند
+    (مثلا بعد از تغییر image_derivative_widths).
+    """
+    help = 'ساخت نسخه‌های کوچک‌شده تصاویر مقالات و پروفایل‌ها'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='نسخه‌های موجود را هم دوباره بساز.')
+        parser.add_argument('--only', choices=sorted(MODELS), help='فقط تصاویر این مدل.')
+
+    def handle(self, *args, **options):
+        models = [MODELS[options['only']]] if options['only'] else MODELS.values()
+        built = failed = 0
+        for model in models:
+            widths = model.image_derivative_widths
+            for obj in model.objects.exclude(image='').exclude(image=None).only('pk', 'image').iterator():
+                if not options['force'] and has_derivatives(obj.image, widths):
+                    continue
+                try:
+                    generate_derivatives(obj.image, widths)
+                except (OSError, Image.DecompressionBombError) as error:
+                    failed += 1
+                    self.stderr.write(f'{obj.image.name}: {error}')
+                    continue
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'نسخه‌های {built} تصویر ساخته شد ({failed} خطا).'))
@@ -0,0 +1,85 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from blog.models import Article, Category, Comment, Like, SearchTerm
+
+# الگوهای خواندن کامل جدول و مرتب‌سازی جداگانه در خروجی EXPLAIN هر دیتابیس
+SCAN_PATTERNS = {
+    # «SCAN blog_article» بدون USING INDEX؛ SCAN روی ایندکس (USING ... INDEX) مشکلی ندارد
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)(\S+)'),
+    'postgresql': re.compile(r'Seq Scan on (\S+)'),
+}
+SORT_PATTERNS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:ORDER BY|RIGHT PART OF ORDER BY)'),
+    'postgresql': re.compile(r'^\W*Sort\b', re.MULTILINE),
+}
+# جدول‌های کوچکی که خواندن کامل آن‌ها طبیعی است
+SMALL_TABLES = {Category._meta.db_table}
+
+
+def hot_queries(article, user):
+    """
+    کوئری‌های پرتکرار صفحات وبلاگ، به همان شکلی که ویوها و سیگنال‌ها اجرا می‌کنند.
+    """
+    published = Article.objects.published()
+    return [
+        ('لیست مقالات (صفحه اول)', published.cards().order_by('-created', '-pk')[:3]),
+        ('لیست مقالات (کرسر)', published.cards().order_by('-created', '-pk').filter(
+            Q(created__lt=article.created) | Q(created=article.created, pk__lt=article.pk))[:4]),
+        ('لیست دسته‌بندی', published.filter(category=article.category.first()).cards().order_by('-created', '-pk')[:3]),
+        ('سایدبار: آخرین مقالات', published.order_by('-created').only('title', 'slug', 'created')[:5]),
+        ('سایدبار: دسته‌بندی‌ها', Category.objects.annotate(
+            num_articles=Count('articles', filter=Q(articles__status='p'))).filter(num_articles__gt=0)),
+        # DetailView با get() می‌خواند که ترتیب پیش‌فرض را حذف می‌کند
+        ('صفحه مقاله', published.cards(content='body_html').filter(slug=article.slug).order_by()),
+        ('ETag صفحه مقاله', published.filter(slug=article.slug).values_list('pk', 'updated')),
+        ('درخت نظرات', article.comments.select_related('user')),
+        ('زیرشاخه نظر', Comment.objects.filter(path__startswith=f'{article.pk:010d}/').order_by('path')),
+        ('تعداد لایک‌ها', Like.objects.filter(article=article).order_by().values('article').annotate(c=Count('pk'))),
+        ('لایک کاربر', Like.objects.filter(article=article, user=user)[:1]),
+        ('جستجوی پیشوندی', SearchTerm.objects.filter(term__startswith='کتا')),
+    ]
+
+
+class Command(BaseCommand):
+    """
+    برای کوئری‌های پرتکرار اپلیکیشن EXPLAIN اجرا می‌کند و خواندن کامل جدول (sequential scan)
+    یا مرتب‌سازی جداگانه را گزارش می‌دهد. روی SQLite و PostgreSQL؛ بهتر است روی داده‌ای
+    با حجم واقعی (مثلا بعد از seed_blog) اجرا شود، چون برای جدول‌های خیلی کوچک
+    PostgreSQL خواندن کامل جدول را به ایندکس ترجیح می‌دهد.
+    """
+    help = 'اجرای EXPLAIN روی کوئری‌های پرتکرار و گزارش sequential scan ها'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true', help='در صورت پیدا شدن مشکل، با خطا خارج شو (برای CI).')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in SCAN_PATTERNS:
+            raise CommandError(f'EXPLAIN برای دیتابیس {vendor} پشتیبانی نمی‌شود (فقط sqlite و postgresql).')
+        article = Article.objects.published().select_related('author').first()
+        if article is None:
+            raise CommandError('هیچ مقاله منتشر شده‌ای نیست؛ ابتدا seed_blog را اجرا کنید.')
+
+        queries = hot_queries(article, article.author)
+        problems = 0
+        for name, queryset in queries:
+            plan = queryset.explain()
+            scans = {table.strip('"') for table in SCAN_PATTERNS[vendor].findall(plan)} - SMALL_TABLES
+            sorts = SORT_PATTERNS[vendor].search(plan) is not None
+            if scans or sorts:
+                problems += 1
+                issues = [f'scan: {", ".join(sorted(scans))}'] if scans else []
+                issues += ['sort'] if sorts else []
+                self.stdout.write(self.style.WARNING(f'✗ {name} ({"; ".join(issues)})'))
+            else:
+                self.stdout.write(f'✓ {name}')
+            if options['verbosity'] > 1 or scans or sorts:
+                self.stdout.write('\n'.join(f'    {line}' for line in plan.splitlines()))
+
+        if problems and options['strict']:
+            raise CommandError(f'{problems} کوئری بدون ایندکس مناسب اجرا می‌شود.')
+        self.stdout.write(self.style.SUCCESS(f'{len(queries) - problems} کوئری بدون مشکل، {problems} کوئری با مشکل.'))
@@ -0,0 +1,69 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from blog.models import Article, Category
+
+
+def article_record(article):
+    """
+    یک مقاله به صورت یک خط JSONL (همان قالبی که import_articles می‌خواند).
+    نویسنده با نام کاربری و دسته‌بندی‌ها با عنوان منتقل می‌شوند، چون شناسه‌ها در محیط مقصد فرق دارند.
+    """
+    return {
+        'title': article.title,
+        'slug': article.slug,
+        'status': article.status,
+        'author': article.author.get_username(),
+        'categories': [category.title for category in article.category.all()],
+        'body': article.body,
+        'image': article.image.name or None,
+        'created': article.created.isoformat(),
+        'updated': article.updated.isoformat(),
+    }
+
+
+class Command(BaseCommand):
+    """
+    مقالات را به صورت JSONL (هر خط یک مقاله) خروجی می‌گیرد. مقالات دسته‌دسته با iterator
+    خوانده و نوشته می‌شوند، پس حافظه مصرفی به تعداد مقالات بستگی ندارد.
+    """
+    help = 'خروجی گرفتن از مقالات به صورت JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='فایل خروجی (پیش‌فرض: خروجی استاندارد)')
+        parser.add_argument('--status', choices=('p', 'd', 'all'), default='all', help='فقط مقالات با این وضعیت')
+        parser.add_argument('--batch-size', type=int, default=1000, help='تعداد مقالات در هر دسته')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        queryset = (
+            Article.objects.order_by('pk').select_related('author')
+            .prefetch_related(Prefetch('category', queryset=Category.objects.only('id', 'title')))
+            # نسخه پاک‌سازی‌شده و خلاصه در مقصد از روی body ساخته می‌شوند
+            .defer('body_html', 'excerpt')
+        )
+        if options['status'] != 'all':
+            queryset = queryset.filter(status=options['status'])
+
+        to_stdout = options['path'] == '-'
+        output = sys.stdout if to_stdout else open(options['path'], 'w', encoding='utf-8')
+        started = time.monotonic()
+        count = 0
+        try:
+            for article in queryset.iterator(chunk_size=batch_size):
+                output.write(json.dumps(article_record(article), ensure_ascii=False) + '\n')
+                count += 1
+        finally:
+            if not to_stdout:
+                output.close()
+
+        elapsed = time.monotonic() - started
+        # وقتی خود داده در خروجی استاندارد است، گزارش به stderr می‌رود
+        report = self.stderr if to_stdout else self.stdout
+        report.write(self.style.SUCCESS(
+            f'{count} مقاله در {elapsed:.1f} ثانیه نوشته شد ({count / max(elapsed, 1e-6):.0f} مقاله در ثانیه).'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.likes import LikeBuffer
+
+
+class Command(BaseCommand):
+    """
+    لایک‌های ثبت شده در ژورنال write-behind را در دیتابیس اعمال می‌کند.
+    با --loop به صورت یک پردازش پس‌زمینه، هر چند ثانیه یک بار اجرا می‌شود.
+    """
+    help = 'اعمال دسته‌ای لایک‌های در انتظار (حالت LIKE_WRITE_BEHIND)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='تعداد (کاربر، مقاله) در هر دستور INSERT و UPDATE')
+        parser.add_argument('--loop', action='store_true', help='به صورت دائمی اجرا شو')
+        parser.add_argument('--interval', type=float, default=5.0, help='فاصله بین اجراها در حالت --loop (ثانیه)')
+
+    def handle(self, *args, **options):
+        buffer = LikeBuffer()
+        while True:
+            started = time.monotonic()
+            applied = buffer.flush(batch_size=options['batch_size'])
+            if applied:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{applied} لایک در {elapsed:.2f} ثانیه اعمال شد.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
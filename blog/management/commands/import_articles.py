@@ -0,0 +1,209 @@
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from blog.article_cache import delete_articles
+from blog.cache import bump_version
+from blog.models import Article, Category
+from blog.page_cache import category_key
+from blog.search import index_new_articles
+from blog.sitemaps import SITEMAP_VERSION, page_number, page_version
+
+SLUG_MAX_LENGTH = Article._meta.get_field('slug').max_length
+
+
+def read_records(stream):
+    """
+    خط‌های JSONL را یکی‌یکی می‌خواند: (شماره خط، رکورد). خط‌های خالی نادیده گرفته می‌شوند.
+    """
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'خط {number}: JSON نامعتبر ({error})')
+
+
+def slug_candidate(base, attempt):
+    """
+    اسلاگ پیشنهادی شماره attempt: خود base، بعد base-2، base-3 و ... (بدون گذشتن از طول فیلد).
+    """
+    if attempt == 1:
+        return base[:SLUG_MAX_LENGTH]
+    suffix = f'-{attempt}'
+    return base[:SLUG_MAX_LENGTH - len(suffix)] + suffix
+
+
+def assign_slugs(articles):
+    """
+    اسلاگ یکتای همه مقالات یک دسته را با چند کوئری برای کل دسته پیدا می‌کند (نه یک کوئری برای هر
+    مقاله): در هر دور، اسلاگ‌های پیشنهادی با یک کوئری بررسی و تکراری‌ها در حافظه شماره بعدی را می‌گیرند.
+    """
+    pending = dict.fromkeys(range(len(articles)), 1)
+    used = set()
+    while pending:
+        candidates = {i: slug_candidate(articles[i].slug, attempt) for i, attempt in pending.items()}
+        taken = set(Article.objects.filter(slug__in=set(candidates.values())).values_list('slug', flat=True))
+        retry = {}
+        for i, candidate in candidates.items():
+            if candidate in taken or candidate in used:
+                retry[i] = pending[i] + 1
+            else:
+                used.add(candidate)
+        for i, candidate in candidates.items():
+            if i not in retry:
+                articles[i].slug = candidate
+        pending = retry
+
+
+class Command(BaseCommand):
+    """
+    مقالات را از JSONL (خروجی export_articles) وارد می‌کند. ورودی دسته‌دسته خوانده می‌شود و
+    برای هر دسته: نویسنده‌ها و دسته‌بندی‌ها با یک کوئری پیدا می‌شوند (دسته‌بندی‌های جدید ساخته
+    می‌شوند)، اسلاگ‌ها یکجا یکتا می‌شوند و مقالات و ارتباط آن‌ها با دسته‌بندی‌ها با bulk_create
+    داخل یک تراکنش ذخیره می‌شوند. مقاله‌ای که عنوانش از قبل وجود دارد رد می‌شود.
+    bulk_create سیگنال‌ها را اجرا نمی‌کند؛ مقالات منتشر شده هر دسته در همان تراکنش نمایه می‌شوند
+    (فقط همان مقالات، نه کل نمایه) و نسخه کش‌ها در پایان بالا می‌رود.
+    """
+    help = 'وارد کردن سریع مقالات از فایل JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='فایل ورودی (پیش‌فرض: ورودی استاندارد)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='تعداد مقالات در هر دسته و تراکنش')
+        parser.add_argument('--author', help='نویسنده مقالاتی که نویسنده‌شان در این محیط وجود ندارد')
+        parser.add_argument('--status', choices=('p', 'd'), help='وضعیت همه مقالات وارد شده (پیش‌فرض: از فایل)')
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, options['batch_size'])
+        self.status = options['status']
+        self.default_author = None
+        if options['author']:
+            try:
+                self.default_author = User.objects.get(username=options['author']).pk
+            except User.DoesNotExist:
+                raise CommandError(f'کاربر {options["author"]} وجود ندارد.')
+        self.authors = {}
+        self.categories = {}
+        self.touched = set()  # نسخه‌های کش (صفحات دسته‌بندی و نقشه سایت) که باید بالا بروند
+
+        started = time.monotonic()
+        imported = skipped = published = 0
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            records = read_records(stream)
+            while batch := list(islice(records, self.batch_size)):
+                created, batch_published = self.import_batch(batch)
+                imported += created
+                published += batch_published
+                skipped += len(batch) - created
+                if options['verbosity'] > 1:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(f'{imported} مقاله ({imported / max(elapsed, 1e-6):.0f} در ثانیه)')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if imported:
+            search = ['search'] if published else []
+            bump_version('sidebar', 'home', 'articles', 'categories', 'feeds', SITEMAP_VERSION, *search, *self.touched)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{imported} مقاله وارد و {skipped} مقاله تکراری رد شد؛ {elapsed:.1f} ثانیه '
+            f'({imported / max(elapsed, 1e-6):.0f} مقاله در ثانیه).'
+        ))
+
+    def import_batch(self, batch):
+        """
+        یک دسته رکورد را در یک تراکنش ذخیره می‌کند. خروجی: (تعداد مقالات ساخته شده، تعداد منتشر شده‌ها)
+        """
+        self.resolve_authors({record.get('author') for _, record in batch} - self.authors.keys())
+
+        with transaction.atomic():
+            # بررسی تکراری‌ها داخل همان تراکنش ذخیره؛ اگر import همزمانی همین عنوان را بعد از این
+            # بررسی ثبت کند، محدودیت یکتای title کل دسته را (بدون ذخیره نیمه‌کاره) با خطا برمی‌گرداند
+            existing = set(Article.objects.filter(title__in=[record.get('title') for _, record in batch])
+                           .values_list('title', flat=True))
+            self.resolve_categories({title for _, record in batch for title in record.get('categories') or ()})
+            rows = []
+            for number, record in batch:
+                title = record.get('title')
+                if not title or not record.get('body'):
+                    raise CommandError(f'خط {number}: عنوان و متن مقاله لازم است.')
+                if title in existing:
+                    continue
+                existing.add(title)  # عنوان تکراری داخل خود فایل
+                rows.append((self.build_article(number, record), record))
+            if not rows:
+                return 0, 0
+
+            articles = [article for article, _ in rows]
+            assign_slugs(articles)
+            Article.objects.bulk_create(articles, batch_size=self.batch_size)
+
+            # created و updated (auto_now) در bulk_create همیشه «الان» است؛ bulk_update آن‌ها را تغییر نمی‌دهد
+            dated = [article for article in articles if article.imported_dates]
+            for article in dated:
+                article.created, article.updated = article.imported_dates
+            Article.objects.bulk_update(dated, ['created', 'updated'], batch_size=self.batch_size)
+
+            through = Article.category.through
+            links = [
+                through(article_id=article.pk, category_id=self.categories[title])
+                for article, record in rows
+                for title in dict.fromkeys(record.get('categories') or ())
+            ]
+            through.objects.bulk_create(links, batch_size=self.batch_size)
+            index_new_articles(articles)
+
+        # «پیدا نشد» کش‌شده برای این اسلاگ‌ها دیگر درست نیست
+        delete_articles(*(article.slug for article in articles))
+        self.touched.update(page_version('articles', page_number(article.pk)) for article in articles)
+        for link in links:
+            self.touched.update((category_key(link.category_id), page_version('categories', page_number(link.category_id))))
+        return len(articles), sum(article.status == 'p' for article in articles)
+
+    def build_article(self, number, record):
+        author = self.authors.get(record.get('author')) or self.default_author
+        if author is None:
+            raise CommandError(f'خط {number}: نویسنده {record.get("author")!r} وجود ندارد (از --author استفاده کنید).')
+        status = self.status or record.get('status', 'd')
+        if status not in dict(Article.STATUS_CHOICES):
+            raise CommandError(f'خط {number}: وضعیت نامعتبر {status!r}.')
+        article = Article(
+            title=record['title'],
+            # assign_slugs اسلاگ پایه را در صورت تکراری بودن یکتا می‌کند
+            slug=record.get('slug') or slugify(record['title'], allow_unicode=True),
+            body=record['body'],
+            status=status,
+            author_id=author,
+            image=record.get('image') or None,
+        )
+        article.render_body()  # bulk_create متد save را صدا نمی‌زند
+        created, updated = (parse_datetime(record[key]) if record.get(key) else None for key in ('created', 'updated'))
+        article.imported_dates = (created, updated or created) if created else None
+        return article
+
+    def resolve_authors(self, usernames):
+        usernames.discard(None)
+        if usernames:
+            self.authors.update(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+
+    def resolve_categories(self, titles):
+        missing = titles - self.categories.keys()
+        if not missing:
+            return
+        # عنوان دسته‌بندی یکتا نیست؛ اولین دسته‌بندی با این عنوان استفاده می‌شود
+        for pk, title in Category.objects.filter(title__in=missing).order_by('-pk').values_list('pk', 'title'):
+            self.categories[title] = pk
+        new = [Category(title=title) for title in missing - self.categories.keys()]
+        for category in Category.objects.bulk_create(new):
+            self.categories[category.title] = category.pk
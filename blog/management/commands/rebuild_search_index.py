@@ -0,0 +1,102 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.cache import bump_version
+from blog.models import Article, SearchDocument, SearchPosting, SearchTerm
+from blog.search.indexer import CHUNK_SIZE, term_ids
+from blog.search.text import analyze
+
+
+def _init_worker():
+    # در حالت spawn، پردازش‌های فرزند باید جنگو را خودشان راه‌اندازی کنند
+    django.setup()
+
+
+def _analyze_batch(rows):
+    """
+    در پردازش فرزند اجرا می‌شود: فقط تحلیل متن (بدون دسترسی به دیتابیس).
+    """
+    return [(pk, analyze(title, body)) for pk, title, body in rows]
+
+
+def _batches(queryset, size):
+    batch = []
+    for row in queryset.iterator(chunk_size=size):
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    """
+    نمایه جستجو را از صفر برای تمام مقالات منتشر شده می‌سازد.
+    تحلیل متن (که بیشترین زمان را می‌گیرد) در چند پردازش موازی انجام می‌شود
+    و نوشتن در دیتابیس فقط در پردازش اصلی و داخل یک تراکنش انجام می‌شود.
+    """
+    help = 'ساخت دوباره کامل نمایه جستجوی مقالات با چند پردازش'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='تعداد پردازش‌های تحلیل متن')
+        parser.add_argument('--batch-size', type=int, default=200, help='تعداد مقالات در هر دسته')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+        rows = Article.objects.published().order_by('pk').values_list('pk', 'title', 'body')
+        indexed = 0
+
+        with transaction.atomic():
+            SearchPosting.objects.all().delete()
+            SearchDocument.objects.all().delete()
+            SearchTerm.objects.all().delete()
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # فقط تعداد محدودی دسته در صف نگه داشته می‌شود تا حافظه محدود بماند
+                pending = deque()
+                for batch in _batches(rows, batch_size):
+                    pending.append(pool.submit(_analyze_batch, batch))
+                    if len(pending) >= workers * 2:
+                        indexed += self._write(pending.popleft().result())
+                while pending:
+                    indexed += self._write(pending.popleft().result())
+
+            # df هر کلمه با یک دستور UPDATE از روی جدول وقوع‌ها محاسبه می‌شود
+            postings = (
+                SearchPosting.objects.filter(term=OuterRef('pk'))
+                .order_by().values('term').annotate(c=Count('pk')).values('c')
+            )
+            SearchTerm.objects.update(df=Coalesce(Subquery(postings), 0))
+            bump_version('search')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{indexed} مقاله و {SearchTerm.objects.count()} کلمه در {elapsed:.1f} ثانیه نمایه شد.'
+        ))
+
+    def _write(self, analyzed):
+        ids = term_ids({term for _, (counts, _) in analyzed for term in counts})
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(term_id=ids[term], article_id=pk, frequency=frequency)
+                for pk, (counts, _) in analyzed
+                for term, frequency in counts.items()
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+        SearchDocument.objects.bulk_create(
+            [SearchDocument(article_id=pk, length=length) for pk, (_, length) in analyzed],
+            batch_size=CHUNK_SIZE,
+        )
+        return len(analyzed)
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.cache import bump_version
+from blog.models import Article, Comment, Like
+from blog.page_cache import article_key
+
+
+def _count_of(queryset):
+    """
+    یک زیرکوئری برمی‌گرداند که تعداد ردیف‌های مربوط به هر مقاله را حساب می‌کند.
+    """
+    counted = (
+        queryset.filter(article=OuterRef('pk'))
+        .order_by()
+        .values('article')
+        .annotate(c=Count('id'))
+        .values('c')
+    )
+    return Coalesce(Subquery(counted), 0)
+
+
+class Command(BaseCommand):
+    """
+    شمارنده‌های ذخیره‌شده مقالات (لایک و نظر) را با جدول‌های اصلی تطبیق می‌دهد.
+    فقط مقالاتی که اختلاف دارند به‌روزرسانی می‌شوند.
+    """
+    help = 'تطبیق like_count و comment_count مقالات با جدول‌های Like و Comment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='فقط مقالات دارای اختلاف را گزارش کن و چیزی ذخیره نکن.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = (
+            Article.objects.annotate(
+                real_likes=_count_of(Like.objects.all()),
+                real_comments=_count_of(Comment.objects.all()),
+                real_active_comments=_count_of(Comment.objects.filter(is_active=True)),
+            )
+            # exclude با چند شرط یعنی «حداقل یکی از شمارنده‌ها درست نیست»
+            .exclude(
+                like_count=F('real_likes'),
+                comment_count=F('real_comments'),
+                active_comment_count=F('real_active_comments'),
+            )
+            .only('pk', 'title', 'like_count', 'comment_count', 'active_comment_count')
+        )
+
+        fixed = []
+        for article in drifted:
+            self.stdout.write(
+                f"{article.title}: لایک {article.like_count} -> {article.real_likes}, "
+                f"نظر {article.comment_count} -> {article.real_comments}, "
+                f"نظر فعال {article.active_comment_count} -> {article.real_active_comments}"
+            )
+            article.like_count = article.real_likes
+            article.comment_count = article.real_comments
+            article.active_comment_count = article.real_active_comments
+            fixed.append(article)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(fixed)} مقاله اختلاف دارد (بدون ذخیره).'))
+            return
+
+        with transaction.atomic():
+            Article.objects.bulk_update(
+                fixed, ['like_count', 'comment_count', 'active_comment_count'], batch_size=500,
+            )
+        # صفحات و مقالات کش‌شده (article_cache) با نسخه article:<pk> بی‌اعتبار می‌شوند
+        if fixed:
+            bump_version(*(article_key(article) for article in fixed))
+        self.stdout.write(self.style.SUCCESS(f'{len(fixed)} مقاله اصلاح شد.'))
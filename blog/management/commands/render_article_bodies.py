@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.article_cache import delete_articles
+from blog.cache import bump_version
+from blog.models import Article
+from blog.page_cache import article_key
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """
+    body_html و excerpt مقالات موجود را از روی body می‌سازد.
+    بعد از اضافه شدن این فیلدها یک بار اجرا شود؛ با --all بعد از تغییر قواعد
+    پاک‌سازی یا طول خلاصه هم می‌توان همه مقالات را دوباره ساخت.
+    بدون --all فقط مقالاتی که هنوز body_html ندارند پردازش می‌شوند.
+    """
+    help = 'ساخت متن پاک‌سازی‌شده و خلاصه برای مقالات موجود'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='همه مقالات را دوباره بساز، نه فقط مقالاتی که body_html ندارند.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.order_by('pk').only('pk', 'slug', 'body', 'body_html', 'excerpt')
+        if not options['all']:
+            queryset = queryset.filter(body_html='')
+
+        # پیمایش بر اساس pk تا نوشتن هر دسته روی خواندن دسته بعدی اثر نگذارد
+        last_pk, total = 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = []
+            for article in batch:
+                before = (article.body_html, article.excerpt)
+                article.render_body()
+                if (article.body_html, article.excerpt) != before:
+                    changed.append(article)
+            if not changed:
+                continue
+            # bulk_update فیلد updated (auto_now) را تغییر نمی‌دهد و سیگنالی هم ندارد؛ پس کش‌های
+            # مقالات تغییر کرده اینجا بی‌اعتبار می‌شوند (بعد از commit)
+            with transaction.atomic():
+                Article.objects.bulk_update(changed, ['body_html', 'excerpt'])
+                delete_articles(*(article.slug for article in changed))
+                bump_version(*(article_key(article) for article in changed), 'feeds')
+                # کلید قطعه‌های متن و کارت مقالات (fragment_key) غیر از updated فقط نسخه categories را دارد
+                bump_version('categories')
+            total += len(changed)
+        self.stdout.write(self.style.SUCCESS(f'{total} مقاله به‌روزرسانی شد.'))
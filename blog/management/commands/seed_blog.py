@@ -0,0 +1,165 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounts.models import Profile
+from blog.cache import bump_version
+from blog.models import Article, Category, Comment, Like
+
+WORDS = (
+    'کتاب دنیا برنامه نویسی پایتون جنگو وب سرور داده پایگاه طراحی سریع امن ساده تجربه سفر '
+    'شهر تهران اصفهان شیراز فرهنگ هنر موسیقی فیلم سینما ورزش فوتبال سلامت غذا آشپزی علم '
+    'فناوری هوش مصنوعی یادگیری ماشین آینده تاریخ ایران زبان فارسی شعر حافظ سعدی مولانا '
+    'طبیعت کوه دریا جنگل بهار پاییز زمستان تابستان خانواده دوست زندگی کار موفقیت ایده'
+).split()
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    داده‌های آزمایشی واقعی‌نما (کاربر، دسته‌بندی، مقاله، نظرات تودرتو و لایک) را
+    با bulk_create می‌سازد تا بتوان کارایی صفحات را روی حجم واقعی داده اندازه گرفت.
+    """
+    help = 'ساخت سریع داده‌های آزمایشی برای وبلاگ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='تعداد کاربران')
+        parser.add_argument('--categories', type=int, default=10, help='تعداد دسته‌بندی‌ها')
+        parser.add_argument('--articles', type=int, default=500, help='تعداد مقالات')
+        parser.add_argument('--comments', type=int, default=8, help='تعداد نظرات هر مقاله')
+        parser.add_argument('--reply-depth', type=int, default=3, help='حداکثر عمق پاسخ‌ها')
+        parser.add_argument('--likes', type=int, default=15, help='حداکثر تعداد لایک هر مقاله')
+        parser.add_argument('--draft-ratio', type=float, default=0.1, help='نسبت مقالات پیش‌نویس')
+        parser.add_argument('--seed', type=int, default=1, help='seed تولید اعداد تصادفی')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        started = time.monotonic()
+
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            categories = self.create_categories(options['categories'])
+            articles = self.create_articles(options['articles'], users, categories, options['draft_ratio'])
+            comment_count = self.create_comments(articles, users, options['comments'], options['reply_depth'])
+            like_count = self.create_likes(articles, users, options['likes'])
+            Article.objects.bulk_update(
+                articles, ['like_count', 'comment_count', 'active_comment_count'], batch_size=BATCH_SIZE,
+            )
+
+        # bulk_create سیگنال‌ها را اجرا نمی‌کند: نمایه جستجو و کش‌ها را خودمان به‌روز می‌کنیم
+        call_command('rebuild_search_index', stdout=self.stdout)
+        bump_version('sidebar', 'home', 'articles')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} کاربر، {len(categories)} دسته‌بندی، {len(articles)} مقاله، '
+            f'{comment_count} نظر و {like_count} لایک در {elapsed:.1f} ثانیه ساخته شد.'
+        ))
+
+    def words(self, count):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(count))
+
+    def create_users(self, count):
+        start = User.objects.filter(username__startswith='seed_').count()
+        password = make_password('password')  # هش کردن رمز کند است؛ یک بار برای همه
+        User.objects.bulk_create(
+            [User(username=f'seed_{start + i}', email=f'seed_{start + i}@example.com', password=password,
+                  first_name=self.rng.choice(WORDS)) for i in range(count)],
+            batch_size=BATCH_SIZE,
+        )
+        users = list(User.objects.filter(username__startswith='seed_').order_by('-pk')[:count])
+        # سیگنال ساخت پروفایل هم در bulk_create اجرا نمی‌شود
+        Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        return users
+
+    def create_categories(self, count):
+        start = Category.objects.count()
+        return Category.objects.bulk_create(
+            [Category(title=f'{self.rng.choice(WORDS)} {start + i}') for i in range(count)],
+        )
+
+    def create_articles(self, count, users, categories, draft_ratio):
+        start = Article.objects.count()
+        articles = []
+        for i in range(count):
+            title = f'{self.words(4)} {start + i}'
+            body = ''.join(f'<p>{self.words(self.rng.randint(30, 80))}</p>' for _ in range(self.rng.randint(2, 6)))
+            article = Article(
+                title=title,
+                slug=slugify(title, allow_unicode=True),
+                body=body,
+                author=self.rng.choice(users),
+                status='d' if self.rng.random() < draft_ratio else 'p',
+            )
+            article.render_body()  # bulk_create متد save را صدا نمی‌زند
+            articles.append(article)
+        articles = Article.objects.bulk_create(articles, batch_size=BATCH_SIZE)
+
+        # تاریخ ایجاد (auto_now_add) در bulk_create همیشه «الان» است؛ آن را در گذشته پخش می‌کنیم
+        now = timezone.now()
+        for i, article in enumerate(articles):
+            article.created = now - timedelta(hours=(len(articles) - i) * 7, minutes=self.rng.randint(0, 300))
+        Article.objects.bulk_update(articles, ['created'], batch_size=BATCH_SIZE)
+
+        through = Article.category.through
+        through.objects.bulk_create(
+            [
+                through(article_id=article.pk, category_id=category.pk)
+                for article in articles
+                for category in self.rng.sample(categories, k=min(len(categories), self.rng.randint(1, 3)))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        return articles
+
+    def create_comments(self, articles, users, per_article, reply_depth):
+        # شناسه‌ها از قبل تعیین می‌شوند تا مسیر درختی (path) بدون UPDATE دوم ساخته شود
+        next_id = (Comment.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+        comments = []
+        for article in articles:
+            thread = []
+            for _ in range(per_article):
+                candidates = [c for c in thread if c.depth < min(reply_depth, Comment.MAX_DEPTH)]
+                parent = self.rng.choice(candidates) if candidates and self.rng.random() < 0.6 else None
+                comment = Comment(
+                    id=next_id,
+                    article_id=article.pk,
+                    user=self.rng.choice(users),
+                    parent_id=parent.pk if parent else None,
+                    body=self.words(self.rng.randint(5, 40)),
+                    is_active=self.rng.random() > 0.05,
+                    depth=parent.depth + 1 if parent else 0,
+                    path=f'{parent.path if parent else ""}{next_id:010d}/',
+                )
+                next_id += 1
+                thread.append(comment)
+            article.comment_count = len(thread)
+            article.active_comment_count = sum(c.is_active for c in thread)
+            comments.extend(thread)
+        Comment.objects.bulk_create(comments, batch_size=BATCH_SIZE)
+
+        # چون شناسه‌ها دستی تعیین شدند، sequence در PostgreSQL باید جلو برود
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Comment]):
+                cursor.execute(sql)
+        return len(comments)
+
+    def create_likes(self, articles, users, max_likes):
+        likes = []
+        for article in articles:
+            likers = self.rng.sample(users, k=self.rng.randint(0, min(max_likes, len(users))))
+            article.like_count = len(likers)
+            likes.extend(Like(article_id=article.pk, user=user) for user in likers)
+        Like.objects.bulk_create(likes, batch_size=BATCH_SIZE)
+        return len(likes)
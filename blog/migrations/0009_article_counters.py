@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """
+    شمارنده‌های لایک و نظر را برای مقالات موجود از روی جدول‌ها پر می‌کند.
+    """
+    Article = apps.get_model('blog', 'Article')
+    Comment = apps.get_model('blog', 'Comment')
+    Like = apps.get_model('blog', 'Like')
+
+    def count_of(queryset):
+        counted = queryset.filter(article=OuterRef('pk')).order_by().values('article').annotate(c=Count('id')).values('c')
+        return Coalesce(Subquery(counted), 0)
+
+    Article.objects.update(
+        like_count=count_of(Like.objects.all()),
+        comment_count=count_of(Comment.objects.all()),
+        active_comment_count=count_of(Comment.objects.filter(is_active=True)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_alter_category_options_alter_like_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='active_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد نظرات فعال'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد نظرات'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد لایک\u200cها'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    """
+    مسیر و عمق نظرات موجود را می‌سازد. والد همیشه قبل از فرزندش ثبت شده،
+    پس پیمایش به ترتیب شناسه کافی است.
+    """
+    Comment = apps.get_model('blog', 'Comment')
+    known = {}
+    batch = []
+    for comment in Comment.objects.order_by('pk').only('pk', 'parent_id').iterator(chunk_size=2000):
+        parent_path, parent_depth = known.get(comment.parent_id, ('', -1))
+        comment.path = f'{parent_path}{comment.pk:010d}/'
+        comment.depth = parent_depth + 1
+        known[comment.pk] = (comment.path, comment.depth)
+        batch.append(comment)
+        if len(batch) >= 2000:
+            Comment.objects.bulk_update(batch, ['path', 'depth'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path', 'depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_article_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='عمق'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='مسیر درختی'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='blog_comment_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 500
+
+
+def build_index(apps, schema_editor):
+    """
+    نمایه مقالات منتشر شده موجود را می‌سازد تا جستجو بعد از migrate، بدون اجرای دستی
+    rebuild_search_index، نتیجه داشته باشد. همان کار آن دستور، در یک پردازش.
+    """
+    from blog.search.text import analyze
+
+    Article = apps.get_model('blog', 'Article')
+    SearchDocument = apps.get_model('blog', 'SearchDocument')
+    SearchPosting = apps.get_model('blog', 'SearchPosting')
+    SearchTerm = apps.get_model('blog', 'SearchTerm')
+
+    ids = {}
+
+    def write(analyzed):
+        missing = {term for _, (counts, _) in analyzed for term in counts} - ids.keys()
+        SearchTerm.objects.bulk_create([SearchTerm(term=term) for term in missing], batch_size=BATCH_SIZE)
+        missing = list(missing)
+        for start in range(0, len(missing), BATCH_SIZE):
+            ids.update(SearchTerm.objects.filter(term__in=missing[start:start + BATCH_SIZE]).values_list('term', 'id'))
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(term_id=ids[term], article_id=pk, frequency=frequency)
+                for pk, (counts, _) in analyzed
+                for term, frequency in counts.items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        SearchDocument.objects.bulk_create(
+            [SearchDocument(article_id=pk, length=length) for pk, (_, length) in analyzed],
+            batch_size=BATCH_SIZE,
+        )
+
+    batch = []
+    rows = Article.objects.filter(status='p').order_by('pk').values_list('pk', 'title', 'body')
+    for pk, title, body in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append((pk, analyze(title, body)))
+        if len(batch) >= BATCH_SIZE:
+            write(batch)
+            batch = []
+    write(batch)
+
+    postings = (
+        SearchPosting.objects.filter(term=OuterRef('pk'))
+        .order_by().values('term').annotate(c=Count('pk')).values('c')
+    )
+    SearchTerm.objects.update(df=Coalesce(Subquery(postings), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_comment_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='blog.article', verbose_name='مقاله')),
+                ('length', models.PositiveIntegerField(verbose_name='طول سند')),
+            ],
+            options={
+                'verbose_name': 'سند جستجو',
+                'verbose_name_plural': 'اسناد جستجو',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, unique=True, verbose_name='کلمه')),
+                ('df', models.PositiveIntegerField(default=0, verbose_name='تعداد مقالات')),
+            ],
+            options={
+                'verbose_name': 'کلمه جستجو',
+                'verbose_name_plural': 'کلمات جستجو',
+                'indexes': [models.Index(fields=['term'], name='blog_searchterm_prefix_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.PositiveIntegerField(verbose_name='تعداد تکرار')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='blog.article', verbose_name='مقاله')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='blog.searchterm', verbose_name='کلمه')),
+            ],
+            options={
+                'verbose_name': 'وقوع کلمه',
+                'verbose_name_plural': 'وقوع کلمات',
+                'unique_together': {('term', 'article')},
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def render_bodies(apps, schema_editor):
+    """
+    متن پاک‌سازی‌شده و خلاصه مقالات موجود را می‌سازد (همان کار render_article_bodies)، تا صفحات
+    بعد از migrate متن خالی نمایش ندهند. bulk_update فیلد updated را تغییر نمی‌دهد.
+    """
+    from blog.sanitizer import make_excerpt, sanitize_html
+
+    Article = apps.get_model('blog', 'Article')
+    batch = []
+    for article in Article.objects.order_by('pk').only('pk', 'body').iterator(chunk_size=BATCH_SIZE):
+        article.body_html = sanitize_html(article.body)
+        article.excerpt = make_excerpt(article.body_html)
+        batch.append(article)
+        if len(batch) >= BATCH_SIZE:
+            Article.objects.bulk_update(batch, ['body_html', 'excerpt'])
+            batch = []
+    Article.objects.bulk_update(batch, ['body_html', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='body_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='محتوای پاک\u200cسازی\u200cشده'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='خلاصه'),
+        ),
+        migrations.RunPython(render_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_article_body_html_excerpt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('status', 'p')), fields=['-created', '-id'], name='blog_article_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', '-created_at'], name='blog_comment_article_idx'),
+        ),
+    ]
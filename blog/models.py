@@ -1,10 +1,44 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Prefetch, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.text import slugify
 from django.utils.html import format_html
 
+from standblog.images import ImageDerivativesMixin
+
+from .sanitizer import make_excerpt, sanitize_html
+
+# ==================================
+# تشخیص تغییر فیلدها (برای سیگنال‌ها)
+# ==================================
+class TrackChangesMixin:
+    """
+    مقادیر خوانده شده از دیتابیس را نگه می‌دارد تا سیگنال‌ها بتوانند تغییرات را تشخیص دهند.
+    save مدل بعد از ذخیره remember_loaded_values را صدا می‌زند؛ پس سیگنال post_save هنوز
+    مقادیر قبل از ذخیره را می‌بیند.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def remember_loaded_values(self):
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
+    def has_changed(self, *fields):
+        """
+        آیا یکی از فیلدهای داده شده نسبت به مقدار خوانده شده از دیتابیس تغییر کرده است؟
+        برای شیئی که از دیتابیس خوانده نشده (مثلا شیء جدید) همیشه True است.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(field not in loaded or loaded[field] != getattr(self, field) for field in fields)
+
 # ==================================
 # مدل دسته‌بندی (Category)
 # ==================================- 
@@ -26,10 +60,38 @@ class Category(models.Model):
 # ==================================
 # مدل مقاله (Article)
 # ==================================
-class Article(models.Model):
+class ArticleQuerySet(models.QuerySet):
+    """
+    کوئری‌های پرکاربرد مقالات.
+    """
+    def published(self):
+        """
+        فقط مقالات منتشر شده.
+        """
+        return self.filter(status='p')
+
+    def cards(self, content=None):
+        """
+        هر چیزی که کارت یک مقاله در لیست‌ها لازم دارد را از قبل بارگذاری می‌کند:
+        نویسنده با JOIN و دسته‌بندی‌ها با یک کوئری prefetch برای کل صفحه.
+        تعداد نظرات هم از شمارنده ذخیره‌شده (comment_count) خوانده می‌شود.
+        به این ترتیب تعداد کوئری‌های یک صفحه به تعداد کارت‌ها بستگی ندارد.
+        کارت‌ها خلاصه ذخیره‌شده (excerpt) را نشان می‌دهند، پس متن کامل خوانده نمی‌شود؛
+        اگر یکی از فیلدهای متن لازم است ('body' یا 'body_html') با content مشخص شود.
+        """
+        queryset = self.select_related('author').prefetch_related(
+            Prefetch('category', queryset=Category.objects.only('id', 'title'))
+        )
+        return queryset.defer(*({'body', 'body_html'} - {content}))
+
+
+class Article(TrackChangesMixin, ImageDerivativesMixin, models.Model):
     """
     مدل اصلی برای مقالات وبلاگ.
     """
+    # عرض نسخه‌های کوچک‌شده تصویر شاخص: تصویر کوچک ادمین، کارت‌ها، صفحه مقاله و بنر
+    image_derivative_widths = (120, 360, 720, 1280)
+
     # --- وضعیت مقاله ---
     # به جای دو فیلد Boolean، از یک فیلد CharField با گزینه‌های مشخص استفاده می‌کنیم.
     # این کار مدیریت وضعیت مقاله (پیش‌نویس، منتشر شده) را بسیار انعطاف‌پذیرتر می‌کند.
@@ -46,17 +108,40 @@ class Article(models.Model):
     # --- فیلدهای اصلی ---
     title = models.CharField(max_length=70, unique=True, verbose_name="عنوان مقاله")
     body = models.TextField(verbose_name="محتوای مقاله")
+    # --- فیلدهای محاسبه‌شده از متن ---
+    # هنگام ذخیره یک بار ساخته می‌شوند تا نمایش صفحات HTML خام را پردازش نکند.
+    body_html = models.TextField(blank=True, editable=False, verbose_name="محتوای پاک‌سازی‌شده")
+    excerpt = models.TextField(blank=True, editable=False, verbose_name="خلاصه")
     image = models.ImageField(upload_to="articles/images/", blank=True, null=True, verbose_name="تصویر شاخص")
     slug = models.SlugField(blank=True, unique=True, allow_unicode=True, verbose_name="اسلاگ (آدرس)")
 
     # --- تاریخ‌ها ---
     created = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     updated = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    # --- شمارنده‌های ذخیره‌شده ---
+    # به جای اجرای COUNT(*) روی جدول‌های لایک و نظر در هر بار نمایش صفحه،
+    # تعدادها در خود مقاله نگهداری می‌شوند و با F-expression به‌روزرسانی می‌شوند:
+    # لایک‌ها در Like.toggle و نظرها با سیگنال‌های ذخیره و حذف Comment (blog/signals.py).
+    # تغییرهایی که سیگنال ندارند (queryset.update، bulk_create و حذف لایک‌ها همراه با کاربر)
+    # را دستور reconcile_counters اصلاح می‌کند که باید به صورت زمان‌بندی‌شده (مثلا روزانه) اجرا شود.
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد لایک‌ها")
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد نظرات")
+    active_comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد نظرات فعال")
+
+    objects = ArticleQuerySet.as_manager()
     
     class Meta:
         ordering = ("-created",)
         verbose_name = "مقاله"
         verbose_name_plural = "مقالات"
+        indexes = [
+            # لیست‌ها، صفحه‌بندی کرسری، سایدبار و صفحه اصلی فقط مقالات منتشر شده را به ترتیب
+            # (created, id) نزولی می‌خوانند؛ ایندکس جزئی فقط همین ردیف‌ها را دارد و مرتب‌سازی لازم نیست
+            models.Index(
+                fields=['-created', '-id'], name='blog_article_published_idx', condition=Q(status='p'),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -64,10 +149,26 @@ class Article(models.Model):
     def save(self, *args, **kwargs):
         """
         هنگام ذخیره، اگر اسلاگ وجود نداشت، آن را از روی عنوان بساز.
+        اگر متن تغییر کرده باشد، نسخه پاک‌سازی‌شده و خلاصه آن هم دوباره ساخته می‌شود.
         """
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True) # allow_unicode برای پشتیبانی از فارسی
+        update_fields = kwargs.get('update_fields')
+        body_loaded = not {'body', 'body_html'} & self.get_deferred_fields()
+        if body_loaded and (update_fields is None or 'body' in update_fields):
+            if not self.body_html or self.has_changed('body'):
+                self.render_body()
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'body_html', 'excerpt'}
         super().save(*args, **kwargs)
+        self.remember_loaded_values()
+
+    def render_body(self):
+        """
+        نسخه پاک‌سازی‌شده متن و خلاصه آن را از روی body می‌سازد (بدون ذخیره).
+        """
+        self.body_html = sanitize_html(self.body)
+        self.excerpt = make_excerpt(self.body_html)
 
     def get_absolute_url(self):
         """
@@ -80,14 +181,60 @@ class Article(models.Model):
         متدی برای نمایش تصویر در پنل ادمین.
         """
         if self.image:
-            return format_html(f'<img src="{self.image.url}" width="60px" height="50px" style="border-radius: 5px;">')
+            # کوچک‌ترین نسخه تصویر، نه فایل اصلی با اندازه کامل
+            return format_html(
+                '<img src="{}" width="60px" height="50px" style="border-radius: 5px; object-fit: cover;">',
+                self.image_url(120),
+            )
         return format_html('<span style="color:red;">بدون تصویر</span>')
     show_image.short_description = 'تصویر' # تغییر عنوان ستون در ادمین
 
+    def recount(self):
+        """
+        شمارنده‌های ذخیره‌شده را از روی جدول‌های لایک و نظر دوباره محاسبه و ذخیره می‌کند.
+        """
+        comments = self.comments.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+        )
+        self.like_count = self.article_likes.count()
+        self.comment_count = comments['total']
+        self.active_comment_count = comments['active']
+        # از update استفاده می‌کنیم تا فیلد updated (auto_now) تغییر نکند
+        Article.objects.filter(pk=self.pk).update(
+            like_count=self.like_count,
+            comment_count=self.comment_count,
+            active_comment_count=self.active_comment_count,
+        )
+
 # ==================================
 # مدل نظرات (Comment)
 # ==================================
-class Comment(models.Model):
+class CommentQuerySet(models.QuerySet):
+    """
+    متدهای کمکی برای خواندن نظرات.
+    """
+    def tree(self):
+        """
+        تمام نظرات را با یک کوئری (همراه با کاربر) می‌خواند و درخت نظرات را در پایتون می‌سازد.
+        خروجی، لیست نظرات ریشه است و پاسخ‌های هر نظر در ویژگی `children` آن قرار می‌گیرند.
+        ترتیب نظرات در هر سطح همان ترتیب کوئری است.
+        """
+        comments = list(self.select_related('user'))
+        by_id = {comment.pk: comment for comment in comments}
+        roots = []
+        for comment in comments:
+            comment.children = []
+        for comment in comments:
+            parent = by_id.get(comment.parent_id)
+            if parent is None:
+                roots.append(comment)
+            else:
+                parent.children.append(comment)
+        return roots
+
+
+class Comment(TrackChangesMixin, models.Model):
     """
     مدل برای ثبت نظرات کاربران برای هر مقاله.
     """
@@ -99,14 +246,57 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     is_active = models.BooleanField(default=True, verbose_name="فعال") # برای تایید یا عدم تایید کامنت توسط ادمین
 
+    # --- مسیر درختی (Materialized Path) ---
+    # مسیر هر نظر، شناسه‌های اجداد و خودش است؛ مثلا 0000000012/0000000045/
+    # با این کار کل زیرشاخه یک نظر با یک کوئری بازه‌ای روی ایندکس path خوانده می‌شود.
+    path = models.CharField(max_length=255, blank=True, editable=False, verbose_name="مسیر درختی")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="عمق")
+
+    # هر سطح ده رقم شناسه و یک «/» به مسیر اضافه می‌کند. عمیق‌ترین سطحی که مسیرش در path جا
+    # می‌شود MAX_DEPTH است؛ پاسخ به نظری در این عمق، کنار همان نظر (پاسخ به والدش) ثبت می‌شود.
+    PATH_STEP = 11
+    MAX_DEPTH = path.max_length // PATH_STEP - 1
+
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created_at',)
         verbose_name = "نظر"
         verbose_name_plural = "نظرات"
+        indexes = [
+            # varchar_pattern_ops فقط در PostgreSQL استفاده می‌شود تا LIKE 'prefix%' از ایندکس استفاده کند
+            models.Index(fields=['path'], name='blog_comment_path_idx', opclasses=['varchar_pattern_ops']),
+            # درخت نظرات همه نظرات یک مقاله را به ترتیب جدیدترین می‌خواند (بدون شرط روی parent)
+            models.Index(fields=['article', '-created_at'], name='blog_comment_article_idx'),
+        ]
 
     def __str__(self):
         return f"نظر توسط {self.user.username} برای {self.article.title}"
 
+    def save(self, *args, **kwargs):
+        """
+        بعد از اولین ذخیره (وقتی شناسه مشخص شد)، مسیر و عمق نظر را از روی والد می‌سازد.
+        والد یک نظر بعد از ثبت تغییر نمی‌کند، پس مسیر فقط یک بار ساخته می‌شود.
+        ثبت نظر و مسیرش در یک تراکنش است تا نظری بدون مسیر در دیتابیس نماند.
+        """
+        with transaction.atomic():
+            if not self.path and self.parent_id and self.parent.depth >= self.MAX_DEPTH:
+                # جد نظر والد در عمق MAX_DEPTH - 1 (از روی مسیر والد)
+                self.parent_id = int(self.parent.path.split('/')[self.MAX_DEPTH - 1])
+            super().save(*args, **kwargs)
+            if not self.path:
+                parent = self.parent if self.parent_id else None
+                self.depth = parent.depth + 1 if parent else 0
+                self.path = f"{parent.path if parent else ''}{self.pk:010d}/"
+                Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+        self.remember_loaded_values()
+
+    def subtree(self):
+        """
+        خود نظر و تمام پاسخ‌های آن (در هر عمقی) را به ترتیب درختی برمی‌گرداند.
+        """
+        return Comment.objects.filter(path__startswith=self.path).order_by('path')
+
 # ==================================
 # مدل لایک (Like)
 # ==================================
@@ -127,6 +317,76 @@ class Like(models.Model):
     def __str__(self):
         return f"{self.user.username} مقاله '{self.article.title}' را لایک کرده است"
 
+    @classmethod
+    def toggle(cls, user, article):
+        """
+        لایک کاربر را به صورت اتمیک برعکس می‌کند و (لایک شده؟, تعداد لایک‌ها) را برمی‌گرداند.
+        اول DELETE اجرا می‌شود؛ اگر ردیفی حذف نشد، INSERT. اگر درخواست همزمانی زودتر همین
+        لایک را ساخته باشد، خطای IntegrityError گرفته می‌شود و شمارنده دوباره اضافه نمی‌شود.
+        """
+        with transaction.atomic():
+            _, deleted = cls.objects.filter(user=user, article=article).delete()
+            if deleted.get(cls._meta.label):
+                liked, delta = False, -1
+            else:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(user=user, article=article)
+                    liked, delta = True, 1
+                except IntegrityError:
+                    liked, delta = True, 0
+            if delta:
+                Article.objects.filter(pk=article.pk).update(like_count=F('like_count') + delta)
+        like_count = Article.objects.filter(pk=article.pk).values_list('like_count', flat=True).get()
+        return liked, like_count
+
+# ==================================
+# جدول‌های نمایه جستجو (Search Index)
+# ==================================
+class SearchTerm(models.Model):
+    """
+    یک کلمه نرمال‌شده در نمایه جستجو، همراه با تعداد مقالاتی که آن را دارند (df).
+    """
+    term = models.CharField(max_length=64, unique=True, verbose_name="کلمه")
+    df = models.PositiveIntegerField(default=0, verbose_name="تعداد مقالات")
+
+    class Meta:
+        verbose_name = "کلمه جستجو"
+        verbose_name_plural = "کلمات جستجو"
+        indexes = [
+            # برای جستجوی پیشوندی (term LIKE 'prefix%') در PostgreSQL
+            models.Index(fields=['term'], name='blog_searchterm_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class SearchPosting(models.Model):
+    """
+    یک ردیف از لیست وقوع (posting list): کلمه در کدام مقاله و چند بار آمده است.
+    """
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='postings', verbose_name="کلمه")
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='search_postings', verbose_name="مقاله")
+    frequency = models.PositiveIntegerField(verbose_name="تعداد تکرار")
+
+    class Meta:
+        verbose_name = "وقوع کلمه"
+        verbose_name_plural = "وقوع کلمات"
+        unique_together = ('term', 'article')
+
+
+class SearchDocument(models.Model):
+    """
+    اطلاعات هر مقاله نمایه‌شده که رتبه‌بندی BM25 لازم دارد (طول سند).
+    """
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='search_document', verbose_name="مقاله")
+    length = models.PositiveIntegerField(verbose_name="طول سند")
+
+    class Meta:
+        verbose_name = "سند جستجو"
+        verbose_name_plural = "اسناد جستجو"
+
 # ==================================
 # مدل پیام (Message)
 # این مدل برای فرم "تماس با ما" مناسب است.
@@ -0,0 +1,200 @@
+import hashlib
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from standblog.routers import primary_reads, served_by_replica
+
+from .cache import aget_versions, changed_since, get_versions
+
+# ==================================
+# کش کامل صفحات برای بازدیدکنندگان ناشناس
+# ==================================
+# هر ویو با add_surrogate_keys مشخص می‌کند صفحه‌اش به چه داده‌هایی وابسته است
+# (مثلا article:12، category:3، home، sidebar). صفحه همراه با نسخه فعلی این کلیدها
+# ذخیره می‌شود و هنگام خواندن، اگر نسخه یکی از کلیدها عوض شده باشد، صفحه دوباره ساخته می‌شود.
+# سیگنال‌ها (blog/signals.py) با bump_version فقط کلیدهای مربوط به داده تغییر کرده را بالا می‌برند.
+# چون هیچ فهرستی از کلیدها نگهداری نمی‌شود، با کش local-memory و file-based هم کار می‌کند.
+#
+# کلیدهای صفحه فقط بعد از رندر معلوم‌اند. اگر در حین رندر یکی از آن‌ها بالا برود، صفحه ممکن است
+# داده قبل از تغییر را داشته باشد؛ پس صفحه فقط وقتی ذخیره می‌شود که هیچ‌کدام از نسخه‌هایش بعد از
+# شروع رندر بالا نرفته باشد (blog.cache.changed_since). صفحه‌ای که از replica خوانده شده، به اندازه
+# عقب‌ماندگی replica (REPLICA_STICKY_SECONDS) حاشیه بیشتری دارد. صفحه‌ای که تازه بی‌اعتبار شده
+# (نسخه یکی از کلیدهای ورودی قبلی‌اش در همین بازه بالا رفته) از دیتابیس اصلی ساخته می‌شود تا
+# بلافاصله دوباره کش شود؛ بقیه صفحات مثل هر درخواست دیگری از replica خوانده می‌شوند.
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+PAGE_KEY_PREFIX = 'standblog:page:'
+
+
+def add_surrogate_keys(request, *keys):
+    """
+    کلیدهایی که صفحه جاری به آن‌ها وابسته است را ثبت می‌کند.
+    فقط صفحاتی که حداقل یک کلید دارند کش می‌شوند.
+    """
+    if hasattr(request, 'surrogate_keys'):
+        request.surrogate_keys.update(keys)
+
+
+def article_key(article):
+    return f'article:{article.pk}'
+
+
+def category_key(category):
+    return f'category:{getattr(category, "pk", category)}'
+
+
+def user_key(user):
+    # نام و تصویر کاربر در هدر صفحات؛ فقط در ETag صفحات کاربر واردشده (صفحات ناشناس کش نمی‌شوند)
+    return f'user:{getattr(user, "pk", user)}'
+
+
+class SurrogateKeysMixin:
+    """
+    کلیدهای کش صفحه را برای ویوهای مقالات ثبت می‌کند: کلیدهای ثابت ویو
+    (surrogate_keys) به اضافه کلید تک‌تک مقالاتی که در صفحه نمایش داده می‌شوند.
+    """
+    surrogate_keys = ('sidebar',)
+
+    def get_surrogate_keys(self, context):
+        keys = list(self.surrogate_keys)
+        if context.get('article') is not None:
+            keys.append(article_key(context['article']))
+        for article in context.get('object_list') or ():
+            keys.append(article_key(article))
+        return keys
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        add_surrogate_keys(self.request, *self.get_surrogate_keys(context))
+        return context
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    پاسخ درخواست‌های GET بازدیدکنندگان ناشناس را (برای صفحاتی که کلید دارند) کش می‌کند.
+    درخواست‌هایی که کوکی نشست یا پیام دارند همیشه از ویو عبور می‌کنند،
+    چون ممکن است محتوای مخصوص همان کاربر داشته باشند.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = self.page_key(request)
+        entry = cache.get(key)
+        current = get_versions(list(entry['keys'])) if entry is not None else None
+        if current is not None and current == entry['keys']:
+            return self.cached_response(request, entry)
+
+        request.surrogate_keys = set()
+        started = time.time_ns()
+        with self.read_context(current, started):
+            response = self.get_response(request)
+        if request.method == 'GET' and self.is_cacheable_response(request, response):
+            versions = get_versions(sorted(request.surrogate_keys))
+            if not self.changed_during_render(versions, started):
+                cache.set(key, self.make_entry(response, versions), PAGE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_cacheable_request(request):
+            return await self.get_response(request)
+
+        key = self.page_key(request)
+        entry = await cache.aget(key)
+        current = await aget_versions(list(entry['keys'])) if entry is not None else None
+        if current is not None and current == entry['keys']:
+            return self.cached_response(request, entry)
+
+        request.surrogate_keys = set()
+        started = time.time_ns()
+        with self.read_context(current, started):
+            response = await self.get_response(request)
+        if request.method == 'GET' and self.is_cacheable_response(request, response):
+            versions = await aget_versions(sorted(request.surrogate_keys))
+            if not self.changed_during_render(versions, started):
+                await cache.aset(key, self.make_entry(response, versions), PAGE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def read_context(current, started):
+        """
+        صفحه‌ای که یکی از کلیدهای ورودی قبلی‌اش در بازه عقب‌ماندگی replica بالا رفته، از دیتابیس
+        اصلی ساخته می‌شود؛ replica ممکن است هنوز همان تغییر را نداشته باشد.
+        """
+        lag = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if current and changed_since(current.values(), started, lag):
+            return primary_reads()
+        return nullcontext()
+
+    @staticmethod
+    def changed_during_render(versions, started):
+        lag = getattr(settings, 'REPLICA_STICKY_SECONDS', 10) if served_by_replica() else 0
+        return changed_since(versions.values(), started, lag)
+
+    @staticmethod
+    def make_entry(response, versions):
+        return {
+            'keys': versions,
+            'status': response.status_code,
+            'headers': list(response.items()),
+            'content': response.content,
+        }
+
+    @staticmethod
+    def cached_response(request, entry):
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for header, value in entry['headers']:
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        # هدرهای ETag و Last-Modified صفحه کش‌شده برای درخواست‌های شرطی هم معتبرند
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified')),
+            response=response,
+        )
+
+    @staticmethod
+    def page_key(request):
+        raw = f'{request.get_host()}{request.get_full_path()}'
+        return PAGE_KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+    @staticmethod
+    def is_cacheable_request(request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        cookies = request.COOKIES
+        return settings.SESSION_COOKIE_NAME not in cookies and 'messages' not in cookies
+
+    @staticmethod
+    def is_cacheable_response(request, response):
+        return (
+            response.status_code == 200
+            and bool(request.surrogate_keys)
+            and not response.streaming
+            and not response.cookies
+            # صفحه‌ای که توکن CSRF ساخته، مخصوص همین بازدیدکننده است
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and 'private' not in response.get('Cache-Control', '')
+        )
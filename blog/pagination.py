@@ -0,0 +1,226 @@
+import math
+from datetime import datetime
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+# ==================================
+# صفحه‌بندی ترکیبی: شماره صفحه برای صفحات اول، کرسر برای صفحات عمیق
+# ==================================
+# صفحه‌بندی عادی جنگو برای هر صفحه یک COUNT(*) و یک OFFSET n اجرا می‌کند که در صفحات
+# عمیق (و برای خزنده‌ها) به صورت خطی کند می‌شود. در اینجا چند صفحه اول با شماره صفحه
+# نمایش داده می‌شوند و بعد از آن، صفحه‌ها با یک کرسر مات روی (created, id) جلو می‌روند
+# که فقط یک کوئری ایندکس‌شده با LIMIT است.
+
+def encode_cursor(article, direction):
+    """
+    کرسر مات برای موقعیت یک مقاله؛ direction برابر 'n' (صفحه بعد) یا 'p' (صفحه قبل) است.
+    """
+    raw = f'{direction}|{article.created.isoformat()}|{article.pk}'
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(token):
+    """
+    کرسر را باز می‌کند؛ کرسر نامعتبر یعنی صفحه‌ای که وجود ندارد (404).
+    """
+    try:
+        direction, created, pk = force_str(urlsafe_base64_decode(token)).split('|')
+        created, pk = datetime.fromisoformat(created), int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise Http404('صفحه نامعتبر است.')
+    if direction not in ('n', 'p'):
+        raise Http404('صفحه نامعتبر است.')
+    return direction, created, pk
+
+
+class CappedPaginator(Paginator):
+    """
+    Paginator که فقط تا max_pages صفحه را می‌شمارد؛ COUNT روی یک زیرکوئری محدود اجرا می‌شود.
+    اگر مقالات بیشتری وجود داشته باشد، truncated برابر True می‌شود.
+    """
+    def __init__(self, object_list, per_page, max_pages, **kwargs):
+        self.max_pages = max_pages
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.max_pages * self.per_page + 1].count()
+
+    async def acount(self):
+        """
+        count را با کوئری async محاسبه می‌کند (برای ویوهای async، قبل از page()).
+        """
+        if 'count' not in self.__dict__:
+            self.count = await self.object_list[:self.max_pages * self.per_page + 1].acount()
+        return self.count
+
+    @cached_property
+    def truncated(self):
+        return self.count > self.max_pages * self.per_page
+
+    @cached_property
+    def num_pages(self):
+        if self.count == 0 and not self.allow_empty_first_page:
+            return 0
+        return max(1, min(math.ceil(self.count / self.per_page), self.max_pages))
+
+
+class CursorPage:
+    """
+    یک صفحه در حالت کرسر؛ رابطی شبیه به Page جنگو دارد ولی شماره صفحه ندارد.
+    """
+    number = None
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = encode_cursor(object_list[-1], 'n') if has_next and object_list else None
+        self.previous_cursor = encode_cursor(object_list[0], 'p') if has_previous and object_list else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+def cursor_queryset(queryset, direction, created, pk, page_size):
+    """
+    کوئری یک صفحه در حالت کرسر (یک ردیف بیشتر، برای فهمیدن وجود صفحه بعد یا قبل).
+    """
+    if direction == 'n':
+        return queryset.filter(Q(created__lt=created) | Q(created=created, pk__lt=pk))[:page_size + 1]
+    return (
+        queryset.filter(Q(created__gt=created) | Q(created=created, pk__gt=pk))
+        .order_by('created', 'pk')[:page_size + 1]
+    )
+
+
+def cursor_page(rows, direction, page_size):
+    """
+    CursorPage از ردیف‌های خوانده شده با cursor_queryset.
+    """
+    if direction == 'n':
+        return CursorPage(rows[:page_size], has_next=len(rows) > page_size, has_previous=True)
+    return CursorPage(rows[:page_size][::-1], has_next=True, has_previous=len(rows) > page_size)
+
+
+def page_links(page, page_kwarg='page', cursor_kwarg='cursor'):
+    """
+    متغیرهای تمپلیت برای لینک‌های صفحه‌بندی: page_numbers، previous_page_query و next_page_query
+    (و is_paginated برای آخرین صفحه شماره‌دار که بعد از آن با کرسر ادامه می‌دهیم).
+    """
+    if isinstance(page, CursorPage):
+        return {
+            'page_numbers': [],
+            'previous_page_query': page.previous_cursor and f'{cursor_kwarg}={page.previous_cursor}',
+            'next_page_query': page.next_cursor and f'{cursor_kwarg}={page.next_cursor}',
+        }
+
+    paginator = page.paginator
+    links = {
+        'page_numbers': paginator.page_range,
+        'previous_page_query': page.has_previous() and f'{page_kwarg}={page.previous_page_number()}',
+        'next_page_query': None,
+    }
+    if page.has_next():
+        links['next_page_query'] = f'{page_kwarg}={page.next_page_number()}'
+    elif getattr(paginator, 'truncated', False) and page.object_list:
+        # آخرین صفحه شماره‌دار: از اینجا به بعد با کرسر ادامه می‌دهیم
+        last = list(page.object_list)[-1]
+        links['next_page_query'] = f'{cursor_kwarg}={encode_cursor(last, "n")}'
+        links['is_paginated'] = True
+    return links
+
+
+def get_page(paginator, number):
+    """
+    صفحه number را مثل ListView برمی‌گرداند: «last» یعنی آخرین صفحه و شماره نامعتبر یعنی 404.
+    """
+    try:
+        number = int(number)
+    except ValueError:
+        if number != 'last':
+            raise Http404('شماره صفحه نامعتبر است.')
+        number = paginator.num_pages
+    try:
+        return paginator.page(number)
+    except InvalidPage:
+        raise Http404('صفحه وجود ندارد.')
+
+
+async def apaginate(queryset, request, page_size, offset_pages=5, page_kwarg='page', cursor_kwarg='cursor'):
+    """
+    صفحه‌بندی ترکیبی برای ویوهای async با کوئری‌های async (acount و async for).
+    خروجی مثل ListView.paginate_queryset است: (paginator، صفحه، لیست مقالات، is_paginated).
+    """
+    queryset = queryset.order_by('-created', '-pk')
+    token = request.GET.get(cursor_kwarg)
+    if token:
+        direction, created, pk = decode_cursor(token)
+        rows = [article async for article in cursor_queryset(queryset, direction, created, pk, page_size)]
+        page = cursor_page(rows, direction, page_size)
+        return None, page, page.object_list, page.has_other_pages()
+
+    paginator = CappedPaginator(queryset, page_size, max_pages=offset_pages)
+    await paginator.acount()
+    page = get_page(paginator, request.GET.get(page_kwarg) or 1)
+    page.object_list = [article async for article in page.object_list]
+    return paginator, page, page.object_list, page.has_other_pages()
+
+
+class KeysetPaginationMixin:
+    """
+    این Mixin صفحه‌بندی ترکیبی را به ListView اضافه می‌کند.
+    صفحات 1 تا offset_pages با ?page=n و صفحات بعدی با ?cursor=... نمایش داده می‌شوند.
+    تمپلیت از متغیرهای page_numbers، previous_page_query و next_page_query استفاده می‌کند.
+    """
+    offset_pages = 5
+    cursor_kwarg = 'cursor'
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        if isinstance(queryset, QuerySet):
+            return CappedPaginator(
+                queryset, per_page, max_pages=self.offset_pages,
+                orphans=orphans, allow_empty_first_page=allow_empty_first_page, **kwargs,
+            )
+        # لیست‌های درون حافظه (مثل نتایج جستجو) OFFSET و COUNT دیتابیسی ندارند
+        return super().get_paginator(queryset, per_page, orphans, allow_empty_first_page, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not isinstance(queryset, QuerySet):
+            return super().paginate_queryset(queryset, page_size)
+
+        # ترتیب کامل و یکتا لازم است تا کرسر و شماره صفحه با هم سازگار باشند
+        queryset = queryset.order_by('-created', '-pk')
+        token = self.request.GET.get(self.cursor_kwarg)
+        if not token:
+            return super().paginate_queryset(queryset, page_size)
+
+        direction, created, pk = decode_cursor(token)
+        rows = list(cursor_queryset(queryset, direction, created, pk, page_size))
+        page = cursor_page(rows, direction, page_size)
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is not None:
+            context.update(page_links(page, self.page_kwarg, self.cursor_kwarg))
+        return context
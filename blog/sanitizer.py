@@ -0,0 +1,108 @@
+from html import escape, unescape
+from html.parser import HTMLParser
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# ==================================
+# پاک‌سازی HTML متن مقاله
+# ==================================
+# متن مقاله از پنل ادمین به صورت HTML وارد می‌شود و در صفحه با |safe نمایش داده می‌شد.
+# حالا یک بار هنگام ذخیره، فقط تگ‌ها و ویژگی‌های مجاز نگه داشته می‌شوند و نتیجه
+# در فیلد body_html ذخیره می‌شود تا نمایش صفحه دیگر HTML خام را پردازش نکند.
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre',
+    's', 'small', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th',
+    'thead', 'tr', 'u', 'ul',
+})
+VOID_TAGS = frozenset({'br', 'hr', 'img'})
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title', 'target', 'rel'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+    '*': {'class', 'dir'},
+}
+URL_ATTRIBUTES = frozenset({'href', 'src'})
+ALLOWED_SCHEMES = ('http://', 'https://', 'mailto:', '/', '#')
+# محتوای این تگ‌ها کلا حذف می‌شود، نه فقط خود تگ
+DROPPED_CONTENT_TAGS = frozenset({'script', 'style', 'iframe', 'object', 'embed', 'template'})
+
+# تعداد کلمات خلاصه‌ای که در کارت مقالات نمایش داده می‌شود
+EXCERPT_WORDS = 40
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set()) | ALLOWED_ATTRIBUTES['*']
+        has_target = tag == 'a' and any(name == 'target' for name, _ in attrs)
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed or value is None or (has_target and name == 'rel'):
+                continue
+            if name in URL_ATTRIBUTES and not value.strip().lower().startswith(ALLOWED_SCHEMES):
+                continue
+            rendered.append(f' {name}="{escape(value)}"')
+        if has_target:
+            rendered.append(' rel="noopener noreferrer"')
+        self.parts.append(f'<{tag}{"".join(rendered)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # تگ‌هایی که داخل این تگ باز مانده‌اند هم بسته می‌شوند
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        return ''.join(self.parts) + ''.join(f'</{tag}>' for tag in reversed(self.open_tags))
+
+
+def sanitize_html(body):
+    """
+    HTML متن مقاله را به زیرمجموعه امنی از تگ‌ها و ویژگی‌ها محدود می‌کند
+    و تگ‌های باز مانده را می‌بندد.
+    """
+    parser = _Sanitizer()
+    parser.feed(body or '')
+    return parser.result()
+
+
+def make_excerpt(body_html, words=EXCERPT_WORDS):
+    """
+    خلاصه متنی (بدون HTML) از ابتدای متن پاک‌سازی‌شده مقاله (خروجی sanitize_html).
+    روی متن خام اجرا نشود: strip_tags محتوای script و style را به عنوان متن نگه می‌دارد.
+    """
+    # بعد از هر تگ فاصله می‌گذاریم تا کلمات دو پاراگراف به هم نچسبند
+    text = ' '.join(unescape(strip_tags((body_html or '').replace('>', '> '))).split())
+    return Truncator(text).words(words, truncate='…')
@@ -0,0 +1,10 @@
+"""
+موتور جستجوی تمام‌متن مقالات با پشتیبانی از متن فارسی.
+
+- text: نرمال‌سازی و جداسازی کلمات
+- indexer: به‌روزرسانی افزایشی نمایه معکوس در دیتابیس
+- engine: جستجو، رتبه‌بندی BM25 و خلاصه هایلایت‌شده
+"""
+from .engine import SearchResults, asearch, highlight, search
+from .indexer import index_article, index_new_articles, remove_article
+from .text import analyze, normalize, tokenize
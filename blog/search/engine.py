@@ -0,0 +1,184 @@
+import math
+
+from django.db.models import Avg, Count, Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from blog.models import Article, SearchDocument, SearchPosting, SearchTerm
+from .text import html_to_text, iter_tokens, tokenize
+
+# ==================================
+# پارامترهای رتبه‌بندی BM25
+# ==================================
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# کلماتی که فقط با پیشوند عبارت جستجو مطابقت دارند (مثلا «کتاب‌ها» برای «کتاب») امتیاز کمتری می‌گیرند
+PREFIX_WEIGHT = 0.5
+MIN_PREFIX_LENGTH = 3
+MAX_PREFIX_EXPANSIONS = 20
+
+SNIPPET_WORDS = 30
+
+
+def highlight(body, terms, size=SNIPPET_WORDS):
+    """
+    بخشی از متن مقاله را که اولین کلمه مطابق در آن است برمی‌گرداند
+    و کلمات مطابق را داخل تگ <mark> قرار می‌دهد.
+    """
+    text = html_to_text(body)
+    tokens = list(iter_tokens(text))
+    if not tokens:
+        return ''
+    first_hit = next((i for i, (token, _, _) in enumerate(tokens) if token in terms), 0)
+    start = max(0, first_hit - size // 3)
+    end = min(len(tokens), start + size)
+
+    parts = ['… '] if start > 0 else []
+    position = tokens[start][1]
+    for token, token_start, token_end in tokens[start:end]:
+        parts.append(escape(text[position:token_start]))
+        word = escape(text[token_start:token_end])
+        parts.append(f'<mark>{word}</mark>' if token in terms else word)
+        position = token_end
+    if end < len(tokens):
+        parts.append(' …')
+    return mark_safe(''.join(parts))
+
+
+class SearchResults:
+    """
+    نتایج رتبه‌بندی شده جستجو به صورت یک لیست تنبل.
+    فقط شناسه‌ها و امتیازها در حافظه هستند؛ مقالات هر برش (مثلا یک صفحه از Paginator)
+    هنگام دسترسی با یک کوئری خوانده می‌شوند و امتیاز و خلاصه هایلایت‌شده به آن‌ها اضافه می‌شود.
+    """
+
+    def __init__(self, ranked, terms):
+        self.ranked = ranked  # لیست (شناسه مقاله، امتیاز) به ترتیب امتیاز
+        self.terms = terms    # کلمات نمایه که با عبارت جستجو مطابقت داشتند
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def count(self):
+        return len(self.ranked)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._load(self.ranked[key])
+        return self._load([self.ranked[key]])[0]
+
+    def _load(self, ranked):
+        articles = self._articles().in_bulk([article_id for article_id, _ in ranked])
+        return self._annotate(articles, ranked)
+
+    async def aload(self, ranked):
+        """
+        نسخه async برای _load: مقالات بخشی از ranked (مثلا یک صفحه) با async for خوانده می‌شوند.
+        """
+        ids = [article_id for article_id, _ in ranked]
+        articles = {article.pk: article async for article in self._articles().filter(pk__in=ids)}
+        return self._annotate(articles, ranked)
+
+    @staticmethod
+    def _articles():
+        return Article.objects.published().cards(content='body')
+
+    def _annotate(self, articles, ranked):
+        results = []
+        for article_id, score in ranked:
+            article = articles.get(article_id)
+            if article is None:
+                continue
+            article.search_score = score
+            article.search_snippet = highlight(article.body, self.terms)
+            results.append(article)
+        return results
+
+
+def _terms_query(tokens):
+    condition = Q(term__in=tokens)
+    for token in tokens:
+        if len(token) >= MIN_PREFIX_LENGTH:
+            condition |= Q(term__startswith=token)
+    return SearchTerm.objects.filter(condition, df__gt=0).values_list('id', 'term', 'df').order_by('-df')
+
+
+def _matching_terms(tokens, rows):
+    """
+    کلمات نمایه (ردیف‌های _terms_query) که با کلمات عبارت جستجو برابرند یا (برای کلمات بلندتر)
+    با آن‌ها شروع می‌شوند. خروجی: {شناسه کلمه: (متن کلمه، df، وزن)}
+    """
+    matched = {}
+    expansions = dict.fromkeys(tokens, 0)
+    for term_id, term, df in rows:
+        if term in expansions:
+            matched[term_id] = (term, df, 1.0)
+            continue
+        for token in tokens:
+            if term.startswith(token) and expansions[token] < MAX_PREFIX_EXPANSIONS:
+                expansions[token] += 1
+                matched[term_id] = (term, df, PREFIX_WEIGHT)
+                break
+    return matched
+
+
+def _postings_query(matched):
+    return SearchPosting.objects.filter(term_id__in=list(matched)).values_list(
+        'article_id', 'term_id', 'frequency', 'article__search_document__length',
+    )
+
+
+def _rank(matched, stats, postings):
+    """
+    امتیاز BM25 هر مقاله از روی آمار نمایه و ردیف‌های _postings_query.
+    """
+    total = stats['total'] or 0
+    average_length = stats['average_length'] or 1
+
+    scores = {}
+    for article_id, term_id, frequency, length in postings:
+        _, df, weight = matched[term_id]
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * (length or 0) / average_length)
+        score = weight * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        scores[article_id] = scores.get(article_id, 0) + score
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+    return SearchResults(ranked, {term for term, _, _ in matched.values()})
+
+
+def search(query):
+    """
+    عبارت جستجو را در نمایه جستجو می‌کند و نتایج را با BM25 رتبه‌بندی می‌کند.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return SearchResults([], set())
+
+    matched = _matching_terms(tokens, _terms_query(tokens))
+    if not matched:
+        return SearchResults([], set())
+
+    stats = SearchDocument.objects.aggregate(total=Count('pk'), average_length=Avg('length'))
+    return _rank(matched, stats, _postings_query(matched))
+
+
+async def asearch(query):
+    """
+    نسخه async برای search (برای ویوهای async)؛ همان کوئری‌ها با async for و aaggregate.
+    مقالات هر صفحه بعدا با SearchResults.aload خوانده می‌شوند.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return SearchResults([], set())
+
+    matched = _matching_terms(tokens, [row async for row in _terms_query(tokens)])
+    if not matched:
+        return SearchResults([], set())
+
+    stats = await SearchDocument.objects.aaggregate(total=Count('pk'), average_length=Avg('length'))
+    return _rank(matched, stats, [row async for row in _postings_query(matched)])
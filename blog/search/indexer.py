@@ -0,0 +1,120 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from blog.models import SearchDocument, SearchPosting, SearchTerm
+from .text import analyze
+
+# تعداد مقادیر در هر IN (...) تا از محدودیت متغیرهای SQLite عبور نکنیم
+CHUNK_SIZE = 500
+
+
+def chunked(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def term_ids(terms):
+    """
+    شناسه کلمات را برمی‌گرداند و کلماتی که هنوز در نمایه نیستند را می‌سازد.
+    """
+    ids = {}
+    for chunk in chunked(terms):
+        ids.update(SearchTerm.objects.filter(term__in=chunk).values_list('term', 'id'))
+    missing = [term for term in terms if term not in ids]
+    if missing:
+        # ignore_conflicts: اگر درخواست همزمانی همین کلمه را ساخته باشد، خطا نمی‌گیریم
+        SearchTerm.objects.bulk_create([SearchTerm(term=term) for term in missing], ignore_conflicts=True)
+        for chunk in chunked(missing):
+            ids.update(SearchTerm.objects.filter(term__in=chunk).values_list('term', 'id'))
+    return ids
+
+
+def _change_df(ids, delta):
+    for chunk in chunked(ids):
+        SearchTerm.objects.filter(pk__in=chunk).update(df=F('df') + delta)
+
+
+def remove_article(article):
+    """
+    مقاله را از نمایه حذف می‌کند و df کلمات آن را کم می‌کند.
+    """
+    with transaction.atomic():
+        removed = list(SearchPosting.objects.filter(article_id=article.pk).values_list('term_id', flat=True))
+        if removed:
+            SearchPosting.objects.filter(article_id=article.pk).delete()
+            _change_df(removed, -1)
+        SearchDocument.objects.filter(article_id=article.pk).delete()
+
+
+def index_article(article):
+    """
+    نمایه یک مقاله را به صورت افزایشی به‌روز می‌کند: فقط کلماتی که اضافه،
+    حذف یا تعدادشان عوض شده نوشته می‌شوند. مقالات منتشر نشده از نمایه حذف می‌شوند.
+    """
+    if article.status != 'p':
+        remove_article(article)
+        return
+
+    counts, length = analyze(article.title, article.body)
+    with transaction.atomic():
+        old = {posting.term_id: posting for posting in SearchPosting.objects.filter(article_id=article.pk)}
+        ids = term_ids(list(counts))
+        new = {ids[term]: frequency for term, frequency in counts.items()}
+
+        removed = [term_id for term_id in old if term_id not in new]
+        added = [term_id for term_id in new if term_id not in old]
+        changed = []
+        for term_id, posting in old.items():
+            if term_id in new and posting.frequency != new[term_id]:
+                posting.frequency = new[term_id]
+                changed.append(posting)
+
+        if removed:
+            for chunk in chunked(removed):
+                SearchPosting.objects.filter(article_id=article.pk, term_id__in=chunk).delete()
+            _change_df(removed, -1)
+        if added:
+            SearchPosting.objects.bulk_create(
+                [SearchPosting(term_id=term_id, article_id=article.pk, frequency=new[term_id]) for term_id in added],
+                batch_size=CHUNK_SIZE,
+            )
+            _change_df(added, 1)
+        if changed:
+            SearchPosting.objects.bulk_update(changed, ['frequency'], batch_size=CHUNK_SIZE)
+
+        SearchDocument.objects.update_or_create(article_id=article.pk, defaults={'length': length})
+
+
+def index_new_articles(articles):
+    """
+    مقالات تازه‌ای را که هنوز نمایه ندارند یکجا نمایه می‌کند (برای bulk_create که سیگنال‌ها را
+    اجرا نمی‌کند): وقوع‌ها و طول مقالات با bulk_create و df هر کلمه به اندازه تعداد مقالات جدید
+    آن زیاد می‌شود. مقالات منتشر نشده نادیده گرفته می‌شوند. خروجی: تعداد مقالات نمایه شده
+    """
+    analyzed = [(article.pk, analyze(article.title, article.body)) for article in articles if article.status == 'p']
+    if not analyzed:
+        return 0
+    with transaction.atomic():
+        ids = term_ids(list({term for _, (counts, _) in analyzed for term in counts}))
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(term_id=ids[term], article_id=pk, frequency=frequency)
+                for pk, (counts, _) in analyzed
+                for term, frequency in counts.items()
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+        SearchDocument.objects.bulk_create(
+            [SearchDocument(article_id=pk, length=length) for pk, (_, length) in analyzed],
+            batch_size=CHUNK_SIZE,
+        )
+        # کلماتی که df آن‌ها به یک اندازه زیاد می‌شود با یک UPDATE
+        by_delta = defaultdict(list)
+        for term_id, delta in Counter(ids[term] for _, (counts, _) in analyzed for term in counts).items():
+            by_delta[delta].append(term_id)
+        for delta, changed in by_delta.items():
+            _change_df(changed, delta)
+    return len(analyzed)
@@ -0,0 +1,77 @@
+import html
+import re
+from collections import Counter
+
+from django.utils.html import strip_tags
+
+# ==================================
+# نرمال‌سازی متن فارسی/عربی
+# ==================================
+# حروف عربی به معادل فارسی، ارقام فارسی و عربی به لاتین،
+# و حذف اعراب، کشیده (ـ) و نیم‌فاصله تا «می‌خواهم»، «میخواهم» و «مي‌خواهم» یکی شوند.
+_TRANSLATION = {
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+}
+_TRANSLATION.update({chr(0x06F0 + i): str(i) for i in range(10)})  # ۰ تا ۹
+_TRANSLATION.update({chr(0x0660 + i): str(i) for i in range(10)})  # ٠ تا ٩
+_REMOVED = [chr(c) for c in range(0x064B, 0x0660)] + ['\u0670', '\u0640', '\u200c', '\u200d']
+_TABLE = str.maketrans({**_TRANSLATION, **{ch: None for ch in _REMOVED}})
+
+# یک «کلمه» در متن اصلی: حروف و ارقام، به همراه اعراب و نیم‌فاصله که جزئی از کلمه‌اند
+TOKEN_RE = re.compile(r'[\w\u0640\u064B-\u065F\u0670\u200c\u200d]+')
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+
+# وزن کلمات عنوان نسبت به کلمات متن مقاله
+TITLE_WEIGHT = 3
+
+STOPWORDS = frozenset("""
+و در به از که این را با است برای آن یک تا ها های می هم بر یا شد شده بود کرد
+نیز اما اگر هر پس ما من شما او آنها خود دیگر باید بین روی چه همه نه
+the a an and of to in is are for on with by or
+""".split())
+
+
+def normalize(text):
+    """
+    متن را نرمال می‌کند: یکسان‌سازی ی/ک، حذف اعراب و نیم‌فاصله و کوچک کردن حروف لاتین.
+    """
+    return text.translate(_TABLE).lower()
+
+
+def iter_tokens(text):
+    """
+    برای هر کلمه متن، سه‌تایی (شکل نرمال، شروع، پایان) را در متن اصلی برمی‌گرداند.
+    کلمات توقف و کلمات خیلی کوتاه یا خیلی بلند کنار گذاشته می‌شوند.
+    """
+    for match in TOKEN_RE.finditer(text):
+        token = normalize(match.group())
+        if MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH and token not in STOPWORDS:
+            yield token, match.start(), match.end()
+
+
+def tokenize(text):
+    """
+    لیست کلمات نرمال‌شده یک متن.
+    """
+    return [token for token, _, _ in iter_tokens(text)]
+
+
+def html_to_text(body):
+    """
+    تگ‌های HTML را حذف و موجودیت‌هایی مثل &nbsp; را به متن تبدیل می‌کند.
+    بعد از هر تگ یک فاصله گذاشته می‌شود تا کلمات دو پاراگراف به هم نچسبند.
+    """
+    return html.unescape(strip_tags(body.replace('>', '> ')))
+
+
+def analyze(title, body):
+    """
+    تعداد تکرار هر کلمه در مقاله (با وزن بیشتر برای عنوان) و طول سند را برمی‌گرداند.
+    """
+    counts = Counter(tokenize(html_to_text(body)))
+    for token in tokenize(title):
+        counts[token] += TITLE_WEIGHT
+    return counts, sum(counts.values())
@@ -0,0 +1,272 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import Profile
+from standblog.images import track_image_derivatives
+
+from .article_cache import delete_articles
+from .cache import bump_version
+from .models import Article, Category, Comment, Like
+from .page_cache import article_key, category_key, user_key
+from .search import index_article, remove_article
+from .sitemaps import SITEMAP_VERSION, page_number, page_version
+
+# فیلدهایی که در سایدبار (آخرین مقالات) نمایش داده می‌شوند یا روی آن اثر دارند
+SIDEBAR_FIELDS = ('title', 'slug', 'status', 'created')
+# فیلدهایی که تعیین می‌کنند مقاله در کدام لیست‌ها و با چه ترتیبی نمایش داده شود
+LISTING_FIELDS = ('status', 'created')
+
+
+# ==================================
+# بی‌اعتبار کردن کش سایدبار
+# ==================================
+@receiver(post_save, sender=Article)
+def invalidate_sidebar_on_article_save(sender, instance, created, **kwargs):
+    """
+    فقط وقتی مقاله جدید است یا فیلدهای نمایش داده شده در سایدبار تغییر کرده‌اند،
+    نسخه کش سایدبار بالا می‌رود (مثلا ویرایش متن مقاله روی سایدبار اثری ندارد).
+    """
+    if created or instance.has_changed(*SIDEBAR_FIELDS):
+        bump_version('sidebar')
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Article.category.through)
+def invalidate_sidebar(sender, **kwargs):
+    """
+    با حذف مقاله، تغییر دسته‌بندی‌ها یا ارتباط بین آن‌ها، نسخه کش سایدبار بالا می‌رود.
+    """
+    bump_version('sidebar')
+
+
+# ==================================
+# پاک کردن کش صفحات (surrogate keys)
+# ==================================
+@receiver(post_save, sender=Article)
+def purge_article_pages(sender, instance, created, **kwargs):
+    """
+    صفحه مقاله و صفحاتی که کارت آن را نمایش می‌دهند بی‌اعتبار می‌شوند.
+    اگر مقاله به لیست‌ها اضافه یا از آن‌ها خارج شده باشد، صفحه اصلی و لیست‌ها هم بی‌اعتبار می‌شوند.
+    """
+    keys = [article_key(instance)]
+    if created or instance.has_changed(*LISTING_FIELDS):
+        keys += ['home', 'articles']
+        keys += [category_key(pk) for pk in instance.category.values_list('pk', flat=True)]
+    bump_version(*keys)
+
+
+@receiver(pre_delete, sender=Article)
+def remember_article_categories(sender, instance, **kwargs):
+    # بعد از حذف، ارتباط با دسته‌بندی‌ها دیگر در دیتابیس نیست
+    instance._deleted_category_ids = list(instance.category.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Article)
+def purge_deleted_article_pages(sender, instance, **kwargs):
+    keys = [article_key(instance), 'home', 'articles']
+    keys += [category_key(pk) for pk in getattr(instance, '_deleted_category_ids', ())]
+    bump_version(*keys)
+
+
+@receiver(m2m_changed, sender=Article.category.through)
+def purge_category_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    با اضافه یا حذف شدن دسته‌بندی یک مقاله، صفحه مقاله و صفحه دسته‌بندی‌های مربوطه بی‌اعتبار می‌شوند.
+    """
+    if action == 'pre_clear':
+        # بعد از clear دیگر نمی‌دانیم چه ارتباط‌هایی وجود داشت
+        related = instance.articles if reverse else instance.category
+        instance._cleared_pks = set(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        # category.articles.add(...): instance یک دسته‌بندی و pk_set شناسه مقالات است
+        article_pks = set(pk_set)
+        keys = [category_key(instance)] + [f'article:{pk}' for pk in pk_set]
+    else:
+        article_pks = {instance.pk}
+        keys = [article_key(instance)] + [category_key(pk) for pk in pk_set]
+    bump_version(*keys)
+    # کلید کش قطعه‌های مقاله (blog.cache.fragment_key) بر اساس updated است؛
+    # دسته‌بندی‌ها هم بخشی از محتوای مقاله‌اند، پس زمان ویرایش جلو می‌رود
+    if article_pks:
+        Article.objects.filter(pk__in=article_pks).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_page(sender, instance, **kwargs):
+    # نسخه categories در کلید همه قطعه‌های مقالات هست (عنوان دسته‌بندی در همه کارت‌ها نمایش داده می‌شود)
+    bump_version(category_key(instance), 'categories')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def purge_article_pages_on_interaction(sender, instance, **kwargs):
+    """
+    نظرات و لایک‌ها فقط روی صفحه مقاله و کارت‌های همان مقاله اثر دارند.
+    """
+    bump_version(f'article:{instance.article_id}')
+
+
+# ==================================
+# شمارنده‌های نظر مقاله (comment_count و active_comment_count)
+# ==================================
+def _count_comments(article_id, total, active):
+    # Greatest: اگر شمارنده قبلا از واقعیت کمتر شده باشد، منفی نشود (reconcile_counters اصلاحش می‌کند)
+    Article.objects.filter(pk=article_id).update(
+        comment_count=Greatest(F('comment_count') + total, 0),
+        active_comment_count=Greatest(F('active_comment_count') + active, 0),
+    )
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    """
+    نظر جدید هر دو شمارنده را زیاد می‌کند؛ تایید یا رد نظر در ادمین فقط شمارنده نظرات فعال را.
+    """
+    if raw:
+        return
+    if created:
+        _count_comments(instance.article_id, 1, int(instance.is_active))
+    elif instance.has_changed('is_active'):
+        _count_comments(instance.article_id, 0, 1 if instance.is_active else -1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """
+    برای هر نظر حذف شده اجرا می‌شود، از جمله پاسخ‌هایی که همراه نظر والد (cascade) حذف می‌شوند.
+    """
+    _count_comments(instance.article_id, -1, -int(instance.is_active))
+
+
+# ==================================
+# به‌روزرسانی نمایه جستجو
+# ==================================
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """
+    بعد از هر ذخیره، نمایه جستجوی مقاله به صورت افزایشی به‌روز می‌شود.
+    """
+    if not raw:  # هنگام loaddata کاری نمی‌کنیم؛ بعدا rebuild_search_index اجرا شود
+        index_article(instance)
+        # صفحات کش‌شده نتایج جستجو (و ETag آن‌ها) به کل نمایه وابسته‌اند
+        bump_version('search')
+
+
+@receiver(pre_delete, sender=Article)
+def remove_from_search_index(sender, instance, **kwargs):
+    """
+    قبل از حذف مقاله، df کلمات آن در نمایه کم می‌شود.
+    """
+    remove_article(instance)
+    bump_version('search')
+
+
+# ==================================
+# پاک کردن مقاله از کش مقالات (article_cache)
+# ==================================
+@receiver(post_save, sender=Article)
+def invalidate_cached_article(sender, instance, **kwargs):
+    """
+    هر ذخیره (از جمله انتشار یا برگشت به پیش‌نویس) کلید اسلاگ را پاک می‌کند؛ اگر اسلاگ
+    عوض شده باشد، کلید اسلاگ قبلی هم. «پیدا نشد» کش‌شده برای اسلاگ مقاله جدید هم پاک می‌شود.
+    """
+    # _loaded_values تا بعد از post_save مقادیر قبل از ذخیره را دارد
+    delete_articles(instance.slug, getattr(instance, '_loaded_values', {}).get('slug'))
+
+
+@receiver(post_delete, sender=Article)
+def invalidate_deleted_cached_article(sender, instance, **kwargs):
+    delete_articles(instance.slug)
+
+
+# ==================================
+# بی‌اعتبار کردن کش فیدهای RSS و Atom
+# ==================================
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Article.category.through)
+def invalidate_feeds(sender, **kwargs):
+    """
+    فیدها عنوان، خلاصه، تاریخ‌ها و دسته‌بندی‌های مقالات را دارند؛ با هر تغییر مقاله یا
+    دسته‌بندی نسخه کش همه فیدها بالا می‌رود.
+    """
+    bump_version('feeds')
+
+
+# ==================================
+# بی‌اعتبار کردن صفحات نقشه سایت
+# ==================================
+def _sitemap_versions(article_pks=(), category_pks=()):
+    # lastmod دسته‌بندی‌ها از زمان ویرایش مقالات آن‌هاست، پس تغییر مقاله صفحه دسته‌بندی‌هایش را هم عوض می‌کند
+    return [
+        SITEMAP_VERSION,
+        *{page_version('articles', page_number(pk)) for pk in article_pks},
+        *{page_version('categories', page_number(pk)) for pk in category_pks},
+    ]
+
+
+@receiver(post_save, sender=Article)
+def invalidate_article_sitemap(sender, instance, **kwargs):
+    """
+    با هر ذخیره، updated (و در نتیجه lastmod) عوض می‌شود؛ فقط صفحه‌های شامل این مقاله
+    و دسته‌بندی‌هایش و فهرست صفحات دوباره ساخته می‌شوند.
+    """
+    bump_version(*_sitemap_versions([instance.pk], instance.category.values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=Article)
+def invalidate_deleted_article_sitemap(sender, instance, **kwargs):
+    bump_version(*_sitemap_versions([instance.pk], getattr(instance, '_deleted_category_ids', ())))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_sitemap(sender, instance, **kwargs):
+    bump_version(*_sitemap_versions(category_pks=[instance.pk]))
+
+
+@receiver(m2m_changed, sender=Article.category.through)
+def invalidate_sitemap_on_category_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_clear':
+        # pk_set را purge_category_pages در pre_clear نگه داشته است
+        pk_set = getattr(instance, '_cleared_pks', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if reverse:
+        bump_version(*_sitemap_versions(pk_set, [instance.pk]))
+    else:
+        bump_version(*_sitemap_versions([instance.pk], pk_set))
+
+
+# ==================================
+# بی‌اعتبار کردن ETag صفحات کاربر (نام و تصویر در هدر)
+# ==================================
+@receiver(post_save, sender=Profile)
+def invalidate_user_pages(sender, instance, **kwargs):
+    """
+    با هر ذخیره User پروفایل هم ذخیره می‌شود (accounts.models.save_user_profile)،
+    پس تغییر نام، ایمیل یا تصویر پروفایل همه از همین‌جا نسخه user:<pk> را بالا می‌برند.
+    """
+    bump_version(user_key(instance.user_id))
+
+
+# ==================================
+# نسخه‌های کوچک‌شده تصویر شاخص
+# ==================================
+track_image_derivatives(Article)
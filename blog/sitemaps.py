@@ -0,0 +1,178 @@
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from django.db.models import F, Max, Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from .cache import versioned_key
+from .feeds import cache_stream
+from .models import Article, Category
+
+# ==================================
+# نقشه سایت (sitemap index و صفحات آن)
+# ==================================
+# به جای اینکه خزنده‌ها مقالات را از لیست‌های صفحه‌بندی شده (۳ مقاله در هر صفحه) پیدا کنند،
+# یک sitemap index فهرست صفحات نقشه سایت مقالات و دسته‌بندی‌ها را می‌دهد.
+# هر صفحه بازه ثابتی از شناسه‌ها (pk) را پوشش می‌دهد، پس حداکثر SITEMAP_PAGE_SIZE آدرس دارد
+# و ویرایش یک مقاله فقط صفحه همان بازه را عوض می‌کند. هر صفحه با کوئری‌های keyset
+# (pk > آخرین pk دسته قبلی) دسته‌دسته خوانده و تکه‌تکه فرستاده می‌شود و زیر نسخه خودش
+# (sitemap:<بخش>:<صفحه>) کش می‌شود؛ سیگنال‌ها فقط نسخه صفحه‌های تغییر کرده را بالا می‌برند.
+
+SITEMAP_PAGE_SIZE = 50_000  # حداکثر تعداد آدرس هر صفحه در پروتکل sitemap
+SITEMAP_BATCH_SIZE = 2000
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+SITEMAP_VERSION = 'sitemap'
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+SITEMAP_XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def page_number(pk):
+    """
+    شماره صفحه نقشه سایتی که شناسه pk در آن است.
+    """
+    return (pk - 1) // SITEMAP_PAGE_SIZE + 1
+
+
+def page_version(section, page):
+    """
+    نام نسخه کش یک صفحه نقشه سایت (برای versioned_key و bump_version).
+    """
+    return f'{SITEMAP_VERSION}:{section}:{page}'
+
+
+def keyset_batches(queryset, page, size=SITEMAP_BATCH_SIZE):
+    """
+    ردیف‌های (values_list با pk در اول) بازه یک صفحه را به ترتیب pk و دسته‌دسته برمی‌گرداند.
+    هر دسته یک کوئری جداست و هیچ‌وقت همه ردیف‌ها با هم در حافظه نیستند.
+    """
+    last_pk = (page - 1) * SITEMAP_PAGE_SIZE
+    queryset = queryset.filter(pk__lte=page * SITEMAP_PAGE_SIZE).order_by('pk')
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:size])
+        if not batch:
+            return
+        yield batch
+        if len(batch) < size:
+            return  # دسته ناقص یعنی بازه تمام شده و کوئری خالی بعدی لازم نیست
+        last_pk = batch[-1][0]
+
+
+def _page_expression():
+    # تقسیم صحیح (عدد صحیح بر عدد صحیح) در SQLite و PostgreSQL
+    return (F('pk') - 1) / SITEMAP_PAGE_SIZE + 1
+
+
+def _lastmod(value):
+    return f'<lastmod>{value.isoformat(timespec="seconds")}</lastmod>' if value else ''
+
+
+class ArticleSection:
+    """
+    صفحات نقشه سایت مقالات منتشر شده؛ lastmod زمان آخرین ویرایش مقاله (updated) است.
+    """
+    name = 'articles'
+
+    def get_queryset(self):
+        return Article.objects.published()
+
+    def pages(self):
+        rows = (
+            self.get_queryset().annotate(page=_page_expression())
+            .values('page').annotate(lastmod=Max('updated')).order_by('page')
+        )
+        return [(row['page'], row['lastmod']) for row in rows]
+
+    def rows(self):
+        return self.get_queryset().values_list('pk', 'slug', 'updated')
+
+    def item(self, row):
+        pk, slug, updated = row
+        return reverse('blog:article_detail', kwargs={'slug': slug}), updated
+
+
+class CategorySection:
+    """
+    صفحات نقشه سایت دسته‌بندی‌ها؛ lastmod آخرین ویرایش مقالات منتشر شده آن دسته‌بندی است
+    (برای دسته‌بندی بدون مقاله، زمان ساخت آن).
+    """
+    name = 'categories'
+    published = Q(articles__status='p')
+
+    def get_queryset(self):
+        return Category.objects.all()
+
+    def pages(self):
+        rows = (
+            self.get_queryset().annotate(page=_page_expression()).values('page')
+            .annotate(created=Max('created'), updated=Max('articles__updated', filter=self.published))
+            .order_by('page')
+        )
+        return [(row['page'], max(filter(None, (row['created'], row['updated'])))) for row in rows]
+
+    def rows(self):
+        return self.get_queryset().annotate(
+            updated=Max('articles__updated', filter=self.published),
+        ).values_list('pk', 'created', 'updated')
+
+    def item(self, row):
+        pk, created, updated = row
+        return reverse('blog:category_list', kwargs={'pk': pk}), updated or created
+
+
+SECTIONS = {section.name: section for section in (ArticleSection(), CategorySection())}
+
+
+def stream_page(section, page, base_url):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_XMLNS}">'.encode()
+    for batch in keyset_batches(section.rows(), page):
+        parts = []
+        for row in batch:
+            location, lastmod = section.item(row)
+            parts.append(f'<url><loc>{escape(base_url + location)}</loc>{_lastmod(lastmod)}</url>')
+        yield ''.join(parts).encode()
+    yield b'</urlset>\n'
+
+
+def render_index(request):
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_XMLNS}">']
+    for section in SECTIONS.values():
+        for page, lastmod in section.pages():
+            location = request.build_absolute_uri(reverse('sitemap_page', kwargs={'section': section.name, 'page': page}))
+            parts.append(f'<sitemap><loc>{escape(location)}</loc>{_lastmod(lastmod)}</sitemap>')
+    parts.append('</sitemapindex>\n')
+    return ''.join(parts).encode()
+
+
+def sitemap_index(request):
+    """
+    فهرست صفحات نقشه سایت با lastmod هر صفحه؛ برای هر بخش یک کوئری aggregate.
+    """
+    key = versioned_key(SITEMAP_VERSION, request.build_absolute_uri('/'))
+    content = cache.get(key)
+    if content is None:
+        content = render_index(request)
+        cache.set(key, content, SITEMAP_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type=SITEMAP_CONTENT_TYPE)
+
+
+def sitemap_page(request, section, page):
+    """
+    یک صفحه نقشه سایت: از کش، یا ساخته شده دسته‌به‌دسته و همزمان کش شده.
+    """
+    section = SECTIONS.get(section)
+    if section is None or page < 1:
+        raise Http404('صفحه نقشه سایت پیدا نشد.')
+    base_url = request.build_absolute_uri('/')[:-1]
+    key = versioned_key(page_version(section.name, page), base_url)
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content, content_type=SITEMAP_CONTENT_TYPE)
+
+    lower, upper = (page - 1) * SITEMAP_PAGE_SIZE, page * SITEMAP_PAGE_SIZE
+    if not section.get_queryset().filter(pk__gt=lower, pk__lte=upper).exists():
+        raise Http404('صفحه نقشه سایت پیدا نشد.')
+    return StreamingHttpResponse(
+        cache_stream(stream_page(section, page, base_url), key, SITEMAP_CACHE_TIMEOUT),
+        content_type=SITEMAP_CONTENT_TYPE,
+    )
@@ -0,0 +1,28 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from standblog.assets import bundle_available, bundle_path, bundle_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset_bundle(name):
+    """
+    تگ‌های link یا script یک bundle از ASSET_BUNDLES:
+
+        {% load blog_assets %}
+        {% asset_bundle "site.css" %}
+
+    وقتی ASSET_BUNDLES_ENABLED فعال است و bundle با build_assets ساخته شده، فقط یک فایل
+    (با نام هش‌دار و نسخه‌های فشرده whitenoise) لینک می‌شود؛ در غیر این صورت فایل‌های منبع جداگانه.
+    """
+    if settings.ASSET_BUNDLES_ENABLED and bundle_available(name):
+        urls = [static(bundle_path(name))]
+    else:
+        urls = [static(path) for path in bundle_sources(name)]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in urls))
+    return format_html_join('\n', '<script src="{}"></script>', ((url,) for url in urls))
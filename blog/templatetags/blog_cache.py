@@ -0,0 +1,61 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from blog.cache import fragment_key
+from standblog.routers import served_by_replica
+
+register = template.Library()
+
+# قطعه‌ها زمان نسبی (مثلا «۵ دقیقه پیش») هم دارند؛ این زمان حداکثر کهنگی آن‌هاست
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 10)
+
+
+class ArticleCacheNode(template.Node):
+    def __init__(self, nodelist, name, article, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.article = article
+        self.vary_on = vary_on
+
+    def render(self, context):
+        article = self.article.resolve(context)
+        if article is None or article.pk is None:
+            return self.nodelist.render(context)
+        key = fragment_key(
+            self.name.resolve(context), article, *(var.resolve(context) for var in self.vary_on)
+        )
+        content = cache.get(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            # داده عقب‌مانده replica نباید زیر کلید فعلی کش شود
+            if not served_by_replica():
+                cache.set(key, content, FRAGMENT_CACHE_TIMEOUT)
+        return content
+
+
+@register.tag('article_cache')
+def do_article_cache(parser, token):
+    """
+    بخشی از تمپلیت را که فقط به یک مقاله وابسته است کش می‌کند:
+
+        {% load blog_cache %}
+        {% article_cache "body" article article.comment_count %}
+            ...
+        {% endarticle_cache %}
+
+    کلید کش از نام قطعه، شناسه و زمان ویرایش مقاله و مقادیر اضافه بعد از آن ساخته می‌شود
+    (blog.cache.fragment_key). چیزهایی که برای هر کاربر فرق می‌کنند (وضعیت لایک،
+    فرم نظر، توکن CSRF) نباید داخل این بلاک قرار بگیرند.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' حداقل به نام قطعه و مقاله نیاز دارد.")
+    nodelist = parser.parse(('endarticle_cache',))
+    parser.delete_first_token()
+    return ArticleCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
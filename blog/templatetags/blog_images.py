@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(obj, sizes='100vw', alt='', src_width=None, **attrs):
+    """
+    تصویر مدل‌هایی که ImageDerivativesMixin دارند را با srcset نمایش می‌دهد:
+
+        {% load blog_images %}
+        {% responsive_image article sizes="(max-width: 991px) 100vw, 360px" alt=article.title %}
+
+    مرورگر از بین نسخه‌های WebP (و در صورت پشتیبانی نکردن، فرمت اصلی) کوچک‌ترین نسخه‌ای را
+    دانلود می‌کند که برای اندازه نمایش کافی است. src_width نسخه پیش‌فرض src را تعیین می‌کند.
+    ویژگی‌های دیگر (مثلا class یا loading) همان‌طور روی تگ img قرار می‌گیرند؛
+    پیش‌فرض loading="lazy" است.
+    """
+    if not obj.image:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    srcset = obj.image_srcset()
+    if not srcset:
+        # نسخه‌ها هنوز ساخته نشده‌اند
+        return format_html('<img src="{}" alt="{}"{}>', obj.image.url, alt, extra)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        obj.image_srcset(webp=True), sizes,
+        obj.image_url(src_width), srcset, sizes, alt, extra,
+    )
@@ -1,3 +1,1559 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.contrib.messages import constants as message_constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import Http404, HttpRequest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+
+from . import article_cache, likes, urls as blog_urls, views
+from .cache import bump_version, find_version, fragment_key, get_version, get_versions
+from .context_processors import get_sidebar_payload, sidebar_data
+from .feeds import FEED_ITEMS
+from .management.commands.explain_hot_queries import hot_queries
+from .management.commands.benchmark_routes import Command as BenchmarkCommand, percentile
+from .models import Article, Category, Comment, Like, SearchDocument, SearchPosting, SearchTerm
+from .page_cache import SurrogateKeysMixin, article_key
+from .pagination import (
+    CappedPaginator, apaginate, cursor_page, cursor_queryset, decode_cursor, encode_cursor, page_links,
+)
+from .sanitizer import make_excerpt, sanitize_html
+from .search import analyze, normalize, search, tokenize
+from .search.engine import PREFIX_WEIGHT
+from .search.text import TITLE_WEIGHT, html_to_text
+from .sitemaps import SITEMAP_PAGE_SIZE, keyset_batches, page_number
+
+# کش‌های جدا برای تست‌ها (در حالت عادی، بدون DEBUG، کش فایلی داخل پروژه استفاده می‌شود)
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'state': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-state'},
+}
+
+
+# فایل manifest فایل‌های استاتیک فقط با collectstatic ساخته می‌شود
+TEST_STORAGES = {**settings.STORAGES, 'staticfiles': {
+    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+}}
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+class BlogDataMixin:
+    """
+    چند دسته‌بندی و مقاله منتشر شده با نظر و لایک، مشترک بین تست‌ها.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pw')
+        cls.author = User.objects.create_user('author', first_name='علی', last_name='رضایی')
+        cls.categories = [Category.objects.create(title=f'دسته {i}') for i in range(3)]
+        cls.articles = []
+        for i in range(8):
+            article = Article.objects.create(
+                title=f'مقاله شماره {i}', body=f'<p>متن مقاله {i} درباره کتاب و برنامه‌نویسی</p>',
+                author=cls.author, status='p',
+            )
+            article.category.set(cls.categories[:1 + i % 3])
+            Comment.objects.create(article=article, user=cls.user, body='نظر اول')
+            Like.toggle(cls.user, article)
+            cls.articles.append(article)
+        Article.objects.create(title='پیش‌نویس', body='<p>منتشر نشده</p>', author=cls.author)
+        cls.article = cls.articles[0]
+
+    def setUp(self):
+        clear_caches()
+
+
+# ==================================
+# شمارنده‌های ذخیره‌شده نظرها و دستور reconcile_counters
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class CounterTests(BlogDataMixin, TestCase):
+
+    def counts(self, article=None):
+        article = article or self.article
+        article.refresh_from_db()
+        return article.comment_count, article.active_comment_count
+
+    def test_comment_save_and_delete_update_counters(self):
+        self.assertEqual(self.counts(), (1, 1))
+        comment = Comment.objects.create(article=self.article, user=self.user, body='در انتظار تایید', is_active=False)
+        self.assertEqual(self.counts(), (2, 1))
+
+        # مثل فرم ادمین: نظر از دیتابیس خوانده و تایید می‌شود؛ ذخیره دوباره چیزی را عوض نمی‌کند
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.is_active = True
+        comment.save()
+        comment.save()
+        self.assertEqual(self.counts(), (2, 2))
+
+        comment.delete()
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_cascade_delete_counts_replies(self):
+        root = Comment.objects.create(article=self.article, user=self.user, body='ریشه')
+        reply = Comment.objects.create(article=self.article, user=self.user, body='پاسخ', parent=root)
+        Comment.objects.create(article=self.article, user=self.user, body='پاسخ دوم', parent=reply, is_active=False)
+        self.assertEqual(self.counts(), (4, 3))
+        root.delete()
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_add_comment_counts_once(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('blog:add_comment', kwargs={'slug': self.article.slug}), {'body': 'از فرم'})
+        self.assertEqual(self.counts(), (2, 2))
+
+    def test_reconcile_counters(self):
+        # تغییرهای بدون سیگنال
+        Article.objects.filter(pk=self.article.pk).update(like_count=5, comment_count=0)
+        Comment.objects.filter(article=self.articles[1]).update(is_active=False)
+
+        output = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=output)
+        self.assertIn('2 مقاله اختلاف دارد', output.getvalue())
+        self.assertEqual(self.counts(), (0, 1))
+
+        output = StringIO()
+        call_command('reconcile_counters', stdout=output)
+        self.assertIn('2 مقاله اصلاح شد', output.getvalue())
+        self.assertEqual(self.counts(), (1, 1))
+        self.assertEqual(self.article.like_count, 1)
+        self.assertEqual(self.counts(self.articles[1]), (1, 0))
+
+        output = StringIO()
+        call_command('reconcile_counters', stdout=output)
+        self.assertIn('0 مقاله اصلاح شد', output.getvalue())
+
+
+# ==================================
+# درخت نظرات (مسیر درختی، tree و subtree)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class CommentTreeTests(BlogDataMixin, TestCase):
+
+    def reply(self, parent=None, body='پاسخ'):
+        return Comment.objects.create(article=self.article, user=self.user, parent=parent, body=body)
+
+    def test_path_and_depth(self):
+        root = self.reply()
+        child = self.reply(root)
+        grandchild = self.reply(child)
+        self.assertEqual((root.depth, child.depth, grandchild.depth), (0, 1, 2))
+        self.assertEqual(grandchild.path, f'{root.pk:010d}/{child.pk:010d}/{grandchild.pk:010d}/')
+        grandchild.refresh_from_db()
+        self.assertEqual((grandchild.path, grandchild.depth), (f'{child.path}{grandchild.pk:010d}/', 2))
+
+    def test_subtree(self):
+        root = self.reply()
+        first = self.reply(root)
+        other = self.reply()
+        nested = self.reply(first)
+        second = self.reply(root)
+        self.assertEqual(list(root.subtree()), [root, first, nested, second])
+        self.assertEqual(list(other.subtree()), [other])
+
+    def test_tree(self):
+        root = self.reply(body='ریشه')
+        child = self.reply(root)
+        self.reply(child)
+        with self.assertNumQueries(1):
+            roots = Comment.objects.filter(article=self.article).order_by('created_at').tree()
+            self.assertEqual([comment.body for comment in roots], ['نظر اول', 'ریشه'])
+            self.assertEqual(roots[1].children, [child])
+            self.assertEqual(len(roots[1].children[0].children), 1)
+            self.assertEqual(roots[1].children[0].children[0].user, self.user)
+
+    def test_deep_replies_are_capped(self):
+        comment = self.reply()
+        for _ in range(Comment.MAX_DEPTH):
+            comment = self.reply(comment)
+        self.assertEqual(comment.depth, Comment.MAX_DEPTH)
+        deepest = comment
+
+        comment = self.reply(deepest)
+        self.assertEqual(comment.depth, Comment.MAX_DEPTH)
+        self.assertEqual(comment.parent_id, deepest.parent_id)
+        self.assertEqual(comment.path, f'{deepest.path[:-Comment.PATH_STEP]}{comment.pk:010d}/')
+        self.assertLessEqual(len(comment.path), Comment._meta.get_field('path').max_length)
+
+    def test_add_comment_reply(self):
+        root = self.reply()
+        self.client.force_login(self.user)
+        url = reverse('blog:add_comment', kwargs={'slug': self.article.slug})
+        self.client.post(url, {'body': 'پاسخ از فرم', 'parent_id': root.pk})
+        reply = Comment.objects.get(body='پاسخ از فرم')
+        self.assertEqual((reply.parent, reply.depth), (root, 1))
+
+        # والدی از مقاله دیگر پذیرفته نمی‌شود؛ نظر ریشه ثبت می‌شود
+        other = Comment.objects.filter(article=self.articles[1]).get()
+        self.client.post(url, {'body': 'والد نامعتبر', 'parent_id': other.pk})
+        self.assertEqual(Comment.objects.get(body='والد نامعتبر').depth, 0)
+
+
+# ==================================
+# سایدبار (یک مدخل کش نسخه‌دار و مقادیر تنبل)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class SidebarTests(BlogDataMixin, TestCase):
+
+    def test_payload_is_cached(self):
+        with self.assertNumQueries(2):
+            payload = get_sidebar_payload()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_sidebar_payload()['recent_posts'], payload['recent_posts'])
+
+        self.assertEqual(payload['recent_posts'], self.articles[:-6:-1])
+        counts = {category.title: category.num_articles for category in payload['all_categories']}
+        # پیش‌نویس‌ها شمرده نمی‌شوند
+        self.assertEqual(counts, {'دسته 0': 8, 'دسته 1': 5, 'دسته 2': 2})
+
+    def test_new_article_invalidates_payload(self):
+        get_sidebar_payload()
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title='تازه', body='<p>متن</p>', author=self.author, status='p')
+        self.assertEqual(get_sidebar_payload()['recent_posts'][0], article)
+
+    def test_body_edit_keeps_payload(self):
+        version = get_version('sidebar')
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.get(pk=self.article.pk)
+            article.body = '<p>متن جدید</p>'
+            article.save()
+        self.assertEqual(get_version('sidebar'), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.title = 'عنوان جدید'
+            article.save()
+        self.assertNotEqual(get_version('sidebar'), version)
+
+    def test_context_is_lazy(self):
+        with self.assertNumQueries(0):
+            context = sidebar_data(RequestFactory().get('/'))
+        with self.assertNumQueries(2):
+            self.assertEqual(len(context['recent_posts']), 5)
+            self.assertEqual(len(context['all_categories']), 3)
+
+
+# ==================================
+# کارت مقالات (Article.objects.cards)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class ArticleCardsTests(BlogDataMixin, TestCase):
+
+    def test_cards_load_everything_in_two_queries(self):
+        with self.assertNumQueries(2):
+            cards = list(Article.objects.published().cards())
+            for article in cards:
+                article.author.get_full_name()
+                [category.title for category in article.category.all()]
+                article.comment_count
+        self.assertEqual(len(cards), 8)
+        self.assertEqual(cards[0].author.get_full_name(), 'علی رضایی')
+
+    def test_cards_defer_bodies(self):
+        article = Article.objects.cards().get(pk=self.article.pk)
+        self.assertEqual(article.get_deferred_fields(), {'body', 'body_html'})
+        self.assertTrue(article.excerpt)
+        article = Article.objects.cards(content='body_html').get(pk=self.article.pk)
+        self.assertEqual(article.get_deferred_fields(), {'body'})
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        queries = {}
+        for page in (1, 3):
+            clear_caches()
+            response = self.client.get(reverse('blog:articles_list'), {'page': page})
+            queries[len(response.context['articles'])] = response.request_stats.queries
+        self.assertEqual(queries[3], queries[2])
+
+
+# ==================================
+# بودجه کوئری ویوها (QUERY_BUDGETS)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class QueryBudgetTests(BlogDataMixin, TestCase):
+    """
+    هر ویوی بودجه‌دار با کش سرد و با سایدبار گرم، برای بازدیدکننده ناشناس و کاربر واردشده
+    (که کش صفحات را دور می‌زند) حداکثر به اندازه بودجه‌اش کوئری اجرا می‌کند.
+    """
+
+    def routes(self):
+        slug = self.article.slug
+        return [
+            ('blog:articles_list', 'get', reverse('blog:articles_list'), {}),
+            ('blog:articles_list', 'get', reverse('blog:articles_list'), {'page': 2}),
+            ('blog:article_detail', 'get', reverse('blog:article_detail', kwargs={'slug': slug}), {}),
+            ('blog:category_list', 'get', reverse('blog:category_list', kwargs={'pk': self.categories[0].pk}), {}),
+            ('blog:search', 'get', reverse('blog:search'), {'q': 'کتاب'}),
+            ('blog:toggle_like', 'post', reverse('blog:toggle_like', kwargs={'slug': slug}), {}),
+        ]
+
+    def assert_within_budget(self, view_name, response):
+        budget = settings.QUERY_BUDGETS[view_name]
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(
+            response.request_stats.queries, budget,
+            f'{view_name}: {response.request_stats.queries} کوئری (بودجه: {budget})',
+        )
+
+    def test_routes_within_budget(self):
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.force_login(self.user)
+            for view_name, method, url, data in self.routes():
+                if method == 'post' and not logged_in:
+                    continue
+                for warm_sidebar in (False, True):
+                    with self.subTest(view=view_name, data=data, logged_in=logged_in, warm_sidebar=warm_sidebar):
+                        clear_caches()
+                        if warm_sidebar:
+                            get_sidebar_payload()
+                        response = getattr(self.client, method)(url, data)
+                        self.assert_within_budget(view_name, response)
+
+    def test_every_blog_budget_is_covered(self):
+        covered = {view_name for view_name, *_ in self.routes()}
+        budgets = {name for name in settings.QUERY_BUDGETS if name.startswith('blog:')}
+        self.assertEqual(budgets, covered)
+
+
+# ==================================
+# ایندکس‌های کوئری‌های پرتکرار و دستور explain_hot_queries
+# ==================================
+@override_settings(CACHES=TEST_CACHES)
+class HotQueryIndexTests(BlogDataMixin, TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        output = StringIO()
+        call_command('explain_hot_queries', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len([line for line in lines if line.startswith(('✓', '✗'))]), len(hot_queries(self.article, self.user)))
+        # روی جدول‌های خیلی کوچک انتخاب planner به آمار بستگی دارد (مثلا لیست دسته‌بندی)؛ این‌ها
+        # فقط به ایندکس‌های 0010 و 0013 و ایندکس‌های یکتا وابسته‌اند
+        for name in (
+            'لیست مقالات (صفحه اول)', 'لیست مقالات (کرسر)', 'سایدبار: آخرین مقالات', 'صفحه مقاله',
+            'ETag صفحه مقاله', 'درخت نظرات', 'زیرشاخه نظر', 'لایک کاربر',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(f'✓ {name}', lines)
+
+    def test_published_list_uses_partial_index(self):
+        plan = Article.objects.published().cards().order_by('-created', '-pk')[:3].explain()
+        self.assertIn('blog_article_published_idx', plan)
+        self.assertIn('blog_comment_article_idx', self.article.comments.select_related('user').explain())
+
+    def test_scans_and_sorts_are_reported(self):
+        slow = [('بدون ایندکس', Article.objects.filter(body='x').order_by('-comment_count'))]
+        output = StringIO()
+        with mock.patch('blog.management.commands.explain_hot_queries.hot_queries', return_value=slow):
+            with self.assertRaisesMessage(CommandError, '1 کوئری'):
+                call_command('explain_hot_queries', '--strict', stdout=output)
+        self.assertIn('✗ بدون ایندکس (scan: blog_article; sort)', output.getvalue())
+
+
+# ==================================
+# دستور benchmark_routes
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class BenchmarkRoutesTests(BlogDataMixin, TestCase):
+    """
+    مقایسه نتایج با مبنا (Command.compare) و اجرای کامل دستور روی داده آزمایشی.
+    """
+
+    def result(self, **overrides):
+        return {'status': 200, 'queries': 5, 'cold_queries': 8, 'p50_ms': 4.0, 'p95_ms': 10.0, 'p99_ms': 12.0, **overrides}
+
+    def compare(self, result, expected, tolerance=0.5, timings=True):
+        local = {'blog:search': expected} if timings else {}
+        return BenchmarkCommand.compare({'blog:search': result}, {'blog:search': expected}, local, tolerance)
+
+    def test_compare_identical_results(self):
+        self.assertEqual(self.compare(self.result(), self.result()), [])
+
+    def test_compare_reports_status_change(self):
+        regressions = self.compare(self.result(status=500), self.result())
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('200 -> 500', regressions[0])
+
+    def test_compare_reports_only_more_queries(self):
+        self.assertEqual(self.compare(self.result(queries=4, cold_queries=7), self.result()), [])
+        regressions = self.compare(self.result(queries=6, cold_queries=9), self.result())
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('queries 5 -> 6', regressions[0])
+        self.assertIn('cold_queries 8 -> 9', regressions[1])
+
+    def test_compare_p95_tolerance(self):
+        # مجاز: 10 * 1.5 + 1 = 16 میلی‌ثانیه
+        self.assertEqual(self.compare(self.result(p95_ms=16.0), self.result()), [])
+        regressions = self.compare(self.result(p95_ms=16.1), self.result())
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('p95', regressions[0])
+        self.assertEqual(self.compare(self.result(p95_ms=16.1), self.result(), tolerance=1), [])
+
+    def test_compare_without_local_timings(self):
+        # بدون فایل زمان‌های محلی فقط کد وضعیت و تعداد کوئری‌ها مقایسه می‌شوند
+        self.assertEqual(self.compare(self.result(p95_ms=100.0), self.result(), timings=False), [])
+        self.assertEqual(len(self.compare(self.result(queries=6), self.result(), timings=False)), 1)
+
+    def test_compare_ignores_routes_missing_from_baseline(self):
+        self.assertEqual(BenchmarkCommand.compare({'blog:search': self.result(status=500)}, {}, {}, 0.5), [])
+
+    def test_compare_accepts_baseline_without_cold_queries(self):
+        expected = self.result()
+        del expected['cold_queries']
+        self.assertEqual(self.compare(self.result(cold_queries=100), expected), [])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_update_baseline_then_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            timings_path = os.path.join(directory, 'timings.local.json')
+            options = ['--iterations', '1', '--baseline', path, '--timings', timings_path]
+            call_command('benchmark_routes', *options, '--update-baseline', stdout=StringIO())
+            with open(path, encoding='utf-8') as baseline_file:
+                results = json.load(baseline_file)['anonymous']
+            with open(timings_path, encoding='utf-8') as timings_file:
+                timings = json.load(timings_file)['anonymous']
+
+            # زمان‌ها فقط در فایل محلی هستند
+            self.assertEqual(set(results['blog:article_detail']), {'url', 'status', 'queries', 'cold_queries'})
+            self.assertEqual(set(timings['blog:article_detail']), {'p50_ms', 'p95_ms', 'p99_ms'})
+            self.assertNotIn('blog:toggle_like', results)
+            failing = {name: result['status'] for name, result in results.items() if result['status'] >= 500}
+            self.assertEqual(failing, {})
+
+            # همان داده و همان کدها؛ زمان‌ها با تحمل زیاد مقایسه می‌شوند
+            output = StringIO()
+            call_command('benchmark_routes', *options, '--tolerance', '100', stdout=output)
+            self.assertIn('پسرفتی وجود ندارد', output.getvalue())
+
+            os.remove(timings_path)
+            output = StringIO()
+            call_command('benchmark_routes', *options, stdout=output)
+            self.assertIn('زمان‌های محلی برای این حالت وجود ندارد', output.getvalue())
+            self.assertIn('پسرفتی وجود ندارد', output.getvalue())
+
+
+# ==================================
+# جستجو: نرمال‌سازی متن و رتبه‌بندی BM25
+# ==================================
+class SearchTextTests(SimpleTestCase):
+
+    def test_normalize_arabic_letters(self):
+        self.assertEqual(normalize('كتاب علي'), normalize('کتاب علی'))
+        self.assertEqual(normalize('مدرسة'), 'مدرسه')
+        self.assertEqual(normalize('أحمد إيران'), 'احمد ایران')
+
+    def test_normalize_digits(self):
+        self.assertEqual(normalize('۱۴۰۳'), '1403')
+        self.assertEqual(normalize('٢٠٢٤'), '2024')
+
+    def test_normalize_removes_diacritics_tatweel_and_zwnj(self):
+        self.assertEqual(normalize('کِتابْ'), 'کتاب')
+        self.assertEqual(normalize('کتـــاب'), 'کتاب')
+        self.assertEqual(normalize('می‌خواهم'), normalize('میخواهم'))
+        self.assertEqual(normalize('مي‌خواهم'), 'میخواهم')
+
+    def test_normalize_lowercases_latin(self):
+        self.assertEqual(normalize('Django'), 'django')
+
+    def test_tokenize_skips_stopwords_and_short_words(self):
+        self.assertEqual(tokenize('این کتاب و آن دفتر را با من a بده'), ['کتاب', 'دفتر', 'بده'])
+
+    def test_tokenize_keeps_zwnj_words_together(self):
+        self.assertEqual(tokenize('کتاب‌ها را می‌خوانم'), ['کتابها', 'میخوانم'])
+
+    def test_html_to_text_separates_paragraphs(self):
+        self.assertEqual(tokenize(html_to_text('<p>سلام</p><p>دنیا&nbsp;زیبا</p>')), ['سلام', 'دنیا', 'زیبا'])
+
+    def test_analyze_weights_title(self):
+        counts, length = analyze('کتاب', '<p>کتاب خوب</p>')
+        self.assertEqual(counts['کتاب'], 1 + TITLE_WEIGHT)
+        self.assertEqual(counts['خوب'], 1)
+        self.assertEqual(length, 2 + TITLE_WEIGHT)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, VERSION_CLOCK_SKEW=0)
+class ConditionalGetTests(BlogDataMixin, TestCase):
+    """
+    ETag و Last-Modified صفحات مقاله و لیست‌ها (blog.conditional).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = self.article.get_absolute_url()
+        self.login(self.user)  # صفحات کاربر واردشده از کش صفحات عبور می‌کنند
+
+    def login(self, user):
+        self.client.force_login(user)
+        # کوکی CSRF بخشی از ETag است و با ورود عوض می‌شود؛ ثابت می‌ماند تا فقط اثر کاربر دیده شود
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 32
+
+    def test_validator_headers(self):
+        category_url = reverse('blog:category_list', args=[self.categories[0].pk])
+        for url in (self.url, reverse('blog:articles_list'), category_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertIn('Last-Modified', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_matching_etag_or_date_gets_304_without_rendering(self):
+        # مقاله با نسخه‌هایی که در همان درخواست ساخته شده‌اند کش نمی‌شود
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        with self.assertNumQueries(2):  # نشست و کاربر؛ مقاله و نسخه‌ها از کش
+            not_modified = self.client.get(self.url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertIsNone(not_modified.context)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        since = self.client.get(self.url, headers={'if-modified-since': response['Last-Modified']})
+        self.assertEqual(since.status_code, 304)
+
+    def test_changes_produce_new_etag(self):
+        article_etag = self.client.get(self.url)['ETag']
+        list_url = reverse('blog:articles_list')
+        list_etag = self.client.get(list_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(article=self.article, user=self.user, body='نظر جدید')
+        response = self.client.get(self.url, headers={'if-none-match': article_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], article_etag)
+        # تعداد نظرات در کارت‌ها نمایش داده می‌شود
+        self.assertEqual(self.client.get(list_url, headers={'if-none-match': list_etag}).status_code, 200)
+
+    def test_etag_is_keyed_on_user_and_profile(self):
+        etag = self.client.get(self.url)['ETag']
+        self.login(self.author)
+        author_etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(author_etag, etag)
+        self.assertEqual(self.client.get(self.url)['ETag'], author_etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'رضا'
+            self.author.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], author_etag)
+
+    def test_etag_is_keyed_on_csrf_cookie(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 32
+        response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pending_messages_skip_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        # پیام در انتظار فقط با رندر صفحه نمایش داده می‌شود؛ 304 آن را گم می‌کرد
+        storage = CookieStorage(HttpRequest())
+        self.client.cookies['messages'] = storage._encode([Message(message_constants.INFO, 'پیام')])
+        response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'پیام')
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, VERSION_CLOCK_SKEW=0)
+class SearchViewTests(BlogDataMixin, TestCase):
+    """
+    صفحه نتایج جستجو مثل بقیه لیست‌ها ETag دارد و برای بازدیدکننده ناشناس کش می‌شود.
+    """
+
+    def get(self, **headers):
+        return self.client.get(reverse('blog:search'), {'q': 'کتاب'}, headers=headers)
+
+    def test_conditional_get(self):
+        response = self.get()
+        self.assertEqual(len(response.context['articles']), 3)
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+
+    def test_page_cache_follows_index(self):
+        self.get()  # نسخه‌های search و sidebar ساخته می‌شوند
+        first = self.get()
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+        # ویرایش مقاله‌ای که در صفحه اول نتایج نیست هم نمایه (و ترتیب نتایج) را عوض می‌کند
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.get(pk=self.articles[-1].pk)
+            article.body = '<p>کتاب کتاب کتاب</p>'
+            article.save()
+        response = self.get(if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.context['articles'][0], article)
+
+
+class SearchIndexMigrationTests(TransactionTestCase):
+    """
+    مهاجرت 0011 نمایه مقالات منتشر شده موجود را می‌سازد.
+    """
+    before = ('blog', '0010_comment_path')
+    after = ('blog', '0011_search_index')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('blog')[0])
+
+    def test_existing_articles_are_indexed(self):
+        apps = self.migrate(self.before)
+        author = apps.get_model('auth', 'User').objects.create(username='author')
+        Article = apps.get_model('blog', 'Article')
+        published = Article.objects.create(title='آموزش پایتون', body='<p>کتاب پایتون</p>', author=author, status='p', slug='a')
+        Article.objects.create(title='پیش‌نویس', body='<p>پایتون</p>', author=author, status='d', slug='b')
+
+        apps = self.migrate(self.after)
+        terms = dict(apps.get_model('blog', 'SearchTerm').objects.values_list('term', 'df'))
+        self.assertEqual(terms, {'آموزش': 1, 'پایتون': 1, 'کتاب': 1})
+        self.assertEqual(list(apps.get_model('blog', 'SearchDocument').objects.values_list('article', flat=True)), [published.pk])
+        self.assertEqual(search('پایتون').ranked[0][0], published.pk)
+
+
+class SearchRankingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+
+        def create(title, body, status='p'):
+            return Article.objects.create(title=title, body=f'<p>{body}</p>', author=cls.author, status=status)
+
+        cls.in_title = create('آموزش پایتون', 'مقدمه‌ای بر زبان برنامه‌نویسی')
+        cls.repeated = create('یادداشت اول', 'پایتون ساده است و پایتون محبوب است و پایتون رایگان است')
+        cls.once = create('یادداشت دوم', 'در این متن فقط یک بار از پایتون نام برده شده')
+        cls.prefix = create('یادداشت سوم', 'پایتونی‌ها دور هم جمع شدند')
+        cls.arabic = create('يادداشت عربی', 'كتابخانه ملی')
+        cls.draft = create('پیش‌نویس پایتون', 'پایتون پایتون پایتون', status='d')
+
+    def ranked_ids(self, query):
+        return [article_id for article_id, _ in search(query).ranked]
+
+    def test_ranking_order(self):
+        ids = self.ranked_ids('پایتون')
+        # عنوان وزن بیشتری دارد و تکرار بیشتر بهتر از یک بار است؛ «پایتونی‌ها» با پیشوند پیدا می‌شود
+        self.assertEqual(ids[:2], [self.in_title.pk, self.repeated.pk])
+        self.assertEqual(set(ids[2:]), {self.once.pk, self.prefix.pk})
+
+    def test_prefix_match_weighs_less_than_exact_match(self):
+        exact = search('پایتونیها').ranked
+        prefix = [score for article_id, score in search('پایتونی').ranked if article_id == self.prefix.pk]
+        self.assertEqual(exact[0][0], self.prefix.pk)
+        self.assertAlmostEqual(prefix[0], exact[0][1] * PREFIX_WEIGHT)
+
+    def test_drafts_are_not_indexed(self):
+        self.assertNotIn(self.draft.pk, self.ranked_ids('پایتون'))
+
+    def test_query_is_normalized(self):
+        self.assertEqual(self.ranked_ids('کتابخانه'), [self.arabic.pk])
+        self.assertEqual(self.ranked_ids('يادداشت'), self.ranked_ids('یادداشت'))
+
+    def test_prefix_needs_minimum_length(self):
+        self.assertEqual(self.ranked_ids('پا'), [])
+
+    def test_results_load_articles_with_snippet(self):
+        results = search('پایتون')
+        self.assertEqual(len(results), 4)
+        first = results[0]
+        self.assertEqual(first, self.in_title)
+        self.assertGreater(first.search_score, results[1].search_score)
+        self.assertIn('<mark>پایتون</mark> ساده است', results[1].search_snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.repeated.body = '<p>دیگر درباره جاوا است</p>'
+        self.repeated.save()
+        self.assertNotIn(self.repeated.pk, self.ranked_ids('پایتون'))
+        self.assertEqual(self.ranked_ids('جاوا'), [self.repeated.pk])
+
+        self.in_title.delete()
+        self.assertNotIn(self.in_title.pk, self.ranked_ids('پایتون'))
+        self.assertEqual(SearchTerm.objects.get(term='آموزش').df, 0)
+
+
+# ==================================
+# کش قطعه‌های تمپلیت ({% article_cache %} و fragment_key)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class FragmentCacheTests(BlogDataMixin, TestCase):
+    template = Template('{% load blog_cache %}{% article_cache "box" article extra %}{{ label }}{% endarticle_cache %}')
+
+    def render(self, article, label, extra=''):
+        return self.template.render(Context({'article': article, 'label': label, 'extra': extra}))
+
+    def test_key_changes_with_updated_categories_and_vary_on(self):
+        key = fragment_key('box', self.article, 1)
+        self.assertEqual(fragment_key('box', self.article, 1), key)
+        self.assertNotEqual(fragment_key('other', self.article, 1), key)
+        self.assertNotEqual(fragment_key('box', self.article, 2), key)
+        self.assertNotEqual(fragment_key('box', self.articles[1], 1), key)
+
+        edited = Article.objects.get(pk=self.article.pk)
+        edited.save()
+        self.assertNotEqual(fragment_key('box', edited, 1), key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('categories')
+        self.assertNotEqual(fragment_key('box', self.article, 1), key)
+
+    def test_tag_serves_stored_fragment(self):
+        self.assertEqual(self.render(self.article, 'اول'), 'اول')
+        self.assertEqual(self.render(self.article, 'دوم'), 'اول')
+        self.assertEqual(self.render(self.article, 'دوم', extra=1), 'دوم')
+        self.assertEqual(self.render(self.articles[1], 'سوم'), 'سوم')
+        # مقاله ذخیره نشده کش نمی‌شود
+        unsaved = Article(title='جدید', author=self.author)
+        self.render(unsaved, 'اول')
+        self.assertEqual(self.render(unsaved, 'دوم'), 'دوم')
+
+    def test_replica_reads_are_not_stored(self):
+        with mock.patch('blog.templatetags.blog_cache.served_by_replica', return_value=True):
+            self.assertEqual(self.render(self.article, 'از replica'), 'از replica')
+        self.assertEqual(self.render(self.article, 'از دیتابیس اصلی'), 'از دیتابیس اصلی')
+        self.assertEqual(self.render(self.article, 'بعدی'), 'از دیتابیس اصلی')
+
+    def test_edit_invalidates_article_fragments(self):
+        # کاربر واردشده از کش صفحات عبور می‌کند؛ فقط کش قطعه‌ها در کار است
+        self.client.force_login(self.user)
+        url = self.article.get_absolute_url()
+        self.assertContains(self.client.get(url), 'متن مقاله 0')
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.get(pk=self.article.pk)
+            article.body = '<p>متن ویرایش‌شده</p>'
+            article.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'متن ویرایش‌شده')
+        self.assertNotContains(response, 'متن مقاله 0')
+
+    def test_per_user_content_is_not_shared(self):
+        url = self.article.get_absolute_url()
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(url), 'fa fa-heart"')
+        self.client.force_login(self.author)
+        response = self.client.get(url)
+        self.assertContains(response, 'fa fa-heart-o"')
+        self.assertNotContains(response, 'fa fa-heart"')
+        self.assertContains(response, f'data-csrf="{response.context["csrf_token"]}"')
+
+
+# ==================================
+# پاک‌سازی HTML متن مقاله، خلاصه و دستور render_article_bodies
+# ==================================
+class SanitizerTests(SimpleTestCase):
+
+    def test_script_and_style_are_removed_with_content(self):
+        html = sanitize_html('<p>الف<script>alert(1)</script><style>p{}</style><iframe src="x">ب</iframe>ج</p>')
+        self.assertEqual(html, '<p>الفج</p>')
+
+    def test_event_handlers_and_unknown_attributes_are_removed(self):
+        html = sanitize_html('<p onclick="x()" class="lead" style="color:red">متن</p><img src="/a.png" onerror="x()">')
+        self.assertEqual(html, '<p class="lead">متن</p><img src="/a.png">')
+
+    def test_unsafe_urls_are_removed(self):
+        for url in ('javascript:alert(1)', ' JavaScript:alert(1)', 'data:text/html;base64,PHNjcmlwdD4=', 'vbscript:x'):
+            with self.subTest(url=url):
+                self.assertEqual(sanitize_html(f'<a href="{url}">لینک</a>'), '<a>لینک</a>')
+        self.assertEqual(sanitize_html('<img src="data:image/png;base64,AAAA">'), '<img>')
+        self.assertEqual(
+            sanitize_html('<a href="https://example.com/?a=1&b=2" target="_blank" rel="opener">لینک</a>'),
+            '<a href="https://example.com/?a=1&amp;b=2" target="_blank" rel="noopener noreferrer">لینک</a>',
+        )
+
+    def test_allowed_tags_are_kept_and_closed(self):
+        self.assertEqual(
+            sanitize_html('<h2>عنوان</h2><ul><li><strong>یک</strong></li></ul><form><input name="q">فرم</form>'),
+            '<h2>عنوان</h2><ul><li><strong>یک</strong></li></ul>فرم',
+        )
+        self.assertEqual(sanitize_html('<p><em>باز &lt;b&gt;'), '<p><em>باز &lt;b&gt;</em></p>')
+
+    def test_excerpt_is_built_from_sanitized_html(self):
+        body = '<p>سلام</p><script>var secret = 1;</script><style>.a{}</style><p>دنیا &amp; بقیه</p>'
+        self.assertEqual(make_excerpt(sanitize_html(body)), 'سلام دنیا & بقیه')
+        self.assertEqual(make_excerpt(sanitize_html('<p>' + 'کلمه ' * 50 + '</p>'), words=3), 'کلمه کلمه کلمه…')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RenderArticleBodiesTests(BlogDataMixin, TestCase):
+
+    def test_article_save_renders_body(self):
+        article = Article.objects.create(
+            title='مقاله', body='<p onclick="x()">متن<script>bad()</script></p>', author=self.author,
+        )
+        self.assertEqual((article.body_html, article.excerpt), ('<p>متن</p>', 'متن'))
+
+    def test_command_renders_changed_articles_and_invalidates_caches(self):
+        Article.objects.filter(pk=self.article.pk).update(body_html='', excerpt='')
+        article_cache.get_article(self.article.slug)
+        before = get_version(article_key(self.article)), get_version('categories'), get_version('feeds')
+
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('render_article_bodies', stdout=output)
+        self.assertIn('1 مقاله', output.getvalue())
+        self.assertEqual(article_cache.get_article(self.article.slug).body_html, '<p>متن مقاله 0 درباره کتاب و برنامه‌نویسی</p>')
+        after = get_version(article_key(self.article)), get_version('categories'), get_version('feeds')
+        for old, new in zip(before, after):
+            self.assertGreater(new, old)
+
+        # با --all فقط مقالاتی که واقعا تغییر کرده‌اند نوشته می‌شوند
+        output = StringIO()
+        call_command('render_article_bodies', '--all', stdout=output)
+        self.assertIn('0 مقاله', output.getvalue())
+
+
+class ArticleBodyMigrationTests(TransactionTestCase):
+    """
+    مهاجرت 0012 متن پاک‌سازی‌شده و خلاصه مقالات موجود را می‌سازد.
+    """
+    before = ('blog', '0011_search_index')
+    after = ('blog', '0012_article_body_html_excerpt')
+    migrate = SearchIndexMigrationTests.migrate
+    tearDown = SearchIndexMigrationTests.tearDown
+
+    def test_existing_articles_are_rendered(self):
+        apps = self.migrate(self.before)
+        author = apps.get_model('auth', 'User').objects.create(username='author')
+        article = apps.get_model('blog', 'Article').objects.create(
+            title='مقاله', body='<p>متن<script>x()</script></p>', author=author, slug='a',
+        )
+        apps = self.migrate(self.after)
+        article = apps.get_model('blog', 'Article').objects.get(pk=article.pk)
+        self.assertEqual((article.body_html, article.excerpt), ('<p>متن</p>', 'متن'))
+
+
+# ==================================
+# صفحه‌بندی ترکیبی (شماره صفحه و کرسر)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class KeysetPaginationTests(BlogDataMixin, TestCase):
+    page_size = 3
+
+    @property
+    def queryset(self):
+        return Article.objects.published().order_by('-created', '-pk')
+
+    def setUp(self):
+        super().setUp()
+        self.ordered = list(self.queryset)
+
+    def cursor(self, article, direction):
+        rows = list(cursor_queryset(self.queryset, *decode_cursor(encode_cursor(article, direction)), self.page_size))
+        return cursor_page(rows, direction, self.page_size)
+
+    def test_cursor_round_trip(self):
+        direction, created, pk = decode_cursor(encode_cursor(self.article, 'p'))
+        self.assertEqual((direction, created, pk), ('p', self.article.created, self.article.pk))
+
+    def test_invalid_cursor(self):
+        for token in ('', 'not-a-cursor', encode_cursor(self.article, 'x'), 'bnwyMDI0fGFiYw'):
+            with self.subTest(token=token), self.assertRaises(Http404):
+                decode_cursor(token)
+
+    def test_next_pages_cover_every_article_once(self):
+        seen = self.ordered[:self.page_size]
+        page = self.cursor(seen[-1], 'n')
+        while True:
+            self.assertTrue(page.has_previous())
+            seen += page.object_list
+            if not page.has_next():
+                break
+            page = self.cursor(page.object_list[-1], 'n')
+        self.assertEqual(seen, self.ordered)
+        self.assertIsNone(page.next_cursor)
+
+    def test_previous_page_from_last_page(self):
+        page = self.cursor(self.ordered[-3], 'p')
+        self.assertEqual(page.object_list, self.ordered[2:5])
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        # صفحه اول: قبل از آن مقاله‌ای نیست
+        page = self.cursor(page.object_list[0], 'p')
+        self.assertEqual(page.object_list, self.ordered[:2])
+        self.assertFalse(page.has_previous())
+        self.assertIsNone(page.previous_cursor)
+
+    def test_ties_on_created_are_ordered_by_pk(self):
+        Article.objects.filter(pk__in=[a.pk for a in self.ordered[2:6]]).update(created=self.ordered[2].created)
+        ordered = list(self.queryset)
+        page = self.cursor(ordered[2], 'n')
+        self.assertEqual(page.object_list, ordered[3:6])
+        page = self.cursor(ordered[5], 'p')
+        self.assertEqual(page.object_list, ordered[2:5])
+
+    def test_last_numbered_page_links_to_cursor(self):
+        paginator = CappedPaginator(self.queryset, self.page_size, max_pages=2)
+        self.assertTrue(paginator.truncated)
+        self.assertEqual(paginator.num_pages, 2)
+        links = page_links(paginator.page(2))
+        self.assertTrue(links['is_paginated'])
+        self.assertEqual(links['next_page_query'], f'cursor={encode_cursor(self.ordered[5], "n")}')
+
+        links = page_links(paginator.page(1))
+        self.assertFalse(links['previous_page_query'])
+        self.assertEqual(links['next_page_query'], 'page=2')
+
+    def test_apaginate_matches_sync_pages(self):
+        request = RequestFactory().get('/', {'cursor': encode_cursor(self.ordered[2], 'n')})
+        paginator, page, articles, is_paginated = async_to_sync(apaginate)(
+            Article.objects.published(), request, self.page_size,
+        )
+        self.assertIsNone(paginator)
+        self.assertEqual(articles, self.ordered[3:6])
+        self.assertTrue(is_paginated)
+
+    def test_views_follow_cursor_links(self):
+        url = reverse('blog:articles_list')
+        response = self.client.get(url, {'page': 3})
+        self.assertEqual(list(response.context['articles']), self.ordered[6:])
+        self.assertIsNone(response.context['next_page_query'])
+
+        response = self.client.get(f'{url}?cursor={encode_cursor(self.ordered[5], "n")}')
+        self.assertEqual(list(response.context['articles']), self.ordered[6:])
+        self.assertEqual(
+            response.context['previous_page_query'], f'cursor={encode_cursor(self.ordered[6], "p")}',
+        )
+        self.assertEqual(self.client.get(url, {'cursor': 'invalid'}).status_code, 404)
+
+
+# ==================================
+# لایک مستقیم (Like.toggle) و ویو JSON آن
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class LikeToggleTests(BlogDataMixin, TestCase):
+
+    def like_state(self, user):
+        self.article.refresh_from_db()
+        return Like.objects.filter(article=self.article, user=user).exists(), self.article.like_count
+
+    def test_toggle_deletes_then_inserts(self):
+        self.assertEqual(Like.toggle(self.user, self.article), (False, 0))
+        self.assertEqual(self.like_state(self.user), (False, 0))
+        self.assertEqual(Like.toggle(self.user, self.article), (True, 1))
+        self.assertEqual(self.like_state(self.user), (True, 1))
+        self.assertEqual(Like.toggle(self.author, self.article), (True, 2))
+        self.assertEqual(self.like_state(self.author), (True, 2))
+
+    def test_concurrent_like_is_counted_once(self):
+        # درخواست همزمان لایک را ساخته ولی DELETE این درخواست هنوز آن را ندیده است
+        Like.objects.create(article=self.article, user=self.author)
+        with mock.patch('django.db.models.query.QuerySet.delete', return_value=(0, {})):
+            self.assertEqual(Like.toggle(self.author, self.article), (True, 1))
+        # خطای INSERT فقط savepoint را برگردانده؛ تراکنش بیرونی قابل استفاده است
+        self.assertEqual(self.like_state(self.author), (True, 1))
+        self.assertEqual(Like.objects.filter(article=self.article).count(), 2)
+
+    def test_json_response(self):
+        self.client.force_login(self.user)
+        url = reverse('blog:toggle_like', args=[self.article.slug])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'liked': False, 'like_count': 0})
+        self.assertEqual(self.client.post(url).json(), {'liked': True, 'like_count': 1})
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_anonymous_gets_401(self):
+        response = self.client.post(reverse('blog:toggle_like', args=[self.article.slug]))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['login_url'], reverse('accounts:login'))
+        self.assertEqual(self.like_state(self.user), (True, 1))
+
+    def test_missing_article_is_404(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(reverse('blog:toggle_like', args=['ناموجود'])).status_code, 404)
+
+
+# ==================================
+# لایک‌ها در حالت write-behind (ژورنال و flush_likes)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, LIKE_WRITE_BEHIND=True)
+class LikeJournalTests(BlogDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        journal_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(LIKE_JOURNAL_PATH=os.path.join(journal_dir, 'likes.log')))
+        self.reader = User.objects.create_user('second', password='pw')
+        self.article.refresh_from_db()
+
+    def flush(self):
+        output = StringIO()
+        call_command('flush_likes', stdout=output)
+        self.article.refresh_from_db()
+        return output.getvalue()
+
+    def test_toggle_is_pending_until_flush(self):
+        self.assertEqual(likes.toggle(self.reader, self.article), (True, 2))
+        self.assertFalse(Like.objects.filter(article=self.article, user=self.reader).exists())
+        self.assertTrue(likes.is_liked(self.reader, self.article))
+        self.assertEqual(likes.like_count(self.article), 2)
+
+        # لغو لایک قبلی هم تا flush فقط در ژورنال است
+        self.assertEqual(likes.toggle(self.user, self.article), (False, 1))
+        self.assertFalse(likes.is_liked(self.user, self.article))
+        self.assertEqual(self.article.like_count, 1)
+
+    def test_summary_is_rebuilt_from_journal(self):
+        likes.toggle(self.reader, self.article)
+        likes.toggle(self.user, self.articles[1])
+        clear_caches()
+        self.assertTrue(likes.is_liked(self.reader, self.article))
+        self.assertFalse(likes.is_liked(self.user, self.articles[1]))
+        self.assertEqual(likes.like_count(self.article), 2)
+        self.assertEqual(async_to_sync(likes.alike_count)(self.articles[1]), 0)
+
+    def test_flush_applies_last_state(self):
+        for _ in range(3):
+            likes.toggle(self.reader, self.article)
+        likes.toggle(self.user, self.article)
+        self.assertIn('2 لایک', self.flush())
+
+        self.assertEqual(
+            set(Like.objects.filter(article=self.article).values_list('user', flat=True)), {self.reader.pk},
+        )
+        self.assertEqual(self.article.like_count, 1)
+        self.assertEqual(likes.like_count(self.article), 1)
+        self.assertTrue(likes.is_liked(self.reader, self.article))
+        self.assertFalse(likes.is_liked(self.user, self.article))
+        self.assertFalse(os.path.exists(settings.LIKE_JOURNAL_PATH))
+        self.assertEqual(self.flush(), '')
+
+    def test_toggles_after_flush_start_a_new_summary(self):
+        likes.toggle(self.reader, self.article)
+        self.flush()
+        self.assertEqual(likes.toggle(self.reader, self.article), (False, 1))
+        self.assertEqual(likes.like_count(self.article), 1)
+        self.flush()
+        self.assertEqual(self.article.like_count, 1)
+        self.assertFalse(Like.objects.filter(article=self.article, user=self.reader).exists())
+
+    def test_summary_is_discarded_before_commit(self):
+        likes.toggle(self.reader, self.article)
+        depth = len(connection.atomic_blocks)
+        discarded_in = []
+        delete = likes.state_cache.delete
+
+        def record(key, *args, **kwargs):
+            if key == likes.GENERATION_KEY:
+                discarded_in.append(len(connection.atomic_blocks))
+            return delete(key, *args, **kwargs)
+
+        with mock.patch.object(likes.state_cache, 'delete', record):
+            self.flush()
+        # اعمال لایک‌ها هنوز commit نشده بود (بلوک atomic خود flush باز بود)
+        self.assertEqual(discarded_in, [depth + 1])
+        self.assertEqual(self.article.like_count, 2)
+        self.assertEqual(likes.like_count(self.article), 2)
+
+    def test_interrupted_flush_is_resumed(self):
+        buffer = likes.LikeBuffer()
+        likes.toggle(self.reader, self.article)
+        os.replace(buffer.path, buffer.flushing_path)
+        likes.toggle(self.reader, self.articles[1])
+        clear_caches()
+
+        # تا پایان flush، لایک‌های فایل در حال flush هم در انتظار هستند
+        self.assertTrue(likes.is_liked(self.reader, self.article))
+        self.assertEqual(buffer.flush(), 1)
+        self.assertTrue(Like.objects.filter(article=self.article, user=self.reader).exists())
+        self.assertTrue(likes.is_liked(self.reader, self.articles[1]))
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(Like.objects.filter(user=self.reader).count(), 2)
+
+
+# ==================================
+# کش کامل صفحات برای بازدیدکنندگان ناشناس
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, VERSION_CLOCK_SKEW=0)
+class PageCacheTests(BlogDataMixin, TestCase):
+
+    def get(self):
+        return self.client.get(reverse('blog:articles_list'))
+
+    def test_first_render_of_new_versions_is_not_stored(self):
+        # نسخه‌هایی که در همین رندر ساخته شده‌اند «بعد از شروع رندر» هستند
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_hit_serves_stored_page(self):
+        self.get()
+        miss = self.get()
+        with self.assertNumQueries(0):
+            hit = self.get()
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit['ETag'], miss['ETag'])
+
+    def test_purge_on_version_bump(self):
+        self.get()
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version(article_key(self.articles[-1]))
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_purge_during_render_is_not_stored(self):
+        self.get()
+        get_surrogate_keys = SurrogateKeysMixin.get_surrogate_keys
+
+        def edit_while_rendering(view, context):
+            # ویرایشی که بعد از خواندن مقالات و قبل از ذخیره صفحه commit می‌شود
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_version('articles')
+            return get_surrogate_keys(view, context)
+
+        with mock.patch.object(SurrogateKeysMixin, 'get_surrogate_keys', edit_while_rendering):
+            self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_logged_in_users_bypass_cache(self):
+        self.get()
+        self.get()
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.get()
+            self.assertNotIn('X-Cache', response)
+            self.assertIsNotNone(response.context)
+
+
+# ==================================
+# ویوهای async خواندن
+# ==================================
+@contextmanager
+def async_read_views():
+    # urls.py ویوهای خواندن را هنگام import بر اساس ASYNC_VIEWS انتخاب می‌کند؛ resolver های
+    # include شده هم الگوهایشان را نگه می‌دارند، پس URLconf اصلی هم دوباره بارگذاری می‌شود
+    def reload_urls():
+        importlib.reload(blog_urls)
+        importlib.reload(import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(ASYNC_VIEWS=True):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class AsyncViewsTests(BlogDataMixin, TestCase):
+
+    def urls(self):
+        return [
+            reverse('blog:articles_list'),
+            reverse('blog:articles_list') + '?page=2',
+            reverse('blog:category_list', args=[self.categories[0].pk]),
+            self.article.get_absolute_url(),
+            reverse('blog:search') + '?q=کتاب',
+        ]
+
+    def render(self, url):
+        clear_caches()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # توکن CSRF (فرم نظر و دکمه لایک) در هر رندر با ماسک تازه‌ای نوشته می‌شود
+        return re.sub(rb'="[A-Za-z0-9]{64}"', b'=""', response.content)
+
+    def test_read_urls_use_async_views(self):
+        with async_read_views():
+            for url in self.urls():
+                with self.subTest(url=url):
+                    self.assertTrue(resolve(url.split('?')[0]).func.view_class.__module__.endswith('async_views'))
+        self.assertIs(resolve(reverse('blog:articles_list')).func.view_class, views.ArticleListView)
+
+    def test_pages_match_sync_views(self):
+        self.client.force_login(self.user)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 32
+        for url in self.urls():
+            with self.subTest(url=url):
+                expected = self.render(url)
+                with async_read_views():
+                    self.assertEqual(self.render(url), expected)
+
+    def test_missing_objects(self):
+        with async_read_views():
+            self.assertEqual(self.client.get(reverse('blog:category_list', args=[999])).status_code, 404)
+            self.assertEqual(self.client.get(reverse('blog:article_detail', args=['ناموجود'])).status_code, 404)
+
+    async def test_asgi_request_and_conditional_get(self):
+        with async_read_views():
+            url = reverse('blog:articles_list')
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['articles']), 3)
+            response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+            self.assertEqual(response.status_code, 304)
+
+
+# ==================================
+# کش مقالات بر اساس اسلاگ (article_cache)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, VERSION_CLOCK_SKEW=0)
+class ArticleCacheTests(BlogDataMixin, TestCase):
+
+    def test_cached_article_needs_no_queries(self):
+        get_versions([article_key(self.article), 'categories'])
+        article_cache.get_article(self.article.slug)
+        with self.assertNumQueries(0):
+            article = article_cache.get_article(self.article.slug)
+            self.assertEqual(article, self.article)
+            self.assertEqual(article.author.username, 'author')
+            self.assertEqual([category.title for category in article.category.all()], ['دسته 0'])
+
+    def test_missing_slug_is_cached(self):
+        for _ in range(2):
+            with self.assertRaises(Http404):
+                article_cache.get_article('بعدا-منتشر-می‌شود')
+        self.assertEqual(cache.get(article_cache.slug_key('بعدا-منتشر-می‌شود')), article_cache.NOT_FOUND)
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            async_to_sync(article_cache.aget_article)('بعدا-منتشر-می‌شود')
+
+        # انتشار مقاله با همین اسلاگ «پیدا نشد» کش‌شده را پاک می‌کند
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(
+                title='مقاله جدید', slug='بعدا-منتشر-می‌شود', body='<p>متن</p>', author=self.author, status='p',
+            )
+        self.assertEqual(article_cache.get_article(article.slug), article)
+
+    def test_slug_change_invalidates_old_slug(self):
+        old_slug = self.article.slug
+        article_cache.get_article(old_slug)
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.get(pk=self.article.pk)
+            article.slug = 'اسلاگ-جدید'
+            article.save()
+
+        with self.assertRaises(Http404):
+            article_cache.get_article(old_slug)
+        self.assertEqual(async_to_sync(article_cache.aget_article)('اسلاگ-جدید').pk, self.article.pk)
+
+    def test_unpublished_article_is_not_served(self):
+        article_cache.get_article(self.article.slug)
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.get(pk=self.article.pk)
+            article.status = 'd'
+            article.save()
+        with self.assertRaises(Http404):
+            article_cache.get_article(self.article.slug)
+
+    def test_counter_change_refreshes_entry(self):
+        article_cache.get_article(self.article.slug)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(article=self.article, user=self.user, body='نظر دوم')
+        self.article.refresh_from_db()
+        self.assertEqual(article_cache.get_article(self.article.slug).comment_count, self.article.comment_count)
+
+    def edit_before(self, name, edit):
+        """
+        edit بعد از کوئری get_article و قبل از خواندن نسخه‌ها (و پر کردن کش) commit می‌شود.
+        """
+        original = getattr(article_cache, name)
+
+        def commit_edit():
+            with self.captureOnCommitCallbacks(execute=True):
+                edit()
+
+        def edit_then_read(*args):
+            commit_edit()
+            return original(*args)
+
+        async def aedit_then_read(*args):
+            await sync_to_async(commit_edit)()
+            return await original(*args)
+
+        side_effect = aedit_then_read if iscoroutinefunction(original) else edit_then_read
+        return mock.patch.object(article_cache, name, side_effect=side_effect)
+
+    def test_edit_between_miss_and_fill_is_not_cached(self):
+        get_versions([article_key(self.article), 'categories'])
+        add_comment = lambda: Comment.objects.create(article=self.article, user=self.user, body='نظر همزمان')
+        readers = [('get_versions', article_cache.get_article), ('aget_versions', async_to_sync(article_cache.aget_article))]
+        for name, get_article in readers:
+            with self.subTest(name=name):
+                with self.edit_before(name, add_comment):
+                    stale = get_article(self.article.slug)
+                self.assertIsNone(cache.get(article_cache.slug_key(self.article.slug)))
+                self.article.refresh_from_db()
+                self.assertEqual(stale.comment_count, self.article.comment_count - 1)
+                self.assertEqual(article_cache.get_article(self.article.slug).comment_count, self.article.comment_count)
+                cache.clear()
+
+    def test_publish_between_miss_and_fill_is_not_cached(self):
+        slug = 'همزمان-منتشر-می‌شود'
+        publish = lambda: Article.objects.create(
+            title='مقاله همزمان', slug=slug, body='<p>متن</p>', author=self.author, status='p',
+        )
+        with self.edit_before('find_version', publish), self.assertRaises(Http404):
+            article_cache.get_article(slug)
+        self.assertIsNone(cache.get(article_cache.slug_key(slug)))
+        self.assertEqual(article_cache.get_article(slug).title, 'مقاله همزمان')
+
+        # اسلاگی که هیچ‌وقت مقاله نداشته نسخه‌ای نمی‌سازد و «پیدا نشد» از همان بار اول کش می‌شود
+        with self.assertRaises(Http404):
+            async_to_sync(article_cache.aget_article)('ناموجود')
+        self.assertEqual(cache.get(article_cache.slug_key('ناموجود')), article_cache.NOT_FOUND)
+        self.assertIsNone(find_version(article_cache.slug_version('ناموجود')))
+
+
+# ==================================
+# فیدهای RSS و Atom
+# ==================================
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FeedTests(BlogDataMixin, TestCase):
+
+    def fetch(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def test_rss_lists_published_excerpts(self):
+        response, content = self.fetch(reverse('blog:articles_rss'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        items = ElementTree.fromstring(content).findall('channel/item')
+        self.assertEqual([item.findtext('title') for item in items], [a.title for a in reversed(self.articles)])
+        first = items[0]
+        self.assertEqual(first.findtext('description'), self.articles[-1].excerpt)
+        self.assertTrue(first.findtext('link').startswith('http://testserver/blog/article/'))
+        self.assertEqual([c.text for c in first.findall('category')], [c.title for c in self.categories[:1 + 7 % 3]])
+
+    def test_atom_and_category_feeds(self):
+        _, content = self.fetch(reverse('blog:category_atom', args=[self.categories[2].pk]))
+        entries = ElementTree.fromstring(content).findall(f'{ATOM}entry')
+        expected = [a.title for a in reversed(self.articles) if self.categories[2] in a.category.all()]
+        self.assertEqual([entry.findtext(f'{ATOM}title') for entry in entries], expected)
+        self.assertEqual(self.client.get(reverse('blog:category_rss', args=[999])).status_code, 404)
+
+    def test_item_count_is_limited(self):
+        for i in range(FEED_ITEMS):
+            Article.objects.create(title=f'مقاله اضافه {i}', body='<p>متن</p>', author=self.author, status='p')
+        _, content = self.fetch(reverse('blog:articles_rss'))
+        self.assertEqual(len(ElementTree.fromstring(content).findall('channel/item')), FEED_ITEMS)
+
+    def test_cached_feed_and_invalidation(self):
+        url = reverse('blog:articles_rss')
+        _, content = self.fetch(url)
+        # فقط کوئری aggregate اعتبارسنجی شرطی
+        with self.assertNumQueries(1):
+            response, cached = self.fetch(url)
+        self.assertFalse(response.streaming)
+        self.assertEqual(cached, content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(title='مقاله تازه', body='<p>متن</p>', author=self.author, status='p')
+        response, content = self.fetch(url)
+        self.assertTrue(response.streaming)
+        self.assertIn('مقاله تازه'.encode(), content)
+
+    def test_interrupted_stream_is_not_cached(self):
+        url = reverse('blog:articles_rss')
+        response = self.client.get(url)
+        next(iter(response.streaming_content))
+        response.close()
+        self.assertTrue(self.client.get(url).streaming)
+
+    def test_not_modified(self):
+        url = reverse('blog:articles_atom')
+        response, _ = self.fetch(url)
+        response, content = self.fetch(url, if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(content, b'')
+
+
+# ==================================
+# نقشه سایت (sitemap index و صفحات آن)
+# ==================================
+SITEMAP = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SitemapTests(BlogDataMixin, TestCase):
+
+    def fetch(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, ElementTree.fromstring(content)
+
+    def page_url(self, section, page=1):
+        return reverse('sitemap_page', kwargs={'section': section, 'page': page})
+
+    def test_index_lists_section_pages(self):
+        _, index = self.fetch(reverse('sitemap'))
+        locations = [node.findtext(f'{SITEMAP}loc') for node in index.findall(f'{SITEMAP}sitemap')]
+        self.assertEqual(locations, [
+            f'http://testserver{self.page_url("articles")}', f'http://testserver{self.page_url("categories")}',
+        ])
+        lastmod = index.find(f'{SITEMAP}sitemap').findtext(f'{SITEMAP}lastmod')
+        latest = max(article.updated for article in Article.objects.published())
+        self.assertEqual(lastmod, latest.isoformat(timespec='seconds'))
+        # نسخه sitemap تغییر نکرده؛ از کش
+        with self.assertNumQueries(0):
+            self.client.get(reverse('sitemap'))
+
+    def test_article_page_has_only_published_articles(self):
+        response, urlset = self.fetch(self.page_url('articles'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/xml; charset=utf-8')
+        locations = [node.findtext(f'{SITEMAP}loc') for node in urlset.findall(f'{SITEMAP}url')]
+        articles = sorted(self.articles, key=lambda article: article.pk)
+        self.assertEqual(locations, [f'http://testserver{article.get_absolute_url()}' for article in articles])
+
+    def test_category_lastmod_is_latest_article_edit(self):
+        _, urlset = self.fetch(self.page_url('categories'))
+        nodes = urlset.findall(f'{SITEMAP}url')
+        self.assertEqual(len(nodes), len(self.categories))
+        category = self.categories[2]
+        latest = max(a.updated for a in Article.objects.published().filter(category=category))
+        node = next(node for node in nodes if node.findtext(f'{SITEMAP}loc').endswith(f'/category/{category.pk}/'))
+        self.assertEqual(node.findtext(f'{SITEMAP}lastmod'), latest.isoformat(timespec='seconds'))
+
+    def test_page_is_cached_until_article_changes(self):
+        url = self.page_url('articles')
+        self.fetch(url)
+        with self.assertNumQueries(0):
+            response, _ = self.fetch(url)
+        self.assertFalse(response.streaming)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title='مقاله تازه', body='<p>متن</p>', author=self.author, status='p')
+        response, urlset = self.fetch(url)
+        self.assertTrue(response.streaming)
+        last = urlset.findall(f'{SITEMAP}url')[-1].findtext(f'{SITEMAP}loc')
+        self.assertEqual(last, f'http://testserver{article.get_absolute_url()}')
+
+    def test_missing_pages(self):
+        for url in (self.page_url('tags'), self.page_url('articles', 2)):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_keyset_batches(self):
+        pks = sorted(article.pk for article in self.articles)
+        with self.assertNumQueries(3):
+            batches = list(keyset_batches(Article.objects.published().values_list('pk'), 1, size=3))
+        self.assertEqual([[row[0] for row in batch] for batch in batches], [pks[:3], pks[3:6], pks[6:]])
+        self.assertEqual(page_number(SITEMAP_PAGE_SIZE), 1)
+        self.assertEqual(page_number(SITEMAP_PAGE_SIZE + 1), 2)
+
+
+# ==================================
+# دستورهای export_articles و import_articles
+# ==================================
+def index_snapshot():
+    postings = set(SearchPosting.objects.values_list('term__term', 'article__slug', 'frequency'))
+    documents = dict(SearchDocument.objects.values_list('article__slug', 'length'))
+    return postings, documents, dict(SearchTerm.objects.filter(df__gt=0).values_list('term', 'df'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImportExportTests(BlogDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(self.directory, 'articles.jsonl')
+
+    def export(self):
+        call_command('export_articles', self.path, stdout=StringIO())
+        with open(self.path, encoding='utf-8') as export_file:
+            return [json.loads(line) for line in export_file]
+
+    def import_lines(self, *records, **options):
+        with open(self.path, 'w', encoding='utf-8') as import_file:
+            for record in records:
+                import_file.write(record if isinstance(record, str) else json.dumps(record, ensure_ascii=False))
+                import_file.write('\n')
+        output = StringIO()
+        call_command('import_articles', self.path, stdout=output, **options)
+        return output.getvalue()
+
+    def record(self, title, **fields):
+        return {'title': title, 'body': f'<p>متن {title}</p>', 'author': 'author', 'status': 'p', **fields}
+
+    def test_round_trip(self):
+        exported = self.export()
+        self.assertEqual(len(exported), Article.objects.count())
+        index = index_snapshot()
+        Article.objects.all().delete()
+
+        output = self.import_lines(*exported, batch_size=4)
+        self.assertIn(f'{len(exported)} مقاله وارد و 0 مقاله تکراری رد شد', output)
+        self.assertEqual(self.export(), exported)
+        # فقط مقالات وارد شده نمایه شده‌اند، همان‌طور که سیگنال‌ها نمایه کرده بودند
+        self.assertEqual(index_snapshot(), index)
+        self.assertEqual(len(search('کتاب').ranked), len(self.articles))
+
+        output = self.import_lines(*exported)
+        self.assertIn(f'0 مقاله وارد و {len(exported)} مقاله تکراری رد شد', output)
+
+    def test_slug_collisions(self):
+        self.import_lines(
+            self.record('عنوان اول', slug=self.article.slug),
+            self.record('عنوان دوم', slug=self.article.slug),
+            '',
+            self.record('عنوان سوم', slug='سوم'),
+            self.record('عنوان اول'),  # عنوان تکراری داخل خود فایل
+        )
+        slugs = dict(Article.objects.filter(title__startswith='عنوان').values_list('title', 'slug'))
+        self.assertEqual(slugs, {
+            'عنوان اول': f'{self.article.slug}-2', 'عنوان دوم': f'{self.article.slug}-3', 'عنوان سوم': 'سوم',
+        })
+
+    def test_bad_lines(self):
+        cases = [
+            ('{"title": ', 'خط 2: JSON نامعتبر'),
+            (self.record('بدون متن', body=''), 'خط 2: عنوان و متن مقاله لازم است.'),
+            (self.record('نویسنده ناموجود', author='nobody'), "خط 2: نویسنده 'nobody' وجود ندارد"),
+            (self.record('وضعیت نامعتبر', status='x'), "خط 2: وضعیت نامعتبر 'x'."),
+        ]
+        count = Article.objects.count()
+        for line, message in cases:
+            with self.subTest(message=message), self.assertRaisesMessage(CommandError, message):
+                self.import_lines(self.record('مقاله سالم'), line)
+            # دسته‌ای که خط نامعتبر دارد کامل برگردانده می‌شود
+            self.assertEqual(Article.objects.count(), count)
+
+    def test_default_author_and_status(self):
+        self.import_lines(self.record('نویسنده ناموجود', author='nobody'), author='reader', status='d')
+        article = Article.objects.get(title='نویسنده ناموجود')
+        self.assertEqual((article.author, article.status), (self.user, 'd'))
+        self.assertFalse(SearchDocument.objects.filter(article=article).exists())
+        with self.assertRaisesMessage(CommandError, 'کاربر nobody وجود ندارد.'):
+            self.import_lines(self.record('دیگر'), author='nobody')
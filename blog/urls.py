@@ -1,22 +1,36 @@
+from django.conf import settings
 from django.urls import path, re_path
-from . import views
+from . import async_views, views
+from .feeds import ArticleFeedView, AtomFeed, CategoryFeedView, RssFeed
 
 app_name = 'blog'
 
+# ویوهای خواندن در اجرای ASGI نسخه async هستند (ASYNC_VIEWS در settings)
+read_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     # ==================================
     # مسیرهای اصلی و عمومی وبلاگ
     # ==================================
     
-    path('articles/', views.ArticleListView.as_view(), name='articles_list'),
+    path('articles/', read_views.ArticleListView.as_view(), name='articles_list'),
 
     # این خط اصلاح شد تا از اسلاگ فارسی پشتیبانی کند
-    re_path(r'^article/(?P<slug>[^/]+)/$', views.ArticleDetailView.as_view(), name='article_detail'),
+    re_path(r'^article/(?P<slug>[^/]+)/$', read_views.ArticleDetailView.as_view(), name='article_detail'),
 
-    path('category/<int:pk>/', views.CategoryArticleListView.as_view(), name='category_list'),
-    path('search/', views.SearchListView.as_view(), name='search'),
+    path('category/<int:pk>/', read_views.CategoryArticleListView.as_view(), name='category_list'),
+    path('search/', read_views.SearchListView.as_view(), name='search'),
     path('contact-us/', views.ContactView.as_view(), name='contact_us'),
 
+    # ==================================
+    # فیدهای RSS و Atom (کل سایت و هر دسته‌بندی)
+    # ==================================
+
+    path('feed/rss/', ArticleFeedView.as_view(feed_type=RssFeed), name='articles_rss'),
+    path('feed/atom/', ArticleFeedView.as_view(feed_type=AtomFeed), name='articles_atom'),
+    path('category/<int:pk>/feed/rss/', CategoryFeedView.as_view(feed_type=RssFeed), name='category_rss'),
+    path('category/<int:pk>/feed/atom/', CategoryFeedView.as_view(feed_type=AtomFeed), name='category_atom'),
+
     # ==================================
     # مسیرهای مربوط به تعاملات کاربر (Actions)
     # ==================================
@@ -26,4 +40,7 @@ urlpatterns = [
 
     # این خط هم اصلاح شد تا از اسلاگ فارسی پشتیبانی کند
     re_path(r'^article/(?P<slug>[^/]+)/like/$', views.like_article, name='like_article'),
+
+    # لایک با درخواست POST و پاسخ JSON (برای دکمه لایک بدون بارگذاری دوباره صفحه)
+    re_path(r'^article/(?P<slug>[^/]+)/like/toggle/$', views.toggle_like, name='toggle_like'),
 ]
\ No newline at end of file
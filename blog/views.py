@@ -1,20 +1,31 @@
 # ==================================
 # وارد کردن ماژول‌ها و کتابخانه‌های لازم
 # ==================================
-from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect, resolve_url
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.utils.functional import SimpleLazyObject
 
 # وارد کردن مدل‌ها و فرم‌های اپلیکیشن فعلی
-from .models import Article, Category, Comment, Message, Like
+from .models import Article, Category, Comment, Message
+from . import likes
+from .article_cache import get_article
+from .cache import get_version, get_versions
+from .conditional import ConditionalGetMixin, listing_validators
 from .forms import CommentForm, MessageForm
+from .pagination import KeysetPaginationMixin
+from .page_cache import SurrogateKeysMixin, article_key, category_key
+from .search import search
 
 
 
 
-class ArticleListView(ListView):
+class ArticleListView(ConditionalGetMixin, SurrogateKeysMixin, KeysetPaginationMixin, ListView):
     """
     نمایش لیست مقالات منتشر شده همراه با صفحه‌بندی (Pagination).
     این ویو جایگزین ویو تابعی articles_list می‌شود.
@@ -29,18 +40,27 @@ class ArticleListView(ListView):
     context_object_name = 'articles'
     
     # 4. صفحه‌بندی: مشخص می‌کند در هر صفحه چند مقاله نمایش داده شود.
+    # KeysetPaginationMixin چند صفحه اول را با شماره و صفحات بعدی را با کرسر نمایش می‌دهد.
     paginate_by = 3
 
+    # 5. کلیدهای کش صفحه: این صفحه با تغییر لیست مقالات یا سایدبار بی‌اعتبار می‌شود.
+    surrogate_keys = ('articles', 'sidebar')
+
     def get_queryset(self):
         """
         این متد کوئری پیش‌فرض را بازنویسی می‌کند تا فقط مقالات "منتشر شده" را برگرداند.
         این یک فیلتر امنیتی و منطقی بسیار مهم است.
         """
         # مقالات را بر اساس وضعیت 'p' (Published) فیلتر کن
-        return Article.objects.filter(status='p')
+        # cards() نویسنده و دسته‌بندی‌ها را از قبل بارگذاری می‌کند تا هر کارت کوئری جداگانه نداشته باشد.
+        return Article.objects.published().cards()
+
+    def get_validators(self):
+        # صفحه (شماره یا کرسر) در آدرس است؛ ETag فقط به خود لیست وابسته است
+        return listing_validators(Article.objects.published(), 'articles', 'sidebar', 'categories')
 
 
-class ArticleDetailView(DetailView):
+class ArticleDetailView(ConditionalGetMixin, SurrogateKeysMixin, DetailView):
     """
     نمایش جزئیات کامل یک مقاله، نظرات آن و فرم ارسال نظر.
     این ویو جایگزین ویو تابعی article_detail می‌شود.
@@ -54,11 +74,25 @@ class ArticleDetailView(DetailView):
     # 3. نام متغیر در تمپلیت
     context_object_name = 'article'
 
-    def get_queryset(self):
+    # مقاله از کش مقالات (article_cache) خوانده می‌شود؛ get_validators آن را اینجا نگه می‌دارد
+    article = None
+
+    def get_object(self, queryset=None):
         """
         اطمینان حاصل می‌کند که فقط مقالات "منتشر شده" قابل مشاهده هستند.
+        مقاله (با نویسنده و دسته‌بندی‌ها) از کش خوانده می‌شود و اسلاگ ناموجود هم کش شده است.
         """
-        return Article.objects.filter(status='p')
+        if self.article is None:
+            self.article = get_article(self.kwargs['slug'])
+        return self.article
+
+    def get_validators(self):
+        """
+        ETag صفحه مقاله: زمان ویرایش مقاله، نسخه نظرات و لایک‌های آن، سایدبار و دسته‌بندی‌ها.
+        مقاله از کش خوانده می‌شود، پس پاسخ 304 معمولا هیچ کوئری‌ای ندارد.
+        """
+        article = self.get_object()
+        return [article.updated, *get_versions([article_key(article), 'sidebar', 'categories']).values()]
 
     def get_context_data(self, **kwargs):
         """
@@ -69,24 +103,27 @@ class ArticleDetailView(DetailView):
         
         # 2. فرم ارسال نظر را به context اضافه کن.
         context['comment_form'] = CommentForm()
+
+        # درخت نظرات با یک کوئری ساخته می‌شود تا تمپلیت برای هر نظر کوئری جداگانه اجرا نکند.
+        # ساخت آن تا اولین استفاده عقب می‌افتد: اگر قطعه نظرات از کش خوانده شود، کوئری اجرا نمی‌شود.
+        context['comment_tree'] = SimpleLazyObject(self.object.comments.tree)
+        # نسخه نظرات و لایک‌های مقاله (با هر تغییر نظر یا لایک بالا می‌رود) در کلید کش قطعه نظرات
+        context['comment_version'] = get_version(article_key(self.object))
         
         # 3. بررسی کن که آیا کاربر فعلی این مقاله را لایک کرده است یا نه.
         # این بخش برای نمایش دکمه "لایک شده" یا "لایک نشده" در تمپلیت کاربرد دارد.
-        if self.request.user.is_authenticated:
-            # اگر کاربر لاگین کرده بود، بررسی کن آیا لایکی از این کاربر برای این مقاله وجود دارد.
-            context['is_liked'] = Like.objects.filter(article=self.object, user=self.request.user).exists()
-        else:
-            # اگر کاربر لاگین نکرده، مقدار is_liked را False قرار بده.
-            context['is_liked'] = False
+        # برای کاربر لاگین نکرده همیشه False است. لایک‌های در انتظار (حالت write-behind) هم دیده می‌شوند.
+        context['is_liked'] = likes.is_liked(self.request.user, self.object)
             
         # 4. تعداد کل لایک‌های مقاله را به context اضافه کن.
-        context['total_likes'] = self.object.article_likes.count() # از related_name که در مدل تعریف کردیم استفاده می‌کنیم
+        # از شمارنده ذخیره‌شده در خود مقاله استفاده می‌کنیم تا نیازی به COUNT(*) نباشد.
+        context['total_likes'] = likes.like_count(self.object)
         
         # 5. در نهایت context کامل شده را برگردان.
         return context
 
 
-class CategoryArticleListView(ListView):
+class CategoryArticleListView(ConditionalGetMixin, SurrogateKeysMixin, KeysetPaginationMixin, ListView):
     """
     نمایش لیست مقالات مربوط به یک دسته‌بندی خاص.
     این ویو جایگزین ویو تابعی category_detail می‌شود.
@@ -104,7 +141,18 @@ class CategoryArticleListView(ListView):
         self.category = get_object_or_404(Category, pk=self.kwargs['pk'])
         
         # 2. مقالات مربوط به این دسته‌بندی که "منتشر شده" هستند را برگردان.
-        return Article.objects.filter(category=self.category, status='p')
+        return Article.objects.published().filter(category=self.category).cards()
+
+    def get_surrogate_keys(self, context):
+        return super().get_surrogate_keys(context) + [category_key(self.category)]
+
+    def get_validators(self):
+        # وجود دسته‌بندی اینجا بررسی نمی‌شود؛ برای دسته‌بندی ناموجود ویو 404 (بدون ETag) برمی‌گرداند
+        pk = self.kwargs['pk']
+        return listing_validators(
+            Article.objects.published().filter(category=pk),
+            category_key(pk), 'articles', 'sidebar', 'categories',
+        )
 
     def get_context_data(self, **kwargs):
         """
@@ -115,7 +163,7 @@ class CategoryArticleListView(ListView):
         return context
 
 
-class SearchListView(ListView):
+class SearchListView(ConditionalGetMixin, SurrogateKeysMixin, KeysetPaginationMixin, ListView):
     """
     نمایش نتایج جستجو.
     این ویو جایگزین ویو تابعی search می‌شود.
@@ -125,6 +173,9 @@ class SearchListView(ListView):
     context_object_name = 'articles'
     paginate_by = 3
 
+    # نسخه search با هر تغییر نمایه جستجو (ذخیره یا حذف مقاله) بالا می‌رود
+    surrogate_keys = ('search', 'sidebar')
+
     def get_queryset(self):
         """
         مقالات را بر اساس عبارت جستجو شده (q) فیلتر می‌کند.
@@ -132,12 +183,16 @@ class SearchListView(ListView):
         # 1. عبارت جستجو را از پارامتر `q` در URL بخوان.
         query = self.request.GET.get('q')
         if query:
-            # 2. اگر عبارتی برای جستجو وجود داشت، مقالاتی که عنوانشان شامل آن عبارت است را برگردان.
-            # `__icontains` باعث می‌شود جستجو به حروف بزرگ و کوچک حساس نباشد.
-            return Article.objects.filter(title__icontains=query, status='p')
+            # 2. اگر عبارتی برای جستجو وجود داشت، آن را در نمایه جستجو (عنوان و متن مقالات) پیدا کن.
+            # نتایج به ترتیب امتیاز BM25 هستند و فقط مقالات صفحه جاری از دیتابیس خوانده می‌شوند.
+            return search(query)
         # 3. اگر عبارتی برای جستجو نبود، لیست خالی برگردان.
         return Article.objects.none()
 
+    def get_validators(self):
+        # عبارت جستجو و صفحه در آدرس هستند؛ ETag فقط به نمایه و کارت مقالات وابسته است
+        return listing_validators(Article.objects.published(), 'search', 'sidebar', 'categories')
+
     def get_context_data(self, **kwargs):
         """
         عبارت جستجو شده را به تمپلیت ارسال می‌کند تا در صفحه نمایش داده شود.
@@ -178,7 +233,7 @@ def add_comment(request, slug):
     """
     این ویو مسئول پردازش فرم ارسال نظر و پاسخ به نظرات است.
     """
-    article = get_object_or_404(Article, slug=slug, status='p')
+    article = get_article(slug)
     
     if request.method == 'POST':
         form = CommentForm(request.POST)
@@ -192,13 +247,14 @@ def add_comment(request, slug):
             if parent_id:
                 try:
                     # کامنت والد را پیدا کرده و به کامنت جدید اختصاص بده
-                    parent_comment = Comment.objects.get(id=parent_id)
+                    parent_comment = Comment.objects.get(id=parent_id, article=article)
                     new_comment.parent = parent_comment
                 except Comment.DoesNotExist:
                     # اگر کامنت والد پیدا نشد، مشکلی نیست. به صورت نظر اصلی ثبت می‌شود.
                     pass
             # --- پایان راه‌حل ---
             
+            # شمارنده‌های نظر مقاله را سیگنال ذخیره نظر به صورت اتمیک افزایش می‌دهد (blog/signals.py)
             new_comment.save()
             # کاربر را به همان صفحه مقاله و بخش نظرات هدایت کن
             return redirect(article.get_absolute_url() + '#comments-section')
@@ -211,20 +267,29 @@ def add_comment(request, slug):
 def like_article(request, slug):
     """
     این ویو مسئول لایک کردن یا برداشتن لایک از یک مقاله است.
+    (نسخه بدون جاوااسکریپت؛ دکمه لایک صفحه مقاله از toggle_like استفاده می‌کند.)
     """
-    # 1. مقاله مورد نظر را پیدا کن.
-    article = get_object_or_404(Article, slug=slug, status='p')
+    # 1. مقاله مورد نظر را (از کش مقالات) پیدا کن.
+    article = get_article(slug)
     
-    # 2. با استفاده از `get_or_create` سعی کن یک لایک برای این کاربر و این مقاله پیدا کنی یا بسازی.
-    # این متد یک تاپل برمی‌گرداند: (شیء لایک, یک مقدار Boolean به نام created)
-    # اگر لایک از قبل وجود داشته باشد، created برابر False خواهد بود.
-    # اگر لایک در همین لحظه ساخته شود، created برابر True خواهد بود.
-    like, created = Like.objects.get_or_create(article=article, user=request.user)
-
-    # 3. اگر لایک از قبل وجود داشت (created is False)، یعنی کاربر می‌خواهد لایکش را بردارد.
-    if not created:
-        like.delete() # لایک را حذف کن.
+    # 2. لایک را به صورت اتمیک برعکس کن (اگر بود حذف، اگر نبود ثبت) و شمارنده را به‌روز کن.
+    likes.toggle(request.user, article)
     
-    # 4. در هر صورت، کاربر را به صفحه جزئیات مقاله برگردان.
+    # 3. در هر صورت، کاربر را به صفحه جزئیات مقاله برگردان.
     return redirect('blog:article_detail', slug=slug)
 
+
+@require_POST
+def toggle_like(request, slug):
+    """
+    لایک را برعکس می‌کند و وضعیت جدید را به صورت JSON برمی‌گرداند
+    تا دکمه لایک بدون بارگذاری دوباره صفحه به‌روز شود.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'error': 'برای لایک کردن باید وارد شوید.', 'login_url': resolve_url(settings.LOGIN_URL)},
+            status=401,
+        )
+    article = get_article(slug)
+    liked, like_count = likes.toggle(request.user, article)
+    return JsonResponse({'liked': liked, 'like_count': like_count})
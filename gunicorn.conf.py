@@ -0,0 +1,21 @@
+import os
+
+# ==================================
+# تنظیمات gunicorn
+# ==================================
+# تعداد پردازش‌ها و thread ها از همان متغیرهایی خوانده می‌شود که settings.py اندازه
+# connection pool دیتابیس را با آن‌ها تعیین می‌کند (هر thread حداکثر یک اتصال).
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# worker ها بعد از تعدادی درخواست (با اختلاف تصادفی تا همه با هم نباشند) بازسازی می‌شوند
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+graceful_timeout = 30
+
+
+def worker_exit(server, worker):
+    # اتصال‌های pool قبل از خروج worker مرتب بسته می‌شوند
+    from standblog.db_pool import close_pools
+
+    close_pools()
@@ -0,0 +1,25 @@
+from django.template.response import TemplateResponse
+from blog.models import Article
+from blog.page_cache import add_surrogate_keys, article_key
+
+
+async def home(request):
+    """
+    نسخه async ویو صفحه اصلی (برای ASGI)؛ همان کوئری‌های home.views.home با async for.
+    """
+    published_articles = Article.objects.published().cards().order_by('-created')
+
+    # مقالات عکس‌دار برای اسلایدر بالا و ۳ مقاله آخر برای بخش پایینی صفحه
+    banner_articles = [
+        article async for article in published_articles.exclude(image__isnull=True).exclude(image__exact='')[:6]
+    ]
+    latest_articles = [article async for article in published_articles[:3]]
+
+    add_surrogate_keys(request, 'home', 'sidebar', *map(article_key, banner_articles + latest_articles))
+
+    context = {
+        'all_articles': latest_articles,
+        'banner_articles': banner_articles,
+    }
+    # رندر تمپلیت را جنگو در یک thread همزمان انجام می‌دهد
+    return TemplateResponse(request, "home/index.html", context)
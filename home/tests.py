@@ -1,3 +1,27 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from blog.context_processors import get_sidebar_payload
+from blog.tests import TEST_CACHES, TEST_STORAGES, BlogDataMixin, clear_caches
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class HomeQueryBudgetTests(BlogDataMixin, TestCase):
+    """
+    صفحه اصلی با کش سرد و با سایدبار گرم حداکثر به اندازه بودجه‌اش کوئری اجرا می‌کند.
+    """
+
+    def test_home_within_budget(self):
+        budget = settings.QUERY_BUDGETS['home_app:home']
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.force_login(self.user)
+            for warm_sidebar in (False, True):
+                with self.subTest(logged_in=logged_in, warm_sidebar=warm_sidebar):
+                    clear_caches()
+                    if warm_sidebar:
+                        get_sidebar_payload()
+                    response = self.client.get(reverse('home_app:home'))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertLessEqual(response.request_stats.queries, budget)
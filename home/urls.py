@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import path 
-from .import views
+from .import async_views, views
 
 
 app_name="home_app"
 
 urlpatterns = [
-    path('', views.home, name='home'),
+    # در اجرای ASGI نسخه async صفحه اصلی (ASYNC_VIEWS در settings)
+    path('', async_views.home if settings.ASYNC_VIEWS else views.home, name='home'),
 ]
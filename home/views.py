@@ -1,5 +1,6 @@
-from django.shortcuts import render
+from django.template.response import TemplateResponse
 from blog.models import Article
+from blog.page_cache import add_surrogate_keys, article_key
 
 def home(request):
     """
@@ -7,17 +8,25 @@ def home(request):
     """
     
     # دریافت تمام مقالات "منتشر شده" به ترتیب از جدید به قدیم
-    published_articles = Article.objects.filter(status='p').order_by('-created')
+    # cards() نویسنده و دسته‌بندی‌ها را از قبل بارگذاری می‌کند تا تعداد کوئری‌ها به تعداد کارت‌ها بستگی نداشته باشد.
+    published_articles = Article.objects.published().cards().order_by('-created')
 
     # --- راه‌حل اصلی اینجاست ---
     # یک لیست جداگانه فقط از مقالات منتشر شده‌ای که "عکس دارند" برای بنر آماده می‌کنیم.
     # exclude(image__isnull=True) یعنی آنهایی که فیلد عکسشان خالی است را حذف کن.
-    banner_articles = published_articles.exclude(image__isnull=True).exclude(image__exact='')[:6]
+    banner_articles = list(published_articles.exclude(image__isnull=True).exclude(image__exact='')[:6])
+
+    # فقط ۳ مقاله آخر در بخش پایینی صفحه نمایش داده می‌شوند
+    latest_articles = list(published_articles[:3])
+
+    # کلیدهای کش صفحه: صفحه اصلی به لیست مقالات، سایدبار و تک‌تک مقالات نمایش داده شده وابسته است
+    add_surrogate_keys(request, 'home', 'sidebar', *map(article_key, banner_articles + latest_articles))
     
     context = {
-        'all_articles': published_articles, # تمام مقالات برای بخش پایینی صفحه
+        'all_articles': latest_articles, # آخرین مقالات برای بخش پایینی صفحه
         'banner_articles': banner_articles, # مقالات عکس‌دار برای اسلایدر بالا
     }
     
-    return render(request, "home/index.html", context)
+    # TemplateResponse رندر را تا بعد از میان‌افزارها به تعویق می‌اندازد تا زمان رندر جداگانه اندازه‌گیری شود
+    return TemplateResponse(request, "home/index.html", context)
 
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'standblog.settings')
+# در اجرای ASGI (مثلا uvicorn standblog.asgi:application) ویوهای خواندن نسخه async هستند
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,223 @@
+import os
+import posixpath
+import re
+from functools import lru_cache
+
+import rcssmin
+import rjsmin
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from fontTools import subset
+
+# ==================================
+# ساخت bundle های CSS و JS
+# ==================================
+# فایل‌های ASSET_BUNDLES به هم چسبانده و فشرده می‌شوند و در static/dist نوشته می‌شوند.
+# آدرس‌های نسبی url(...) داخل CSS نسبت به محل bundle بازنویسی می‌شوند. فونت‌های آیکون فقط
+# با آیکون‌هایی که در تمپلیت‌ها استفاده شده‌اند و فونت‌های متنی فقط با حروف لاتین نگه داشته
+# می‌شوند و قواعد CSS آیکون‌های استفاده نشده حذف می‌شوند. هش محتوا در نام فایل‌ها و نسخه‌های
+# gzip و brotli را CompressedManifestStaticFilesStorage هنگام collectstatic می‌سازد.
+
+BUNDLE_DIR = 'dist'
+OUTPUT_DIR = os.path.join(settings.BASE_DIR, 'static', BUNDLE_DIR)
+
+# پیشوند کلاس‌های آیکون -> نام فونت آن‌ها
+ICON_FONTS = getattr(settings, 'ASSET_ICON_FONTS', {'fa': 'FontAwesome', 'zmdi': 'Material-Design-Iconic-Font'})
+# حروفی که در فونت‌های متنی (مثلا Poppins) نگه داشته می‌شوند: لاتین پایه، Latin-1 و علائم نگارشی
+TEXT_UNICODES = [*range(0x20, 0x7F), *range(0xA0, 0x100), *range(0x2000, 0x2070), 0x20AC]
+# ترتیب ترجیح فایل منبع برای subset (فرمت‌های بدون فشرده‌سازی سریع‌تر خوانده می‌شوند)
+FONT_SOURCE_EXTENSIONS = ('.ttf', '.otf', '.woff', '.woff2')
+
+URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+FONT_FACE_RE = re.compile(r'@font-face\s*\{[^}]*\}')
+FONT_FAMILY_RE = re.compile(r'font-family\s*:\s*[\'"]?([^;\'"}]+)')
+CONTENT_RE = re.compile(r'content\s*:\s*[\'"]\\([0-9a-fA-F]{2,6})[\'"]')
+
+
+def bundle_sources(name):
+    return settings.ASSET_BUNDLES[name]
+
+
+def bundle_path(name):
+    return posixpath.join(BUNDLE_DIR, name)
+
+
+@lru_cache(maxsize=None)
+def bundle_available(name):
+    """
+    آیا bundle ساخته و با collectstatic منتشر شده است؟ (یک بار برای هر process بررسی می‌شود)
+    """
+    return staticfiles_storage.exists(bundle_path(name))
+
+
+def _read_static(path):
+    found = finders.find(path)
+    if found is None:
+        raise FileNotFoundError(f'Static file not found: {path}')
+    with open(found, encoding='utf-8') as source:
+        return source.read()
+
+
+def _rebase_urls(css, source_path):
+    """
+    آدرس‌های نسبی یک فایل CSS را طوری بازنویسی می‌کند که از محل bundle (dist/) درست باشند.
+    """
+    source_dir = posixpath.dirname(source_path)
+
+    def rebase(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, sep, suffix = re.match(r'([^?#]*)([?#]?)(.*)', url).groups()
+        static_path = posixpath.normpath(posixpath.join(source_dir, path))
+        return f'url("{posixpath.relpath(static_path, BUNDLE_DIR)}{sep}{suffix}")'
+
+    return URL_RE.sub(rebase, css)
+
+
+def used_icon_classes():
+    """
+    کلاس‌های آیکون (مثلا fa-heart) که در تمپلیت‌ها، جاوااسکریپت‌ها و کد پایتون پروژه آمده‌اند.
+    """
+    pattern = re.compile(r'\b(?:%s)-[a-z0-9-]+' % '|'.join(map(re.escape, ICON_FONTS)))
+    skipped = {'static', 'staticfiles', 'media', 'node_modules', 'venv'}
+    roots = [os.path.join(settings.BASE_DIR, 'static', 'js'), str(settings.BASE_DIR)]
+    used = set()
+    for index, root in enumerate(roots):
+        for directory, dirnames, filenames in os.walk(root):
+            if index:
+                dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in skipped]
+            for filename in filenames:
+                if filename.endswith(('.html', '.js', '.py')):
+                    with open(os.path.join(directory, filename), encoding='utf-8', errors='ignore') as source:
+                        used.update(pattern.findall(source.read()))
+    return used
+
+
+def prune_icon_rules(css, used):
+    """
+    قواعد «.fa-x:before{content:...}» آیکون‌های استفاده نشده را حذف می‌کند.
+    خروجی: (CSS جدید، {نام فونت: مجموعه کدهای یونیکد لازم})
+    """
+    prefixes = '|'.join(map(re.escape, ICON_FONTS))
+    rule_re = re.compile(
+        r'((?:\.(?:%s)-[\w-]+:{1,2}before,?)+)\{content:\s*[\'"]\\([0-9a-fA-F]+)[\'"];?\}' % prefixes
+    )
+    codepoints = {family: set() for family in ICON_FONTS.values()}
+
+    def prune(match):
+        selectors = [s for s in match.group(1).split(',') if s]
+        kept = [s for s in selectors if s[1:].split(':')[0] in used]
+        if not kept:
+            return ''
+        prefix = kept[0][1:].split('-')[0]
+        codepoints[ICON_FONTS[prefix]].add(int(match.group(2), 16))
+        return f'{",".join(kept)}{{content:"\\{match.group(2)}"}}'
+
+    css = rule_re.sub(prune, css)
+    # قواعد دیگری که از فونت آیکون استفاده می‌کنند (مثلا ::before سفارشی در CSS قالب) هم حفظ می‌شوند
+    extra = {int(code, 16) for code in CONTENT_RE.findall(css)}
+    for family in codepoints:
+        codepoints[family] |= extra
+    return css, codepoints
+
+
+def subset_font(source, unicodes, output_base):
+    """
+    فونت را به حروف داده شده محدود می‌کند و نسخه‌های woff2 و woff را کنار هم ذخیره می‌کند.
+    """
+    written = []
+    for flavor in ('woff2', 'woff'):
+        options = subset.Options()
+        options.flavor = flavor
+        options.layout_features = ['*']
+        options.notdef_outline = True
+        # جدول‌های مخصوص ابزار ساخت فونت در مرورگر استفاده نمی‌شوند
+        options.drop_tables += ['FFTM', 'webf']
+        font = subset.load_font(source, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=unicodes)
+        subsetter.subset(font)
+        path = f'{output_base}.{flavor}'
+        subset.save_font(font, path, options)
+        written.append(path)
+    return written
+
+
+def subset_font_faces(css, icon_codepoints, log=lambda message: None):
+    """
+    منبع هر @font-face را با نسخه subset شده فونت (woff2 و woff) جایگزین می‌کند.
+    """
+    os.makedirs(os.path.join(OUTPUT_DIR, 'fonts'), exist_ok=True)
+    done = {}
+
+    def replace(match):
+        block = match.group(0)
+        family_match = FONT_FAMILY_RE.search(block)
+        if family_match is None:
+            return block
+        family = family_match.group(1).strip()
+        urls = [m.group(2).split('?')[0].split('#')[0] for m in URL_RE.finditer(block)]
+        candidates = sorted(
+            (url for url in urls if url.lower().endswith(FONT_SOURCE_EXTENSIONS)),
+            key=lambda url: FONT_SOURCE_EXTENSIONS.index(os.path.splitext(url.lower())[1]),
+        )
+        if not candidates:
+            return block
+        static_path = posixpath.normpath(posixpath.join(BUNDLE_DIR, candidates[0]))
+        source = finders.find(static_path)
+        if source is None:
+            return block
+        slug = re.sub(r'[^a-z0-9]+', '-', family.lower()).strip('-')
+        if slug not in done:
+            unicodes = sorted(icon_codepoints[family]) if family in icon_codepoints else TEXT_UNICODES
+            base = os.path.join(OUTPUT_DIR, 'fonts', slug)
+            written = subset_font(source, unicodes, base)
+            done[slug] = True
+            log(f'{family}: {len(unicodes)} glyphs, {os.path.getsize(source)} -> {os.path.getsize(written[0])} bytes (woff2)')
+        # اعلان‌های src قبلی (eot، svg و ...) حذف و منبع جدید اضافه می‌شود
+        declarations = [
+            d for d in block[block.index('{') + 1:-1].split(';')
+            if d.strip() and not d.strip().startswith('src')
+        ]
+        declarations.append(
+            f'src:url("fonts/{slug}.woff2") format("woff2"),url("fonts/{slug}.woff") format("woff")'
+        )
+        declarations.append('font-display:swap')
+        return '@font-face{' + ';'.join(declarations) + '}'
+
+    return FONT_FACE_RE.sub(replace, css)
+
+
+def build_css(sources, used_icons, log=lambda message: None):
+    css = '\n'.join(_rebase_urls(_read_static(path), path) for path in sources)
+    css = rcssmin.cssmin(css)
+    css, icon_codepoints = prune_icon_rules(css, used_icons)
+    return subset_font_faces(css, icon_codepoints, log)
+
+
+def build_js(sources):
+    # ";" بین فایل‌ها برای فایل‌هایی که با ; تمام نشده‌اند
+    return ';\n'.join(rjsmin.jsmin(_read_static(path)) for path in sources)
+
+
+def build_bundles(log=lambda message: None):
+    """
+    همه bundle های ASSET_BUNDLES را می‌سازد. خروجی: {نام bundle: (حجم منابع، حجم bundle)}
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    used_icons = used_icon_classes()
+    log(f'{len(used_icons)} icon classes used in templates')
+    sizes = {}
+    for name, sources in settings.ASSET_BUNDLES.items():
+        if name.endswith('.css'):
+            content = build_css(sources, used_icons, log)
+        else:
+            content = build_js(sources)
+        with open(os.path.join(OUTPUT_DIR, name), 'w', encoding='utf-8') as output:
+            output.write(content)
+        source_size = sum(os.path.getsize(finders.find(path)) for path in sources)
+        sizes[name] = (source_size, len(content.encode()))
+    bundle_available.cache_clear()
+    return sizes
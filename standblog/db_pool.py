@@ -0,0 +1,81 @@
+import os
+import secrets
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+# ==================================
+# آمار connection pool دیتابیس
+# ==================================
+# برای هر دیتابیس PostgreSQL که pool دارد، آمار psycopg_pool (اتصال‌های در حال استفاده
+# و بیکار، زمان انتظار و تعداد timeout ها) در قالب متنی Prometheus برگردانده می‌شود.
+# هر پردازش gunicorn pool خودش را دارد؛ برچسب pid مشخص می‌کند آمار مال کدام پردازش است.
+
+METRIC_PREFIX = 'standblog_db_pool_'
+
+
+def pool_stats():
+    """
+    آمار pool هر دیتابیس: {نام: dict آمار} یا {نام: None} برای دیتابیس بدون pool (مثلا SQLite).
+    """
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            stats[alias] = None
+            continue
+        raw = pool.get_stats()
+        # شمارنده‌هایی که هنوز صفر هستند در get_stats نمی‌آیند
+        stats[alias] = {
+            'size': raw.get('pool_size', 0),
+            'max_size': raw.get('pool_max', 0),
+            'idle': raw.get('pool_available', 0),
+            'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+            'waiting': raw.get('requests_waiting', 0),
+            'requests_total': raw.get('requests_num', 0),
+            'requests_queued_total': raw.get('requests_queued', 0),
+            'wait_seconds_total': raw.get('requests_wait_ms', 0) / 1000,
+            'timeouts_total': raw.get('requests_errors', 0),
+            'connections_lost_total': raw.get('connections_lost', 0),
+            'bad_returns_total': raw.get('returns_bad', 0),
+        }
+    return stats
+
+
+def render_prometheus(stats):
+    pid = os.getpid()
+    lines = []
+    for alias, values in stats.items():
+        labels = f'alias="{alias}",pid="{pid}"'
+        lines.append(f'{METRIC_PREFIX}enabled{{{labels}}} {int(values is not None)}')
+        for name, value in (values or {}).items():
+            lines.append(f'{METRIC_PREFIX}{name}{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+@never_cache
+@require_GET
+def db_pool_metrics(request):
+    """
+    آمار pool برای سیستم مانیتورینگ. دسترسی با هدر «Authorization: Bearer <METRICS_TOKEN>»
+    یا برای کاربران staff.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    authorized = bool(token) and secrets.compare_digest(header, f'Bearer {token}')
+    if not authorized and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(pool_stats()), content_type='text/plain; version=0.0.4')
+
+
+def close_pools():
+    """
+    pool همه دیتابیس‌ها را می‌بندد (هنگام خروج worker، تا اتصال‌ها مرتب بسته شوند).
+    """
+    for alias in connections:
+        close_pool = getattr(connections[alias], 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save, pre_save
+from django_cleanup.signals import cleanup_post_delete
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# ==================================
+# نسخه‌های کوچک‌شده تصاویر آپلودی
+# ==================================
+# هنگام آپلود تصویر، از روی آن چند نسخه با عرض‌های ثابت ساخته می‌شود (هم در فرمت اصلی
+# و هم WebP) و کنار فایل اصلی ذخیره می‌شود:
+#     articles/images/photo.jpg  ->  articles/images/photo.360w.jpg و articles/images/photo.360w.webp
+# تمپلیت‌ها با srcset فقط نسخه‌ای را دانلود می‌کنند که برای اندازه نمایش لازم است
+# و پنل ادمین فقط کوچک‌ترین نسخه را.
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+EXISTS_KEY_PREFIX = 'standblog:image-derivatives:'
+# نتیجه has_derivatives تا این مدت معتبر است؛ نسخه‌هایی که بیرون از این ماژول ساخته یا پاک
+# شوند (مثلا با دسترسی مستقیم به storage) حداکثر بعد از این مدت دیده می‌شوند
+EXISTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class ImageDerivativesMixin:
+    """
+    برای مدل‌هایی که فیلد image دارند: عرض نسخه‌های کوچک‌شده و متدهای دسترسی به آن‌ها.
+    """
+    image_derivative_widths = ()
+
+    def image_url(self, width=None, webp=False):
+        """
+        آدرس نسخه‌ای از تصویر که عرضش حداقل width است (یا بزرگ‌ترین نسخه).
+        اگر نسخه‌ها هنوز ساخته نشده‌اند، آدرس تصویر اصلی برگردانده می‌شود.
+        """
+        if not self.image:
+            return ''
+        if not has_derivatives(self.image, self.image_derivative_widths):
+            return self.image.url
+        widths = sorted(self.image_derivative_widths)
+        chosen = next((w for w in widths if width is not None and w >= width), widths[-1])
+        return self.image.storage.url(derivative_name(self.image.name, chosen, webp))
+
+    def image_srcset(self, webp=False):
+        """
+        مقدار ویژگی srcset برای همه نسخه‌های تصویر، مثلا "a.360w.jpg 360w, a.720w.jpg 720w".
+        """
+        if not self.image or not has_derivatives(self.image, self.image_derivative_widths):
+            return ''
+        storage = self.image.storage
+        return ', '.join(
+            f'{storage.url(derivative_name(self.image.name, width, webp))} {width}w'
+            for width in sorted(self.image_derivative_widths)
+        )
+
+
+def derivative_name(name, width, webp=False):
+    """
+    نام فایل نسخه‌ای با عرض width از تصویر name.
+    """
+    root, ext = os.path.splitext(name)
+    return f'{root}.{width}w{".webp" if webp else _output_extension(ext)}'
+
+
+def _output_extension(ext):
+    # فرمت‌هایی غیر از JPEG و PNG (مثلا BMP یا TIFF) به JPEG تبدیل می‌شوند
+    ext = ext.lower()
+    return ext if ext in ('.jpg', '.jpeg', '.png') else '.jpg'
+
+
+def open_image(source, name):
+    """
+    تصویر را از فایل باز شده می‌خواند، چرخش EXIF را اعمال می‌کند (تصاویر موبایل معمولا
+    چرخش را فقط در EXIF دارند) و به RGB تبدیل می‌کند؛ PNG شفاف به صورت RGBA می‌ماند.
+    """
+    image = Image.open(source)
+    image.load()
+    image = ImageOps.exif_transpose(image)
+    keep_alpha = _output_extension(os.path.splitext(name)[1]) == '.png'
+    return image.convert('RGBA' if keep_alpha and image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+
+def encode_image(image, image_format):
+    """
+    تصویر را با تنظیمات فشرده‌سازی پروژه در فرمت JPEG، PNG یا WEBP برمی‌گرداند (bytes).
+    """
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, image_format, quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        image.save(buffer, image_format, quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def _exists_key(name, widths):
+    # عرض‌ها هم در کلید هستند: با اضافه شدن عرض جدید به مدل، نتیجه قبلی دیگر معتبر نیست
+    raw = f'{name}:{",".join(map(str, sorted(widths)))}'
+    return EXISTS_KEY_PREFIX + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def has_derivatives(fieldfile, widths):
+    """
+    آیا نسخه‌های کوچک‌شده این تصویر ساخته شده‌اند؟ نتیجه در کش نگه داشته می‌شود
+    تا نمایش هر صفحه به ازای هر تصویر به storage مراجعه نکند.
+    """
+    if not widths:
+        return False
+    key = _exists_key(fieldfile.name, widths)
+    exists = cache.get(key)
+    if exists is None:
+        # بزرگ‌ترین نسخه WebP آخرین فایلی است که generate_derivatives می‌سازد
+        exists = fieldfile.storage.exists(derivative_name(fieldfile.name, max(widths), webp=True))
+        cache.set(key, exists, EXISTS_CACHE_TIMEOUT)
+    return exists
+
+
+def generate_derivatives(fieldfile, widths):
+    """
+    نسخه‌های کوچک‌شده (فرمت اصلی و WebP) تصویر را می‌سازد و کنار فایل اصلی ذخیره می‌کند.
+    تصویر هیچ‌وقت بزرگ‌تر از اندازه اصلی نمی‌شود. نام فایل‌های ساخته شده را برمی‌گرداند.
+    """
+    storage = fieldfile.storage
+    with fieldfile.open('rb') as source:
+        original = open_image(source, fieldfile.name)
+    keep_alpha = original.mode == 'RGBA'
+
+    created = []
+    for width in sorted(widths):
+        resized = original.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+        outputs = [(False, 'PNG' if keep_alpha else 'JPEG'), (True, 'WEBP')]
+        for webp, image_format in outputs:
+            name = derivative_name(fieldfile.name, width, webp)
+            # storage.save در صورت وجود فایل هم‌نام، نام دیگری انتخاب می‌کند
+            if storage.exists(name):
+                storage.delete(name)
+            created.append(storage.save(name, ContentFile(encode_image(resized, image_format))))
+    cache.set(_exists_key(fieldfile.name, widths), True, EXISTS_CACHE_TIMEOUT)
+    return created
+
+
+def delete_derivatives(name, widths, storage):
+    """
+    نسخه‌های کوچک‌شده تصویری که حذف یا جایگزین شده است را پاک می‌کند.
+    """
+    for width in widths:
+        for webp in (False, True):
+            derivative = derivative_name(name, width, webp)
+            if storage.exists(derivative):
+                storage.delete(derivative)
+    cache.delete(_exists_key(name, widths))
+
+
+def track_image_derivatives(model, field_name='image'):
+    """
+    سیگنال‌های لازم را برای مدل ثبت می‌کند: ساخت نسخه‌ها بعد از آپلود تصویر جدید
+    و حذف آن‌ها وقتی django-cleanup فایل اصلی را پاک می‌کند.
+    """
+    def remember_upload(sender, instance, raw=False, **kwargs):
+        fieldfile = getattr(instance, field_name)
+        # فایل تازه آپلود شده تا قبل از save در storage ذخیره نشده است (_committed=False)
+        instance._image_uploaded = not raw and bool(fieldfile) and not fieldfile._committed
+
+    def build_derivatives(sender, instance, **kwargs):
+        if not getattr(instance, '_image_uploaded', False):
+            return
+        instance._image_uploaded = False
+        try:
+            generate_derivatives(getattr(instance, field_name), model.image_derivative_widths)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            # نبود نسخه‌ها مانع ذخیره نمی‌شود؛ تمپلیت‌ها تصویر اصلی را نمایش می‌دهند
+            logger.exception('Could not build image derivatives for %s', getattr(instance, field_name).name)
+
+    def remove_derivatives(sender, file_name, file, **kwargs):
+        if kwargs.get('field_name') == field_name and file_name:
+            delete_derivatives(file_name, model.image_derivative_widths, file.storage)
+
+    uid = f'{model._meta.label_lower}.{field_name}'
+    pre_save.connect(remember_upload, sender=model, weak=False, dispatch_uid=f'{uid}.remember_upload')
+    post_save.connect(build_derivatives, sender=model, weak=False, dispatch_uid=f'{uid}.build_derivatives')
+    cleanup_post_delete.connect(remove_derivatives, sender=model, weak=False, dispatch_uid=f'{uid}.remove')
@@ -0,0 +1,235 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('standblog.requests')
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    وقتی یک ویو بیشتر از بودجه تعیین شده در QUERY_BUDGETS کوئری اجرا کند.
+    """
+
+
+# ==================================
+# آمار هر درخواست
+# ==================================
+class RequestStats:
+    """
+    تعداد و زمان کوئری‌ها، کوئری‌های تکراری و زمان رندر تمپلیت یک درخواست.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        # فقط برای TemplateResponse اندازه‌گیری می‌شود؛ برای بقیه پاسخ‌ها (مثلا ویوهایی که
+        # render() را صدا می‌زنند و رندرشان جزو زمان ویو است) None می‌ماند و گزارش نمی‌شود
+        self.render_time = None
+        self.total_time = 0.0
+        self.statements = Counter()
+        self.started = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # این متد به عنوان execute_wrapper روی اتصال‌های دیتابیس ثبت می‌شود
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """
+        تعداد اجراهای اضافه کوئری‌هایی که با همان SQL و پارامترها تکرار شده‌اند.
+        """
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_duplicated(self):
+        if not self.duplicates:
+            return None
+        (sql, _), count = self.statements.most_common(1)[0]
+        return {'sql': sql, 'count': count}
+
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'dup;desc="{self.duplicates} duplicated"',
+        ]
+        if self.render_time is not None:
+            metrics.append(f'render;dur={self.render_time * 1000:.1f}')
+        metrics.append(f'total;dur={self.total_time * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def get_query_budget(view_name):
+    """
+    بودجه کوئری یک ویو (بر اساس نام URL مثل blog:article_detail) یا None.
+    """
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+# ==================================
+# ثبت کوئری‌های درخواست جاری
+# ==================================
+# آمار درخواست جاری در یک ContextVar است و یک execute_wrapper ثابت روی همه اتصال‌ها
+# کوئری‌ها را به آن می‌فرستد. ORM async کوئری‌ها را در thread دیگری (با اتصال دیگری) اجرا
+# می‌کند ولی context را با خود می‌برد؛ پس کوئری‌های ویوهای async هم شمرده می‌شوند.
+_current_stats = ContextVar('standblog_request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# اتصال‌های جدید (هر thread اتصال‌های خودش را دارد) هنگام باز شدن
+connection_created.connect(install_query_recorder, dispatch_uid='standblog_query_recorder')
+
+
+# ==================================
+# میان‌افزار اندازه‌گیری
+# ==================================
+class RequestInstrumentationMiddleware:
+    """
+    برای هر درخواست تعداد و زمان کوئری‌ها، کوئری‌های تکراری و زمان رندر را اندازه می‌گیرد،
+    آن‌ها را در هدر Server-Timing و یک خط لاگ JSON برمی‌گرداند و بودجه کوئری ویو را بررسی می‌کند.
+    آمار در response.request_stats هم قرار می‌گیرد تا تست‌ها بتوانند آن را بررسی کنند.
+
+    محتوای پاسخ‌های streaming (فیدها و نقشه سایت) بعد از بازگشت ویو و در حین ارسال ساخته
+    می‌شود؛ کوئری‌های آن هم شمرده می‌شوند و لاگ و بررسی بودجه در پایان ارسال انجام می‌شود.
+    هدر Server-Timing این پاسخ‌ها قبل از ارسال محتوا فرستاده می‌شود و فقط شامل خود ویو است.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # اتصال‌هایی که قبل از بارگذاری میان‌افزار باز شده‌اند
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = self.start(request)
+        token = _current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = self.start(request)
+        token = _current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    @staticmethod
+    def start(request):
+        stats = RequestStats()
+        request.request_stats = stats
+        return stats
+
+    def finish(self, request, response, stats):
+        stats.total_time = time.perf_counter() - stats.started
+        response['Server-Timing'] = stats.server_timing()
+        response.request_stats = stats
+        if response.streaming:
+            content = response.streaming_content
+            if response.is_async:
+                response.streaming_content = self.ameasure_stream(request, response, stats, content)
+            else:
+                response.streaming_content = self.measure_stream(request, response, stats, content)
+            return response
+        self.report(request, response, stats)
+        return response
+
+    def measure_stream(self, request, response, stats, content):
+        try:
+            while True:
+                # بین تکه‌ها کد سرور اجرا می‌شود؛ آمار فقط در حین ساختن هر تکه فعال است
+                token = _current_stats.set(stats)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    break
+                finally:
+                    _current_stats.reset(token)
+                yield chunk
+        finally:
+            stats.total_time = time.perf_counter() - stats.started
+            self.report(request, response, stats)
+
+    async def ameasure_stream(self, request, response, stats, content):
+        try:
+            while True:
+                token = _current_stats.set(stats)
+                try:
+                    chunk = await anext(content)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current_stats.reset(token)
+                yield chunk
+        finally:
+            stats.total_time = time.perf_counter() - stats.started
+            self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 1),
+            'duplicates': stats.duplicates,
+            'most_duplicated': stats.most_duplicated(),
+            'render_ms': round(stats.render_time * 1000, 1) if stats.render_time is not None else None,
+            'total_ms': round(stats.total_time * 1000, 1),
+        }, ensure_ascii=False))
+
+        budget = get_query_budget(view_name)
+        if budget is not None and stats.queries > budget:
+            message = f'{view_name}: {stats.queries} کوئری اجرا شد (بودجه: {budget})'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', settings.DEBUG):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_template_response(self, request, response):
+        # رندر تمپلیت بلافاصله بعد از این متد انجام می‌شود؛ پایان آن را با callback ثبت می‌کنیم
+        stats = getattr(request, 'request_stats', None)
+        if stats is not None:
+            render_started = time.perf_counter()
+
+            def record_render_time(rendered):
+                stats.render_time = (stats.render_time or 0.0) + time.perf_counter() - render_started
+
+            response.add_post_render_callback(record_render_time)
+        return response
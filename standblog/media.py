@@ -0,0 +1,160 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .images import encode_image, open_image
+
+# ==================================
+# تغییر اندازه تصاویر در لحظه درخواست
+# ==================================
+# /media/resize/<w>x<h>/<path> تصویر MEDIA_ROOT/<path> را در اولین درخواست به اندازه
+# w×h برش می‌دهد و نتیجه را در یک کش دیسکی ذخیره می‌کند. نام فایل‌های کش از هش محتوای
+# تصویر اصلی ساخته می‌شود، پس دو فایل با محتوای یکسان یک نسخه مشترک دارند و جایگزین
+# شدن فایل اصلی خودبه‌خود نسخه جدید می‌سازد. درخواست‌های بعدی مستقیما از دیسک پاسخ داده می‌شوند.
+#
+# پردازش تصویر در یک thread pool با تعداد ثابت worker انجام می‌شود (Pillow هنگام decode
+# و resize قفل GIL را آزاد می‌کند). درخواست فقط مدت کوتاهی (RESIZE_WAIT) منتظر می‌ماند؛ اگر
+# تصویر هنوز آماده نباشد، موقتا به تصویر اصلی هدایت می‌شود و thread وب آزاد می‌شود، و اگر صف
+# پر باشد 503 برمی‌گردد. درخواست‌های همزمان برای یک تصویر و اندازه فقط یک بار پردازش می‌شوند.
+
+ALLOWED_SIZES = frozenset(tuple(size) for size in getattr(settings, 'IMAGE_RESIZE_SIZES', ()))
+CACHE_DIR = getattr(settings, 'IMAGE_RESIZE_CACHE_DIR', os.path.join(settings.BASE_DIR, '.image_cache'))
+WORKERS = getattr(settings, 'IMAGE_RESIZE_WORKERS', 2)
+MAX_PENDING = getattr(settings, 'IMAGE_RESIZE_MAX_PENDING', 16)
+# حداکثر زمانی که درخواست منتظر ساخته شدن تصویر می‌ماند (ثانیه)؛ بیشتر از این thread وب را نگه نمی‌داریم
+RESIZE_WAIT = getattr(settings, 'IMAGE_RESIZE_WAIT', 0.5)
+CACHE_CONTROL = 'public, max-age=31536000'
+
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp')
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='image-resize')
+_lock = threading.Lock()
+_in_flight = {}  # مسیر فایل خروجی -> Future
+
+
+class ResizeQueueFull(Exception):
+    pass
+
+
+def _source_digest(path):
+    """
+    هش SHA-256 محتوای تصویر اصلی. برای اینکه هر درخواست فایل را دوباره نخواند،
+    نتیجه بر اساس مسیر، اندازه و زمان تغییر فایل در کش نگه داشته می‌شود.
+    """
+    stat = os.stat(path)
+    key = 'standblog:image-digest:' + hashlib.md5(
+        f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode(), usedforsecurity=False,
+    ).hexdigest()
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        cache.set(key, digest, None)
+    return digest
+
+
+def _render(source_path, output_path, width, height, image_format):
+    """
+    تصویر را به اندازه دقیق width×height (با برش از وسط) تبدیل و به صورت اتمیک در کش می‌نویسد.
+    """
+    with open(source_path, 'rb') as source:
+        image = open_image(source, source_path)
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+    resized = ImageOps.fit(image, (width, height))
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # ابتدا در فایل موقت نوشته می‌شود تا درخواست همزمان هرگز فایل نیمه‌کاره را نبیند
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(encode_image(resized, image_format))
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return output_path
+
+
+def _submit(source_path, output_path, width, height, image_format):
+    with _lock:
+        future = _in_flight.get(output_path)
+        created = future is None
+        if created:
+            if len(_in_flight) >= MAX_PENDING:
+                raise ResizeQueueFull
+            future = _executor.submit(_render, source_path, output_path, width, height, image_format)
+            _in_flight[output_path] = future
+    if created:
+        # بیرون از قفل: اگر کار تمام شده باشد، callback همین‌جا و در همین thread اجرا می‌شود
+        # و _forget دوباره _lock را می‌گیرد (قفل reentrant نیست)
+        future.add_done_callback(lambda done: _forget(output_path))
+    return future
+
+
+def _forget(output_path):
+    with _lock:
+        _in_flight.pop(output_path, None)
+
+
+@require_GET
+def resize_image(request, width, height, path):
+    """
+    نسخه width×height تصویر path از MEDIA_ROOT. فقط اندازه‌های IMAGE_RESIZE_SIZES مجازند.
+    اگر مرورگر WebP بپذیرد، خروجی WebP است؛ وگرنه فرمت اصلی (JPEG یا PNG).
+    """
+    if (width, height) not in ALLOWED_SIZES:
+        raise Http404('اندازه درخواست شده مجاز نیست.')
+    if not path.lower().endswith(SOURCE_EXTENSIONS):
+        raise Http404
+    try:
+        source_path = safe_join(settings.MEDIA_ROOT, path)
+        digest = _source_digest(source_path)
+    except (OSError, SuspiciousFileOperation):
+        # SuspiciousFileOperation: مسیر خارج از MEDIA_ROOT (مثلا با ../)
+        raise Http404
+
+    if 'image/webp' in request.headers.get('Accept', ''):
+        image_format = 'WEBP'
+    else:
+        image_format = 'PNG' if path.lower().endswith('.png') else 'JPEG'
+    etag = f'"{digest[:32]}-{width}x{height}-{image_format.lower()}"'
+    output_path = os.path.join(CACHE_DIR, digest[:2], f'{digest}-{width}x{height}.{image_format.lower()}')
+
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        if not os.path.exists(output_path):
+            try:
+                _submit(source_path, output_path, width, height, image_format).result(timeout=RESIZE_WAIT)
+            except ResizeQueueFull:
+                response = HttpResponse('در حال پردازش تصاویر دیگر؛ کمی بعد دوباره تلاش کنید.', status=503)
+                response['Retry-After'] = '5'
+                return response
+            except TimeoutError:
+                # ساخت تصویر در pool ادامه دارد؛ این بار تصویر اصلی نمایش داده می‌شود
+                response = HttpResponseRedirect(settings.MEDIA_URL + quote(path))
+                response['Cache-Control'] = 'no-store'
+                return response
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+                raise Http404
+        response = FileResponse(open(output_path, 'rb'), content_type=CONTENT_TYPES[image_format])
+    response['ETag'] = etag
+    response['Cache-Control'] = CACHE_CONTROL
+    patch_vary_headers(response, ('Accept',))
+    return response
@@ -0,0 +1,173 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.views.generic.detail import BaseDetailView
+from django.views.generic.list import BaseListView
+
+# ==================================
+# مسیریابی خواندن‌ها به نسخه‌های فقط‌خواندنی دیتابیس
+# ==================================
+# نوشتن‌ها همیشه روی دیتابیس اصلی (default) انجام می‌شوند. فقط خواندن‌های درخواست‌های GET
+# ویوهای لیست و جزئیات (ListView، DetailView و ویوهای async که replica_reads دارند) به یکی از
+# DATABASE_REPLICAS فرستاده می‌شوند؛ بقیه (ورود، فرم‌ها، پنل ادمین، دستورهای مدیریتی)
+# مثل قبل از دیتابیس اصلی می‌خوانند.
+#
+# نسخه‌های فقط‌خواندنی کمی از دیتابیس اصلی عقب‌ترند. برای اینکه کاربر بلافاصله بعد از
+# ثبت نظر، لایک یا ویرایش پروفایل نسخه قدیمی را نبیند، هر درخواستی که در دیتابیس بنویسد
+# یک کوکی کوتاه‌مدت می‌گیرد و تا پایان آن همه خواندن‌های همان مرورگر از دیتابیس اصلی است.
+# وضعیت هر درخواست در یک ContextVar نگه داشته می‌شود تا برای ویوهای async هم درست باشد.
+#
+# داده‌ای که در کش مشترک ذخیره می‌شود نباید از replica خوانده شود: ردیف عقب‌مانده زیر نسخه‌ای
+# کش می‌شود که بعد از نوشتن بالا رفته و تا تغییر بعدی باقی می‌ماند. کدی که کش را پر می‌کند
+# خواندن‌هایش را داخل primary_reads() انجام می‌دهد، یا اگر داده از replica خوانده شده
+# (served_by_replica) فقط وقتی آن را کش می‌کند که نسخه‌هایش در بازه REPLICA_STICKY_SECONDS
+# بالا نرفته باشند (blog.page_cache).
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_primary_until'
+# نشست‌ها همیشه از دیتابیس اصلی خوانده می‌شوند؛ نشستی که هنوز به replica نرسیده،
+# کاربر را از حساب خارج می‌کند (SessionMiddleware کوکی نشست خالی را پاک می‌کند)
+PRIMARY_ONLY_APPS = frozenset({'sessions'})
+
+_state = ContextVar('standblog_db_routing', default=None)
+
+
+class RoutingState:
+    __slots__ = ('use_replica', 'force_primary', 'read_replica', 'wrote')
+
+    def __init__(self):
+        self.use_replica = False
+        self.force_primary = 0  # عمق بلوک‌های تو در توی primary_reads
+        self.read_replica = False
+        self.wrote = False
+
+
+@contextmanager
+def primary_reads():
+    """
+    خواندن‌های داخل این بلوک (از جمله کوئری‌های async همین درخواست) از دیتابیس اصلی هستند.
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    state.force_primary += 1
+    try:
+        yield
+    finally:
+        state.force_primary -= 1
+
+
+def served_by_replica():
+    """
+    آیا درخواست جاری تا اینجا چیزی از replica خوانده است؟
+    """
+    state = _state.get()
+    return state is not None and state.read_replica
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class PrimaryReplicaRouter:
+    """
+    نوشتن‌ها روی default و خواندن‌ها (فقط وقتی میان‌افزار اجازه داده باشد) روی یک replica تصادفی.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is not None
+            and state.use_replica
+            and not state.force_primary
+            and replicas()
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            state.read_replica = True
+            return random.choice(replicas())
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # همه دیتابیس‌ها داده یکسانی دارند
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replica ها با تکثیر از دیتابیس اصلی به‌روز می‌شوند، نه با migrate
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """
+    برای درخواست‌های GET ویوهای لیست و جزئیات خواندن از replica را فعال می‌کند
+    (مگر اینکه مرورگر به دیتابیس اصلی سنجاق شده باشد) و بعد از هر نوشتن، کوکی سنجاق را می‌گذارد.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin_if_wrote(state, response)
+
+    async def __acall__(self, request):
+        # کوئری‌های ORM async در thread دیگری اجرا می‌شوند ولی context (و همین state) را با خود می‌برند
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin_if_wrote(state, response)
+
+    @staticmethod
+    def pin_if_wrote(state, response):
+        if state.wrote:
+            sticky = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time()) + sticky), max_age=sticky, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        view_class = getattr(view_func, 'view_class', None)
+        if (
+            state is not None
+            and replicas()
+            and request.method in ('GET', 'HEAD')
+            and view_class is not None
+            and (issubclass(view_class, (BaseListView, BaseDetailView)) or getattr(view_class, 'replica_reads', False))
+            and not self.is_pinned(request)
+        ):
+            state.use_replica = True
+
+    @staticmethod
+    def is_pinned(request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
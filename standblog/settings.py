@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-import os , dj_database_url
+import os , sys , dj_database_url
 
 
 
@@ -67,32 +67,44 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # اندازه‌گیری کوئری‌ها و زمان رندر هر درخواست (هدر Server-Timing و بودجه کوئری)
+    'standblog.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise با پشتیبانی ASGI (standblog/staticfiles.py)
+    'standblog.staticfiles.WhiteNoiseMiddleware',
+    # خواندن ویوهای لیست و جزئیات از replica و سنجاق کردن مرورگر به دیتابیس اصلی بعد از نوشتن
+    'standblog.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # کش کامل صفحات برای بازدیدکنندگان ناشناس (باید بعد از میان‌افزارهای نشست و پیام باشد)
+    'blog.page_cache.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'standblog.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # در محیط production هر تمپلیت فقط یک بار کامپایل و در حافظه نگه داشته می‌شود؛
+            # در حالت DEBUG بدون کش تا تغییر فایل‌ها بلافاصله دیده شود.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'blog.context_processors.sidebar_data',
-                'blog.context_processors.all_categories', 
-                
             ],
         },
     },
@@ -111,6 +123,155 @@ DATABASES = {
     )
 }
 
+# نسخه‌های فقط‌خواندنی دیتابیس (آدرس‌ها با کاما جدا می‌شوند). خواندن‌های ویوهای لیست و جزئیات
+# به آن‌ها می‌رود (standblog/routers.py). برای آزمایش محلی با دو فایل SQLite:
+#   cp db.sqlite3 replica.sqlite3
+#   DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 python manage.py runserver
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{_index}'] = {
+        **dj_database_url.parse(_url.strip()),
+        # در تست‌ها replica همان دیتابیس تست اصلی است
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+DATABASE_ROUTERS = ['standblog.routers.PrimaryReplicaRouter']
+# بعد از هر نوشتن، خواندن‌های همان مرورگر تا این مدت (ثانیه) از دیتابیس اصلی انجام می‌شود
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+# Connection pool (فقط PostgreSQL؛ SQLite مثل قبل بدون pool کار می‌کند)
+# هر پردازش gunicorn pool جداگانه دارد و هر thread در هر لحظه حداکثر یک اتصال از آن می‌گیرد،
+# پس اندازه pool برابر تعداد thread های هر پردازش است (gunicorn.conf.py همین متغیرها را می‌خواند).
+# کل اتصال‌ها به هر دیتابیس: WEB_CONCURRENCY × DB_POOL_MAX_SIZE؛ باید از max_connections کمتر باشد.
+# در اجرای ASGI هر درخواست همزمان کوئری‌هایش را در thread خودش اجرا می‌کند، پس pool به جای
+# تعداد thread ها به اندازه ASGI_DB_POOL_SIZE است و درخواست‌های بیشتر در صف pool منتظر می‌مانند.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 2))
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+# ویوهای async خواندن (blog/async_views.py)؛ asgi.py این متغیر را به صورت پیش‌فرض True می‌کند
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+DB_POOL = {
+    'min_size': 1,
+    'max_size': int(os.environ.get(
+        'DB_POOL_MAX_SIZE', os.environ.get('ASGI_DB_POOL_SIZE', 10) if ASYNC_VIEWS else GUNICORN_THREADS,
+    )),
+    # حداکثر انتظار برای گرفتن اتصال (ثانیه)؛ بعد از آن درخواست با خطا تمام می‌شود
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    # اتصال‌ها بعد از این مدت (با کمی اختلاف تصادفی) بسته و با اتصال تازه جایگزین می‌شوند
+    'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 30 * 60)),
+    # اتصال‌های اضافه بر min_size بعد از این مدت بیکاری بسته می‌شوند
+    'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 5 * 60)),
+}
+for _alias, _database in DATABASES.items():
+    if _database['ENGINE'] == 'django.db.backends.postgresql':
+        _database.setdefault('OPTIONS', {})['pool'] = {**DB_POOL, 'name': _alias}
+        # جنگو با این گزینه قبل از تحویل هر اتصال از pool، سالم بودن آن را بررسی می‌کند
+        # (ConnectionPool.check_connection)؛ اتصال قطع شده کنار گذاشته و دوباره ساخته می‌شود
+        _database['CONN_HEALTH_CHECKS'] = True
+# توکن دسترسی به /metrics/db-pool/ برای سیستم مانیتورینگ (کاربران staff بدون توکن دسترسی دارند)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# دو کش جدا داریم:
+# - default: صفحات، قطعه‌های تمپلیت، مقالات، فیدها و نقشه سایت. هر چیزی در آن قابل بازسازی است،
+#   پس با پر شدن (MAX_ENTRIES) بخشی از آن پاک می‌شود (cull).
+# - state: نسخه‌های کش (blog.cache) و وضعیت‌هایی که نباید گم شوند. اگر نسخه‌ای پاک شود، همه
+#   داده‌های نسخه‌دار آن دوباره سرد می‌شوند؛ پس این کش هیچ‌وقت cull نمی‌شود. تعداد کلیدهای آن
+#   به تعداد مقالات و دسته‌بندی‌ها محدود است.
+# روی سرور چند پردازش gunicorn داریم و هر دو کش باید بین آن‌ها مشترک باشند: با REDIS_URL از
+# Redis (نیاز به بسته redis) و در غیر این صورت از کش فایلی استفاده می‌شود.
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 20000))
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        },
+        'state': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'state',
+            'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+        },
+    }
+elif REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        # حافظه Redis باید با maxmemory-policy از نوع volatile-* تنظیم شود تا کلیدهای بدون انقضای
+        # state هیچ‌وقت حذف نشوند
+        'state': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'state',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.django_cache')),
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': 4},
+        },
+        'state': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('STATE_CACHE_DIR', os.path.join(BASE_DIR, '.django_state')),
+            'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+        },
+    }
+
+# مدت نگهداری صفحات کش‌شده برای بازدیدکنندگان ناشناس (ثانیه)
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 10))
+# حداکثر عمر قطعه‌های کش‌شده تمپلیت (تگ article_cache)؛ زمان‌های نسبی مثل «۵ دقیقه پیش» تا این مدت ثابت می‌مانند
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 60 * 10))
+# نسخه‌های کش زمان بالا رفتنشان هستند (blog.cache.changed_since): داده‌ای که در حین خواندنش یکی از
+# نسخه‌هایش بالا رفته کش نمی‌شود. این حاشیه (ثانیه) اختلاف ساعت سرورهای وب است (با NTP چند میلی‌ثانیه).
+VERSION_CLOCK_SKEW = float(os.environ.get('VERSION_CLOCK_SKEW', 0.05))
+
+# لایک‌ها در حالت write-behind: کلیک‌ها ابتدا در یک ژورنال ثبت و با دستور flush_likes
+# به صورت دسته‌ای در دیتابیس نوشته می‌شوند (برای مقالاتی که ناگهان پربازدید می‌شوند).
+LIKE_WRITE_BEHIND = os.environ.get('LIKE_WRITE_BEHIND', 'False') == 'True'
+LIKE_JOURNAL_PATH = os.environ.get('LIKE_JOURNAL_PATH', os.path.join(BASE_DIR, '.like_journal', 'likes.log'))
+
+# بودجه کوئری هر ویو (بر اساس نام URL). در حالت توسعه عبور از بودجه خطا می‌دهد
+# و در محیط سرور فقط هشدار در لاگ ثبت می‌شود. اعداد برای کاربر لاگین کرده (نشست و کاربر)
+# و حالتی است که کش سایدبار خالی است. لیست‌ها، جستجو و صفحه مقاله یک کوئری هم برای ETag دارند.
+# هدر صفحات برای کاربر لاگین کرده پروفایل (تصویر) را هم می‌خواند و لایک کردن (برخلاف برداشتن
+# لایک) یک savepoint هم دارد (دو کوئری). blog/tests.py و home/tests.py بودجه‌ها را بررسی می‌کنند.
+QUERY_BUDGETS = {
+    'home_app:home': 8,
+    'blog:articles_list': 9,
+    'blog:article_detail': 11,
+    'blog:category_list': 10,
+    'blog:search': 11,
+    'blog:toggle_like': 12,
+}
+QUERY_BUDGET_STRICT = DEBUG
+
+# خط لاگ JSON هر درخواست در خروجی تست‌ها (manage.py test) فقط مزاحم است؛ هشدار بودجه کوئری می‌ماند
+TESTING = sys.argv[1:2] == ['test']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # هر درخواست یک خط JSON با تعداد کوئری‌ها و زمان‌ها
+        'standblog.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -147,10 +308,66 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+# فایل‌هایی که دستور build_assets در یک bundle (static/dist/<نام>) ترکیب و فشرده می‌کند.
+# تگ {% asset_bundle %} در production فقط bundle را لینک می‌کند و در حالت DEBUG
+# (یا اگر bundle ساخته نشده باشد) همین فایل‌ها را جداگانه.
+ASSET_BUNDLES = {
+    'site.css': [
+        'vendor/bootstrap/css/bootstrap.min.css',
+        'css/fontawesome.css',
+        'css/templatemo-stand-blog.css',
+        'css/owl.css',
+    ],
+    'site.js': [
+        'vendor/jquery/jquery.min.js',
+        'vendor/bootstrap/js/popper.js',
+        'vendor/bootstrap/js/bootstrap.min.js',
+        'js/owl.js',
+        'js/slick.js',
+        'js/isotope.js',
+        'js/accordions.js',
+        'js/custom.js',
+    ],
+    'auth.css': [
+        'vendor/bootstrap/css/bootstrap.min.css',
+        'fonts/font-awesome-4.7.0/css/font-awesome.min.css',
+        'fonts/iconic/css/material-design-iconic-font.min.css',
+        'vendor/animate/animate.css',
+        'vendor/css-hamburgers/hamburgers.min.css',
+        'vendor/animsition/css/animsition.min.css',
+        'vendor/select2/select2.min.css',
+        'vendor/daterangepicker/daterangepicker.css',
+        'css/util.css',
+        'css/main.css',
+    ],
+    'auth.js': [
+        'vendor/jquery/jquery.min.js',
+        'vendor/animsition/js/animsition.min.js',
+        'vendor/bootstrap/js/popper.js',
+        'vendor/bootstrap/js/bootstrap.min.js',
+        'vendor/select2/select2.min.js',
+        'vendor/daterangepicker/moment.min.js',
+        'vendor/daterangepicker/daterangepicker.js',
+        'vendor/countdowntime/countdowntime.js',
+        'js/main.js',
+    ],
+}
+ASSET_BUNDLES_ENABLED = not DEBUG
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_ROOT = os.path.join(BASE_DIR,'media')
 MEDIA_URL = 'media/'
 
+# اندازه‌های مجاز آدرس /media/resize/<w>x<h>/<path> (هر اندازه دیگر 404 می‌دهد)
+IMAGE_RESIZE_SIZES = [(120, 90), (360, 240), (720, 480), (1280, 720)]
+# کش دیسکی تصاویر تغییر اندازه داده شده؛ نام فایل‌ها از هش محتوای تصویر اصلی ساخته می‌شود
+IMAGE_RESIZE_CACHE_DIR = os.environ.get('IMAGE_RESIZE_CACHE_DIR', os.path.join(BASE_DIR, '.image_cache'))
+# تعداد thread های پردازش تصویر و حداکثر درخواست‌های در صف (بیشتر از آن 503 می‌گیرد)
+IMAGE_RESIZE_WORKERS = int(os.environ.get('IMAGE_RESIZE_WORKERS', 2))
+IMAGE_RESIZE_MAX_PENDING = int(os.environ.get('IMAGE_RESIZE_MAX_PENDING', 16))
+# حداکثر انتظار درخواست برای ساخت تصویر (ثانیه)؛ بعد از آن موقتا به تصویر اصلی هدایت می‌شود
+IMAGE_RESIZE_WAIT = float(os.environ.get('IMAGE_RESIZE_WAIT', 0.5))
+
 
 
 # WhiteNoise and Default Storage configuration for production
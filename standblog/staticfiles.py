@@ -0,0 +1,51 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+# ==================================
+# WhiteNoise برای WSGI و ASGI
+# ==================================
+# میان‌افزار WhiteNoise فقط همزمان (sync) است؛ در ASGI جنگو برای آن و همه میان‌افزارهای
+# بعدی هر درخواست را بین event loop و یک thread جابه‌جا می‌کند. این نسخه در هر دو حالت
+# کار می‌کند: پیدا کردن فایل فقط یک جستجو در دیکشنری فایل‌هاست و بقیه درخواست‌ها
+# بدون thread اضافه به میان‌افزار بعدی می‌رسند. فایل‌ها در ASGI تکه‌تکه و بدون بستن
+# event loop خوانده می‌شوند (جنگو iterator همزمان FileResponse را یکجا در حافظه می‌خواند).
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+async def aread_file(filelike, block_size=STREAM_BLOCK_SIZE):
+    if filelike is None:
+        return  # درخواست HEAD و پاسخ 304 بدنه ندارند
+    read = sync_to_async(filelike.read, thread_sensitive=False)
+    while chunk := await read(block_size):
+        yield chunk
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # فقط در حالت توسعه (DEBUG)؛ فایل هر بار روی دیسک جستجو می‌شود
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            response = self.serve(static_file, request)
+            # بستن فایل با _resource_closers خود FileResponse انجام می‌شود
+            response.streaming_content = aread_file(response.file_to_stream)
+            return response
+        return await self.get_response(request)
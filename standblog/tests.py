@@ -0,0 +1,514 @@
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from blog.models import Article
+from blog.tests import TEST_CACHES, TEST_STORAGES, BlogDataMixin, clear_caches
+from . import assets, db_pool, media, routers, staticfiles
+from .images import derivative_name, has_derivatives
+from .instrumentation import QueryBudgetExceeded
+
+
+def image_file(name='photo.jpg', size=(1600, 800), image_format='JPEG', mode='RGB', exif=None):
+    buffer = BytesIO()
+    image = Image.new(mode, size, (200, 120, 40, 128)[:len(mode)])
+    image.save(buffer, image_format, **({'exif': exif} if exif is not None else {}))
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+# ==================================
+# اندازه‌گیری درخواست‌ها (RequestInstrumentationMiddleware)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, QUERY_BUDGET_STRICT=False)
+class RequestInstrumentationTests(BlogDataMixin, TestCase):
+
+    def test_template_response_reports_render_time(self):
+        with self.assertLogs('standblog.requests', 'INFO') as logs:
+            response = self.client.get(reverse('blog:articles_list'))
+        self.assertGreater(response.request_stats.render_time, 0)
+        self.assertIn('render;dur=', response['Server-Timing'])
+        self.assertIn('"view": "blog:articles_list"', logs.output[0])
+
+    def test_other_responses_do_not_report_render_time(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('standblog.requests', 'INFO') as logs:
+            response = self.client.post(reverse('blog:toggle_like', args=[self.article.slug]))
+        self.assertIsNone(response.request_stats.render_time)
+        self.assertNotIn('render;', response['Server-Timing'])
+        self.assertIn('"render_ms": null', logs.output[0])
+
+    def test_streaming_queries_are_counted(self):
+        with self.assertLogs('standblog.requests', 'INFO') as logs:
+            response = self.client.get(reverse('blog:articles_rss'))
+            self.assertTrue(response.streaming)
+            before = response.request_stats.queries
+            self.assertEqual(logs.output, [])
+            b''.join(response.streaming_content)
+        # کارت مقالات و دسته‌بندی‌هایشان در حین ارسال خوانده می‌شوند
+        self.assertGreater(response.request_stats.queries, before)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f'"queries": {response.request_stats.queries}', logs.output[0])
+
+    def test_streaming_queries_count_against_budget(self):
+        url = reverse('blog:articles_rss')
+        before_stream = self.client.get(url).request_stats.queries  # محتوا خوانده نشده، پس کش هم نشده
+        with self.settings(QUERY_BUDGETS={'blog:articles_rss': before_stream}, QUERY_BUDGET_STRICT=True):
+            response = self.client.get(url)
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+
+# ==================================
+# نسخه‌های کوچک‌شده تصاویر آپلودی (standblog.images)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class ImageDerivativeTests(BlogDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media_root))
+
+    def create(self, image):
+        return Article.objects.create(title='مقاله تصویری', body='<p>متن</p>', author=self.author, image=image)
+
+    def open_derivative(self, article, width, webp=False):
+        return Image.open(os.path.join(self.media_root, derivative_name(article.image.name, width, webp)))
+
+    def test_upload_builds_every_width_in_both_formats(self):
+        article = self.create(image_file())
+        for width in Article.image_derivative_widths:
+            with self.subTest(width=width):
+                with self.open_derivative(article, width) as image:
+                    self.assertEqual((image.format, image.size), ('JPEG', (width, width // 2)))
+                with self.open_derivative(article, width, webp=True) as image:
+                    self.assertEqual(image.format, 'WEBP')
+
+        self.assertTrue(has_derivatives(article.image, Article.image_derivative_widths))
+        self.assertTrue(article.image_url(300).endswith('.360w.jpg'))
+        self.assertTrue(article.image_url(webp=True).endswith('.1280w.webp'))
+        srcset = article.image_srcset(webp=True)
+        self.assertEqual(srcset.count('w, '), 3)
+        self.assertTrue(srcset.endswith('.1280w.webp 1280w'))
+
+    def test_small_images_are_not_enlarged(self):
+        article = self.create(image_file(size=(200, 100)))
+        with self.open_derivative(article, 720) as image:
+            self.assertEqual(image.size, (200, 100))
+
+    def test_transparent_png_stays_png(self):
+        article = self.create(image_file('logo.png', size=(400, 400), image_format='PNG', mode='RGBA'))
+        with self.open_derivative(article, 120) as image:
+            self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+
+    def test_exif_rotation_is_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: چرخش ۹۰ درجه
+        article = self.create(image_file(size=(800, 400), exif=exif))
+        with self.open_derivative(article, 120) as image:
+            self.assertEqual(image.size, (120, 240))
+
+    def test_broken_image_falls_back_to_original(self):
+        with self.assertLogs('standblog.images', 'ERROR'):
+            article = self.create(SimpleUploadedFile('broken.jpg', b'not an image'))
+        self.assertFalse(has_derivatives(article.image, Article.image_derivative_widths))
+        self.assertEqual(article.image_url(360), article.image.url)
+        self.assertEqual(article.image_srcset(), '')
+
+    def test_saving_without_new_upload_does_not_rebuild(self):
+        article = self.create(image_file())
+        path = os.path.join(self.media_root, derivative_name(article.image.name, 120))
+        os.remove(path)
+        article.title = 'عنوان جدید'
+        article.save()
+        self.assertFalse(os.path.exists(path))
+
+    def test_deleting_article_removes_derivatives(self):
+        article = self.create(image_file())
+        paths = [
+            os.path.join(self.media_root, derivative_name(article.image.name, width, webp))
+            for width in Article.image_derivative_widths for webp in (False, True)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertFalse(has_derivatives(article.image, Article.image_derivative_widths))
+
+
+# ==================================
+# تغییر اندازه تصاویر در لحظه درخواست (/media/resize)
+# ==================================
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class ResizeImageTests(SimpleTestCase):
+
+    def setUp(self):
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.media_root = os.path.join(root, 'media')
+        os.makedirs(os.path.join(self.media_root, 'articles'))
+        self.enterContext(self.settings(MEDIA_ROOT=self.media_root))
+        self.cache_dir = os.path.join(root, 'cache')
+        self.enterContext(mock.patch.object(media, 'CACHE_DIR', self.cache_dir))
+        self.write('articles/photo.jpg', image_file(size=(800, 600)))
+        # فایلی بیرون از MEDIA_ROOT که نباید قابل دسترسی باشد
+        with open(os.path.join(root, 'secret.jpg'), 'wb') as secret:
+            secret.write(image_file().read())
+
+    def write(self, name, upload):
+        with open(os.path.join(self.media_root, name), 'wb') as output:
+            output.write(upload.read())
+
+    def get(self, path, size='120x90', **headers):
+        return self.client.get(f'/media/resize/{size}/{path}', headers=headers)
+
+    def test_resized_image_is_cached_on_disk(self):
+        response = self.get('articles/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], media.CACHE_CONTROL)
+        self.assertIn('Accept', response['Vary'])
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (120, 90))
+
+        with mock.patch.object(media, '_submit') as submit:
+            again = self.get('articles/photo.jpg')
+            self.assertEqual(b''.join(again.streaming_content)[:2], b'\xff\xd8')
+        submit.assert_not_called()
+        self.assertEqual(self.get('articles/photo.jpg', if_none_match=response['ETag']).status_code, 304)
+
+    def test_webp_when_accepted(self):
+        response = self.get('articles/photo.jpg', size='360x240', accept='image/webp,*/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertNotEqual(response['ETag'], self.get('articles/photo.jpg', size='360x240')['ETag'])
+
+    def test_invalid_requests_are_404(self):
+        self.write('articles/broken.jpg', SimpleUploadedFile('broken.jpg', b'not an image'))
+        for size, path in [
+            ('100x100', 'articles/photo.jpg'),  # اندازه مجاز نیست
+            ('120x90', 'articles/photo.txt'),
+            ('120x90', 'articles/missing.jpg'),
+            ('120x90', 'articles/broken.jpg'),
+        ]:
+            with self.subTest(size=size, path=path):
+                self.assertEqual(self.get(path, size=size).status_code, 404)
+
+    def test_path_traversal_is_rejected(self):
+        outside = os.path.join(os.path.dirname(self.media_root), 'secret.jpg')
+        for path in ('../secret.jpg', 'articles/../../secret.jpg', '%2e%2e/secret.jpg', '/' + outside):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_full_queue_returns_503(self):
+        with mock.patch.object(media, 'MAX_PENDING', 0):
+            response = self.get('articles/photo.jpg')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_slow_resize_redirects_to_original(self):
+        release = threading.Event()
+        render = media._render
+
+        def slow_render(*args):
+            release.wait(5)
+            return render(*args)
+
+        with mock.patch.object(media, '_render', slow_render), mock.patch.object(media, 'RESIZE_WAIT', 0.01):
+            response = self.get('articles/photo.jpg')
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(response['Location'], settings.MEDIA_URL + 'articles/photo.jpg')
+            self.assertEqual(response['Cache-Control'], 'no-store')
+            # درخواست همزمان برای همان تصویر کار جدیدی به pool نمی‌فرستد
+            (output_path, future), = media._in_flight.items()
+            self.assertEqual(self.get('articles/photo.jpg').status_code, 302)
+            release.set()
+            future.result(5)
+        self.assertTrue(os.path.exists(output_path))
+        self.assertEqual(self.get('articles/photo.jpg').status_code, 200)
+
+
+# ==================================
+# bundle های CSS/JS و سرو فایل‌های استاتیک در ASGI
+# ==================================
+@override_settings(STORAGES=TEST_STORAGES)
+class AssetBundleTests(SimpleTestCase):
+
+    def test_relative_urls_are_rebased_to_bundle_dir(self):
+        css = (
+            '.a{background:url(../images/a.png?v=1)}'
+            '.b{background:url("data:image/png;base64,AA")}'
+            '.c{background:url(https://example.com/c.png)}'
+        )
+        self.assertEqual(
+            assets._rebase_urls(css, 'vendor/css/style.css'),
+            '.a{background:url("../vendor/images/a.png?v=1")}'
+            '.b{background:url("data:image/png;base64,AA")}'
+            '.c{background:url(https://example.com/c.png)}',
+        )
+
+    def test_unused_icon_rules_are_pruned(self):
+        # پیشوند ساختگی: used_icon_classes کد تست‌ها را هم می‌خواند و کلاس‌های fa این‌جا را «استفاده شده» می‌دید
+        css = (
+            '.ic-heart:before{content:"\\f004"}'
+            '.ic-glass:before,.ic-cup:before{content:"\\f000"}'
+            '.ic-star:before,.ic-star-o:before{content:"\\f005"}'
+            '.custom:before{font-family:TestIcons;content:"\\f101"}'
+        )
+        with mock.patch.object(assets, 'ICON_FONTS', {'ic': 'TestIcons'}):
+            pruned, codepoints = assets.prune_icon_rules(css, {'ic-heart', 'ic-star-o'})
+        self.assertEqual(
+            pruned,
+            '.ic-heart:before{content:"\\f004"}.ic-star-o:before{content:"\\f005"}'
+            '.custom:before{font-family:TestIcons;content:"\\f101"}',
+        )
+        self.assertEqual(codepoints, {'TestIcons': {0xF004, 0xF005, 0xF101}})
+
+    def test_used_icons_are_found_in_templates(self):
+        used = assets.used_icon_classes()
+        self.assertIn('fa-heart', used)
+        self.assertIn('fa-heart-o', used)
+
+    def test_build_bundles(self):
+        output_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(mock.patch.object(assets, 'OUTPUT_DIR', output_dir))
+        bundles = {'site.css': settings.ASSET_BUNDLES['site.css'], 'site.js': ['js/custom.js', 'js/accordions.js']}
+        with self.settings(ASSET_BUNDLES=bundles):
+            sizes = assets.build_bundles()
+
+        for name, (source_size, bundle_size) in sizes.items():
+            with self.subTest(name=name):
+                self.assertLess(bundle_size, source_size)
+        with open(os.path.join(output_dir, 'site.css'), encoding='utf-8') as bundle:
+            css = bundle.read()
+        self.assertIn('.fa-heart:before', css)
+        self.assertNotIn('.fa-' + 'glass:before', css)  # یکجا نوشته نشده تا used_icon_classes آن را پیدا نکند
+        self.assertIn('src:url("fonts/fontawesome.woff2") format("woff2")', css)
+        self.assertNotIn('.eot', css)
+        with open(os.path.join(output_dir, 'site.js'), encoding='utf-8') as bundle:
+            self.assertEqual(bundle.read().count(';\n'), 1)
+        for flavor in ('woff2', 'woff'):
+            self.assertTrue(os.path.exists(os.path.join(output_dir, 'fonts', f'fontawesome.{flavor}')))
+
+    def test_tag_links_bundle_only_when_built(self):
+        template = Template('{% load blog_assets %}{% asset_bundle "site.js" %}')
+        with mock.patch('blog.templatetags.blog_assets.bundle_available', return_value=True):
+            with self.settings(ASSET_BUNDLES_ENABLED=True):
+                self.assertEqual(template.render(Context()), '<script src="/static/dist/site.js"></script>')
+            with self.settings(ASSET_BUNDLES_ENABLED=False):
+                self.assertEqual(template.render(Context()).count('<script'), len(settings.ASSET_BUNDLES['site.js']))
+        with mock.patch('blog.templatetags.blog_assets.bundle_available', return_value=False):
+            with self.settings(ASSET_BUNDLES_ENABLED=True):
+                self.assertIn('/static/js/custom.js', template.render(Context()))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AsgiStaticFilesTests(SimpleTestCase):
+
+    def setUp(self):
+        static_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.content = os.urandom(2 * staticfiles.STREAM_BLOCK_SIZE + 10)
+        with open(os.path.join(static_root, 'app.js'), 'wb') as output:
+            output.write(self.content)
+        self.enterContext(self.settings(STATIC_ROOT=static_root, WHITENOISE_AUTOREFRESH=False))
+        self.reached_view = []
+
+        async def view(request):
+            self.reached_view.append(request.path)
+            return HttpResponse('view')
+
+        self.middleware = staticfiles.WhiteNoiseMiddleware(view)
+        self.factory = AsyncRequestFactory()
+
+    def call(self, path, method='get', **headers):
+        request = getattr(self.factory, method)(path, headers=headers)
+        return async_to_sync(self.middleware)(request)
+
+    @async_to_sync
+    async def read(self, response):
+        return [chunk async for chunk in response.streaming_content]
+
+    def test_static_file_is_streamed_in_chunks(self):
+        self.assertTrue(self.middleware.async_mode)
+        response = self.call('/static/app.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = self.read(response)
+        self.assertEqual(b''.join(chunks), self.content)
+        self.assertEqual([len(chunk) for chunk in chunks], [staticfiles.STREAM_BLOCK_SIZE] * 2 + [10])
+        self.assertEqual(self.reached_view, [])
+
+    def test_head_and_not_modified_have_no_body(self):
+        response = self.call('/static/app.js')
+        self.read(response)
+        self.assertEqual(self.read(self.call('/static/app.js', method='head')), [])
+        not_modified = self.call('/static/app.js', if_none_match=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.read(not_modified), [])
+
+    def test_other_paths_reach_the_view(self):
+        response = self.call('/blog/articles/')
+        self.assertEqual(response.content, b'view')
+        self.assertEqual(self.reached_view, ['/blog/articles/'])
+
+
+# ==================================
+# مسیریابی خواندن‌ها به replica و کوکی سنجاق
+# ==================================
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.state = routers.RoutingState()
+        token = routers._state.set(self.state)
+        self.addCleanup(routers._state.reset, token)
+        self.enterContext(self.settings(DATABASE_REPLICAS=['replica_1']))
+
+    def test_reads_go_to_primary_unless_enabled(self):
+        self.assertEqual(self.router.db_for_read(Article), routers.PRIMARY)
+        self.assertFalse(routers.served_by_replica())
+        self.state.use_replica = True
+        self.assertEqual(self.router.db_for_read(Article), 'replica_1')
+        self.assertTrue(routers.served_by_replica())
+
+    def test_primary_reads_block_and_primary_only_apps(self):
+        self.state.use_replica = True
+        with routers.primary_reads():
+            with routers.primary_reads():
+                self.assertEqual(self.router.db_for_read(Article), routers.PRIMARY)
+            self.assertEqual(self.router.db_for_read(Article), routers.PRIMARY)
+        self.assertEqual(self.router.db_for_read(Session), routers.PRIMARY)
+        self.assertFalse(self.state.read_replica)
+        self.assertEqual(self.router.db_for_read(Article), 'replica_1')
+
+    def test_no_replicas_configured(self):
+        self.state.use_replica = True
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Article), routers.PRIMARY)
+
+    def test_writes_and_migrations_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Article), routers.PRIMARY)
+        self.assertTrue(self.state.wrote)
+        self.assertTrue(self.router.allow_migrate(routers.PRIMARY, 'blog'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'blog'))
+
+    def test_outside_a_request(self):
+        routers._state.set(None)
+        with routers.primary_reads():
+            self.assertEqual(self.router.db_for_read(Article), routers.PRIMARY)
+        self.assertEqual(self.router.db_for_write(Article), routers.PRIMARY)
+        self.assertFalse(routers.served_by_replica())
+
+
+# replica آزمایشی همان دیتابیس تست است؛ فقط انتخاب شدن آن بررسی می‌شود
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, DATABASE_REPLICAS=['default'])
+class ReplicaRoutingMiddlewareTests(BlogDataMixin, TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.choice = self.enterContext(mock.patch('standblog.routers.random.choice', side_effect=lambda choices: choices[0]))
+
+    def test_list_and_detail_views_read_from_replica(self):
+        for url in (reverse('blog:articles_list'), self.article.get_absolute_url()):
+            with self.subTest(url=url):
+                self.choice.reset_mock()
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(self.choice.called)
+                self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_other_views_and_methods_read_from_primary(self):
+        self.client.get(reverse('accounts:login'))
+        self.client.post(reverse('blog:articles_list'))
+        self.assertFalse(self.choice.called)
+
+    def test_write_pins_browser_to_primary(self):
+        self.client.force_login(self.user)
+        with mock.patch('standblog.routers.time.time', return_value=1000):
+            response = self.client.post(reverse('blog:toggle_like', args=[self.article.slug]))
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie.value, str(1000 + settings.REPLICA_STICKY_SECONDS))
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        self.assertTrue(cookie['httponly'])
+
+        self.client.cookies[routers.PIN_COOKIE] = str(int(time.time()) + 60)
+        self.client.get(reverse('blog:articles_list'))
+        self.assertFalse(self.choice.called)
+        # بعد از گذشتن زمان سنجاق دوباره از replica خوانده می‌شود
+        self.client.cookies[routers.PIN_COOKIE] = str(int(time.time()) - 1)
+        self.client.get(reverse('blog:articles_list'))
+        self.assertTrue(self.choice.called)
+
+    def test_invalid_pin_cookie_is_ignored(self):
+        request = RequestFactory().get('/', HTTP_COOKIE=f'{routers.PIN_COOKIE}=abc')
+        self.assertFalse(routers.ReplicaRoutingMiddleware.is_pinned(request))
+
+
+# ==================================
+# آمار connection pool دیتابیس
+# ==================================
+class FakePool:
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def get_stats(self):
+        return self.stats
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_TOKEN='secret')
+class DbPoolMetricsTests(TestCase):
+
+    def setUp(self):
+        pooled = mock.Mock(pool=FakePool({'pool_size': 4, 'pool_available': 1, 'requests_wait_ms': 2500, 'requests_errors': 3}))
+        self.connections = {'default': pooled, 'replica_1': mock.Mock(pool=None)}
+        self.enterContext(mock.patch('standblog.db_pool.connections', self.connections))
+
+    def test_pool_stats(self):
+        stats = db_pool.pool_stats()
+        self.assertIsNone(stats['replica_1'])
+        self.assertEqual(stats['default']['in_use'], 3)
+        self.assertEqual(stats['default']['idle'], 1)
+        self.assertEqual(stats['default']['wait_seconds_total'], 2.5)
+        self.assertEqual(stats['default']['timeouts_total'], 3)
+        # شمارنده‌هایی که psycopg_pool هنوز گزارش نکرده صفرند
+        self.assertEqual(stats['default']['waiting'], 0)
+
+    def test_metrics_require_token_or_staff(self):
+        url = reverse('db_pool_metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+
+        response = self.client.get(url, headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        labels = f'alias="default",pid="{os.getpid()}"'
+        body = response.content.decode()
+        self.assertIn(f'standblog_db_pool_enabled{{{labels}}} 1\n', body)
+        self.assertIn(f'standblog_db_pool_in_use{{{labels}}} 3\n', body)
+        self.assertIn(f'standblog_db_pool_enabled{{alias="replica_1",pid="{os.getpid()}"}} 0\n', body)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_no_token_configured(self):
+        with self.settings(METRICS_TOKEN=''):
+            response = self.client.get(reverse('db_pool_metrics'), headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 403)
+
+    def test_close_pools(self):
+        self.connections['replica_1'] = mock.Mock(spec=['pool'])
+        db_pool.close_pools()
+        self.connections['default'].close_pool.assert_called_once_with()
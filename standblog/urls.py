@@ -18,12 +18,21 @@ from django.contrib import admin
 from django.urls import path , include
 from django.conf.urls.static import static
 from .import settings
+from blog.sitemaps import sitemap_index, sitemap_page
+from .db_pool import db_pool_metrics
+from .media import resize_image
 
 urlpatterns = [
     path('admin/',admin.site.urls),
     path('',include('home.urls')),
     path('',include('accounts.urls')),
     path('blog/',include('blog.urls',namespace='blog')),
+    # باید قبل از الگوی فایل‌های media باشد
+    path('media/resize/<int:width>x<int:height>/<path:path>', resize_image, name='resize_image'),
+    path('metrics/db-pool/', db_pool_metrics, name='db_pool_metrics'),
+    # نقشه سایت برای خزنده‌ها: فهرست صفحات و صفحات مقالات و دسته‌بندی‌ها
+    path('sitemap.xml', sitemap_index, name='sitemap'),
+    path('sitemap-<slug:section>-<int:page>.xml', sitemap_page, name='sitemap_page'),
 ]
 
 urlpatterns += static(settings.MEDIA_URL ,document_root=settings.MEDIA_ROOT)
\ No newline at end of file